@@ -0,0 +1,186 @@
+# analytics.py
+"""Cross-campaign analytics from incrementally maintained rollups.
+
+AnalyticsCubes subscribes to the ScenarioStore and keeps two small "cubes"
+keyed on integer category codes (see participation.Codebook):
+
+* hero cube: (campaign, villain, difficulty, hero, aspect) -> plays, wins and
+  the sum/count of health remaining on wins
+* play cube: (campaign, villain, difficulty, outcome, turns, threat) -> plays
+
+Recording or deleting a play only touches the cells of that play. Slicing
+(filtering, pivoting into win-rate matrices, distributions) runs on the cube
+frames, whose size depends on the number of distinct combinations rather
+than on the number of recorded plays, so it stays fast on a large archive.
+"""
+import pandas as pd
+
+from participation import Codebook
+from scenario_store import NOT_SELECTED_HERO
+
+# Dimension -> cube column
+DIMENSIONS = {
+    "Hero": "hero",
+    "Aspect": "aspect",
+    "Villain": "scenario",
+    "Difficulty": "difficulty",
+    "Campaign": "campaign",
+}
+HERO_KEY = ("campaign", "scenario", "difficulty", "hero", "aspect")
+PLAY_KEY = ("campaign", "scenario", "difficulty")
+UNKNOWN_COUNT = -1  # turns/threat that weren't recorded as a number
+
+
+def _count(value):
+    return value if type(value) is int else UNKNOWN_COUNT
+
+
+class AnalyticsCubes:
+    """Hero and play rollups across all campaigns, kept up to date by the ScenarioStore."""
+
+    def __init__(self, campaigns=(), scenarios=(), difficulties=(), heroes=(), aspects=()):
+        self._codebooks = {
+            "campaign": Codebook(campaigns),
+            "scenario": Codebook(scenarios),
+            "difficulty": Codebook(difficulties),
+            "hero": Codebook(heroes),
+            "aspect": Codebook(aspects),
+        }
+        self._hero_cells = {}  # hero key codes -> [plays, wins, health sum, health count]
+        self._play_cells = {}  # play key codes + (win, turns, threat) -> plays
+        self._version = 0
+        self._frames = {}  # name -> (version, DataFrame)
+
+    # --- ScenarioStore listener interface ---
+    def record_added(self, record):
+        self._apply(record, 1)
+
+    def record_removed(self, record):
+        self._apply(record, -1)
+
+    def _apply(self, record, delta):
+        codebooks = self._codebooks
+        play_codes = tuple(codebooks[name].code(record.get(name)) for name in PLAY_KEY)
+        win = 1 if record.get("outcome") == "Win" else 0
+
+        play_key = play_codes + (win, _count(record.get("turns_taken")), _count(record.get("threat_on_scheme")))
+        plays = self._play_cells.get(play_key, 0) + delta
+        if plays:
+            self._play_cells[play_key] = plays
+        else:
+            self._play_cells.pop(play_key, None)
+
+        for hero_info in record.get("heroes_played", []):
+            if hero_info.get("hero") == NOT_SELECTED_HERO:
+                continue
+            hero_key = play_codes + (codebooks["hero"].code(hero_info.get("hero")), codebooks["aspect"].code(hero_info.get("aspect")))
+            cell = self._hero_cells.get(hero_key)
+            if cell is None:
+                cell = self._hero_cells[hero_key] = [0, 0, 0, 0]
+            cell[0] += delta
+            cell[1] += delta * win
+            health = hero_info.get("health_remaining")
+            if win and type(health) is int:
+                cell[2] += delta * health
+                cell[3] += delta
+            if not cell[0]:
+                del self._hero_cells[hero_key]
+        self._version += 1
+
+    # --- Cube frames ---
+    def _cached(self, name, build):
+        cached = self._frames.get(name)
+        if cached is None or cached[0] != self._version:
+            cached = self._frames[name] = (self._version, build())
+        return cached[1]
+
+    def _categorical(self, name, codes):
+        return pd.Categorical.from_codes(codes, categories=self._codebooks[name].categories)
+
+    def hero_frame(self):
+        """The hero cube as a DataFrame: categorical key columns plus plays, wins and health sums."""
+        def build():
+            keys = list(self._hero_cells)
+            measures = list(self._hero_cells.values())
+            data = {name: self._categorical(name, [key[i] for key in keys]) for i, name in enumerate(HERO_KEY)}
+            for i, name in enumerate(("plays", "wins", "health_sum", "health_count")):
+                data[name] = pd.array([cell[i] for cell in measures], dtype="int64")
+            return pd.DataFrame(data)
+        return self._cached("hero", build)
+
+    def play_frame(self):
+        """The play cube as a DataFrame: categorical key columns, outcome, turns, threat and plays."""
+        def build():
+            keys = list(self._play_cells)
+            data = {name: self._categorical(name, [key[i] for key in keys]) for i, name in enumerate(PLAY_KEY)}
+            data["outcome"] = pd.Categorical(["Win" if key[3] else "Loss" for key in keys], categories=["Win", "Loss"])
+            data["turns_taken"] = pd.array([key[4] for key in keys], dtype="int64")
+            data["threat_on_scheme"] = pd.array([key[5] for key in keys], dtype="int64")
+            data["plays"] = pd.array(list(self._play_cells.values()), dtype="int64")
+            return pd.DataFrame(data)
+        return self._cached("play", build)
+
+    def values(self, dimension):
+        """Returns the values of a dimension ("Hero", "Villain", ...) that have recorded plays."""
+        column = DIMENSIONS[dimension]
+        frame = self.play_frame() if column in PLAY_KEY else self.hero_frame()
+        present = set(frame[column])
+        return [value for value in frame[column].cat.categories if value in present]
+
+    # --- Slicing ---
+    @staticmethod
+    def _filter(frame, filters):
+        """Keeps the rows whose dimension values are in the given lists (empty/None = all).
+
+        Dimensions the frame doesn't have (hero and aspect in the play cube) are ignored.
+        """
+        mask = None
+        for dimension, selected in (filters or {}).items():
+            if not selected or DIMENSIONS[dimension] not in frame.columns:
+                continue
+            column_mask = frame[DIMENSIONS[dimension]].isin(selected)
+            mask = column_mask if mask is None else mask & column_mask
+        return frame if mask is None else frame[mask]
+
+    def win_rate_matrix(self, rows, columns, filters=None, min_plays=1):
+        """Win % per (rows x columns) cell of the hero cube, plus the matching plays matrix.
+
+        ``rows`` and ``columns`` are two different dimension names ("Hero",
+        "Aspect", "Villain", "Difficulty", "Campaign"); ``filters`` maps
+        dimension names to the values to keep. Cells with fewer than
+        ``min_plays`` plays are left empty.
+        """
+        frame = self._filter(self.hero_frame(), filters)
+        totals = frame.groupby([DIMENSIONS[rows], DIMENSIONS[columns]], observed=True)[["plays", "wins"]].sum()
+        plays = totals["plays"].unstack()
+        win_rates = (totals["wins"] / totals["plays"] * 100).round(1).unstack()
+        win_rates = win_rates.where(plays >= min_plays)
+        for matrix in (win_rates, plays):
+            # Plain labels; a categorical column index doesn't survive the trip to the browser
+            matrix.index = pd.Index(matrix.index.astype(str), name=rows)
+            matrix.columns = pd.Index(matrix.columns.astype(str), name=columns)
+        return win_rates, plays
+
+    def health_averages(self, by, filters=None):
+        """Average hero health remaining on wins, grouped by one or more dimensions."""
+        frame = self._filter(self.hero_frame(), filters)
+        group_columns = [DIMENSIONS[dimension] for dimension in by]
+        totals = frame.groupby(group_columns, observed=True)[["wins", "health_sum", "health_count"]].sum()
+        totals = totals[totals["health_count"] > 0]
+        result = pd.DataFrame({
+            "Wins": totals["wins"],
+            "Avg HP Left (Wins)": (totals["health_sum"] / totals["health_count"]).round(1),
+        })
+        result.index.names = list(by)
+        return result.sort_values(by="Avg HP Left (Wins)", ascending=False)
+
+    def distribution(self, measure, filters=None):
+        """Plays per value of "turns_taken" or "threat_on_scheme", split into Win and Loss columns.
+
+        Only the campaign, villain and difficulty filters apply (plays aren't split by hero).
+        """
+        frame = self._filter(self.play_frame(), filters)
+        frame = frame[frame[measure] != UNKNOWN_COUNT]
+        counts = frame.groupby([measure, "outcome"], observed=False)["plays"].sum().unstack(fill_value=0)
+        counts.index.name = measure
+        return counts[counts.sum(axis=1) > 0]
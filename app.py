@@ -1,630 +1,1506 @@
 # app.py
 import streamlit as st
 import pandas as pd
+import contextlib
 import datetime
+import functools
+import hashlib
 import json # Import the json module for saving/loading data
-import uuid # Import uuid for generating unique IDs
-
-# --- Constants and Initial Setup ---
-# Define specific campaigns and their 5 associated scenarios/villains
-MARVEL_CHAMPIONS_CAMPAIGNS_AND_SCENARIOS = {
-    "--- Select a Campaign ---": [], # Default empty state
-    "Rise of Red Skull": [
-        "Crossbones",
-        "Absorbing Man",
-        "Taskmaster",
-        "Zola",
-        "Red Skull"
-    ],
-    "Galaxy's Most Wanted": [
-        "Drang",
-        "Collector (Museum)",
-        "Collector (Ship)",
-        "Nebula",
-        "Ronan"
-    ],
-    "Mad Titan's Shadow": [
-        "Ebony Maw",
-        "Tower Defense",
-        "Thanos",
-        "Hela",
-        "Loki"
-    ],
-    "Sinister Motives": [
-        "Sandman",
-        "Venom",
-        "Mysterio",
-        "Sinister Six",
-        "Venom Goblin"
-    ],
-    "Mutant Genesis": [
-        "Sabretooth",
-        "Project Wideawake",
-        "Master Mold",
-        "Mansion Attack",
-        "Magneto"
-    ],
-    "Next Evolution": [
-        "Morlock Siege",
-        "On the Run",
-        "Juggernaut",
-        "Mister Sinister",
-        "Stryfe"
-    ],
-    "Age of Apocalypse": [
-        "Unus",
-        "Four Horseman",
-        "Apocalypse",
-        "Dark Beast",
-        "En Sabah Nur"
-    ],
-    "Agents of S.H.I.E.L.D.": [
-        "Black Widow",
-        "Batroc",
-        "M.O.D.O.K.",
-        "Thunderbolts",
-        "Baron Zero"
-    ]
-    # Add more campaigns as needed
-}
-
-# Define a list of Marvel Champions heroes.
-MARVEL_CHAMPIONS_HEROES_RAW = [
-    "Adam Warlock", "Angel", "Ant-Man", "Bishop", "Black Panther",
-    "Black Widow", "Cable", "Captain America", "Captain Marvel", "Cloak & Dagger",
-    "Colossus", "Cyclops", "Dazzler", "Deadpool", "Doctor Strange",
-    "Doctor Voodoo", "Domino", "Drax", "Falcon", "Gambit", "Gamora",
-    "Ghost-Spider", "Goliath", "Groot", "Hawkeye", "Hulk", "Iceman", "Iron Man",
-    "Ironheart", "Jean Grey", "Jubilee", "Kitty Pryde", "Magik", "Magneto",
-    "Maria Hill", "Miles Morales", "Mister Sinister", "Ms. Marvel", "Nebula",
-    "Nick Fury", "Nightcrawler", "Nova", "Phoenix", "Psylocke", "Quicksilver",
-    "Rocket Racoon", "Rogue", "Ronin", "Scarlet Witch", "Shadowcat", "She-Hulk",
-    "Silk", "Silver Surfer", "SP//dr", "Spider-Ham", "Spider-Man (Peter Parker)",
-    "Spider-Woman", "Spectrum", "Star-Lord", "Storm", "Thor", "Valkyrie",
-    "Venom (Flash Thompson)", "Vision", "War Machine", "Wasp", "Winter Soldier", "Wolverine", "X-23"
-]
-MARVEL_CHAMPIONS_HEROES = ["--- Select a Hero ---"] + sorted(MARVEL_CHAMPIONS_HEROES_RAW)
-
-# Define aspects
-MARVEL_CHAMPIONS_ASPECTS = ["--- Select an Aspect ---", "Aggression", "Justice", "Leadership", "Protection", "Basic", "Pool"]
-
-# Define difficulty options - UPDATED
-MARVEL_CHAMPIONS_DIFFICULTY = [
-    "Standard", "Standard II", "Standard III",
-    "Standard/Expert", "Standard/Expert II",
-    "Standard II/Expert", "Standard II/Expert II",
-    "Standard III/Expert", "Standard III/Expert II",
-    "Heroic"
-]
-
+import os
+import threading
+
+import campaign_changes
+from analytics import DIMENSIONS as ANALYTICS_DIMENSIONS
+from bulk_import import import_plays
+from campaign_io import CampaignDataError, read_campaign_data
+from campaign_merge import CONFLICT_COLUMNS, merge_campaign_data
+from campaign_tracker import CampaignTracker, build_scenario_views, serialize_dataset
+from catalog import (
+    MARVEL_CHAMPIONS_ASPECTS, MARVEL_CHAMPIONS_CAMPAIGNS_AND_SCENARIOS, MARVEL_CHAMPIONS_DIFFICULTY,
+    MARVEL_CHAMPIONS_HEROES, campaign_scenarios
+)
+from journal import CampaignJournal
+from profiler import Profiler
+from reports import build_report, snapshot as report_snapshot
+from scenario_log import LOG_COLUMNS, LOG_SORT_COLUMNS, format_log_row, log_page_frame, page_bounds
+from shared_store import DatasetRegistry, SharedDataset
+from sqlite_backend import SqliteCampaignStore
+from trends import (
+    ALL_CAMPAIGNS, EARLIEST_DATE as TREND_EARLIEST_DATE, GRANULARITIES as TREND_GRANULARITIES, SPLITS as TREND_SPLITS
+)
 
 # --- Constants for Data Persistence ---
 DEFAULT_DATA_FILE_NAME = "marvel_champions_campaign_data.json"
+DEFAULT_COLUMNAR_DATA_FILE_NAME = "marvel_champions_campaign_data.zip"
+# Save format -> (file name, MIME type)
+SAVE_FORMATS = {
+    "JSON": (DEFAULT_DATA_FILE_NAME, "application/json"),
+    "Compact JSON": (DEFAULT_DATA_FILE_NAME, "application/json"),
+    "Columnar": (DEFAULT_COLUMNAR_DATA_FILE_NAME, "application/zip"),
+}
+# Report format -> (file name, MIME type)
+REPORT_FORMATS = {
+    "CSV": ("marvel_champions_campaign_report.zip", "application/zip"),
+    "Excel": ("marvel_champions_campaign_report.xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "HTML": ("marvel_champions_campaign_report.html", "text/html"),
+}
+# How often a report's progress bar is refreshed while it builds
+REPORT_PROGRESS_REFRESH_SECONDS = 0.5
+# Name of the cross-campaign analytics view
+ANALYTICS_VIEW = "Cross-Campaign Analytics"
+# Name of the trends view
+TRENDS_VIEW = "Trends"
+# Name of the full-text search view
+SEARCH_VIEW = "Search"
+# Page sizes offered for the Scenario Log and Boons tables
+LOG_PAGE_SIZES = [10, 25, 50, 100]
+# Optional local database; setting MC_TRACKER_DB connects to it on startup
+DATABASE_PATH_ENV_VAR = "MC_TRACKER_DB"
+DEFAULT_DATABASE_FILE_NAME = "marvel_champions_campaign_data.sqlite3"
+# Optional autosave journal; setting MC_TRACKER_JOURNAL turns it on at startup
+JOURNAL_PATH_ENV_VAR = "MC_TRACKER_JOURNAL"
+DEFAULT_JOURNAL_DIRECTORY = "marvel_champions_campaign_journal"
+# Setting MC_TRACKER_PROFILE turns the section profiler on at startup
+PROFILER_ENV_VAR = "MC_TRACKER_PROFILE"
+# How often a page viewing a shared dataset checks for other sessions' changes
+SHARED_DATASET_REFRESH_SECONDS = 5
 
 # --- Helper Functions ---
+def profile_section(name):
+    """Times a with block as section ``name`` of the profiler (a no-op unless profiling is on)."""
+    profiler = st.session_state.get('profiler')
+    if profiler is None:
+        return contextlib.nullcontext()
+    return profiler.section(name)
+
+
+def profiled(name):
+    """Decorator that times every call of a function as section ``name`` of the profiler."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with profile_section(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# The dataset whose lock the running page section holds (see holding_dataset_lock)
+_locked_dataset = threading.local()
+
+
+def holding_dataset_lock(func):
+    """Decorator that runs a page section while holding the lock of the session's dataset.
+
+    Sessions viewing the same dataset run their scripts on different threads;
+    this keeps one from reading the data while another is changing it. If the
+    section moves the session to another dataset (see view_dataset), it holds
+    that dataset's lock from then on.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        dataset = st.session_state.dataset
+        dataset.lock.acquire()
+        _locked_dataset.dataset = dataset
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _locked_dataset.dataset.lock.release()
+            _locked_dataset.dataset = None
+    return wrapper
+
+
+@st.cache_resource(show_spinner=False)
+def shared_datasets():
+    """The process-wide registry of datasets shared between sessions (see shared_store)."""
+    return DatasetRegistry()
+
+
+def view_dataset(dataset, label=None):
+    """Points the session (and its tracker) at a dataset; its data and views are aliased in session_state.
+
+    A label makes the move undoable (see CampaignTracker.view).
+    """
+    locked = getattr(_locked_dataset, "dataset", None)
+    if locked is not None and locked is not dataset:
+        # Swap the running section's lock over to the new dataset (never holding both, so sessions can't deadlock)
+        locked.lock.release()
+        dataset.lock.acquire()
+        _locked_dataset.dataset = dataset
+    st.session_state.tracker.view(dataset, label)
+    st.session_state.dataset = dataset
+    st.session_state.players = dataset.players
+    st.session_state.update(dataset.views)
+    st.session_state.campaign_boons = dataset.campaign_boons
+    st.session_state.export_cache = dataset.export_cache
+    st.session_state.database = dataset.database
+    st.session_state.journal = dataset.journal
+
+
+def _check_single_backend(kind):
+    dataset = st.session_state.dataset
+    if dataset.database is not None or dataset.journal is not None:
+        other = "local database" if dataset.database is not None else "autosave journal"
+        raise ValueError(f"turn off the {other} before connecting the {kind}.")
+
+
+def connect_database(path):
+    """Keeps the session's data in a local SQLite database from now on.
+
+    Sessions connecting to the same database share one dataset. An empty
+    database is seeded with the current session data; otherwise the
+    database's data replaces what is in the session.
+    """
+    _check_single_backend("database")
+    # Read before opening: the registry builds datasets without taking other datasets' locks
+    current_data = st.session_state.dataset.data()
+
+    def build():
+        database = SqliteCampaignStore(path)
+        try:
+            if database.is_empty():
+                data = current_data
+                database.apply_change(campaign_changes.replace_all(**data))
+            else:
+                data = database.load()
+        except Exception:
+            database.close()
+            raise
+        dataset = SharedDataset(build_scenario_views, data)
+        dataset.attach(database=database)
+        return dataset
+
+    view_dataset(shared_datasets().open(("database", os.path.abspath(path)), build))
+
+
+def disconnect_database():
+    """Stops writing changes to the local database (the session keeps a copy of its data).
+
+    The database stays open for other sessions viewing it; it is closed with
+    the dataset once no session does.
+    """
+    if st.session_state.database is not None:
+        view_dataset(st.session_state.dataset.copy())
+
+
+def _on_use_database_change():
+    try:
+        if st.session_state.use_database:
+            connect_database(st.session_state.database_path)
+        else:
+            disconnect_database()
+    except Exception as e:
+        st.session_state.use_database = False
+        st.session_state.database_error = f"Could not open the database: {e}"
+
+
+def connect_journal(directory):
+    """Autosaves the session's data to a journal directory from now on.
+
+    Sessions autosaving to the same directory share one dataset. An empty
+    directory is seeded with a snapshot of the current session data;
+    otherwise the journal is replayed and its data replaces what is in the session.
+    """
+    _check_single_backend("autosave journal")
+    # Read before opening: the registry builds datasets without taking other datasets' locks
+    current_data = st.session_state.dataset.data()
+
+    def build():
+        journal = CampaignJournal(directory)
+        try:
+            if journal.is_empty():
+                data = current_data
+                journal.compact(**data, background=False)
+            else:
+                data = journal.load()
+        except Exception:
+            journal.close()
+            raise
+        dataset = SharedDataset(build_scenario_views, data)
+        dataset.attach(journal=journal)
+        return dataset
+
+    view_dataset(shared_datasets().open(("journal", os.path.abspath(directory)), build))
+
+
+def disconnect_journal():
+    """Stops autosaving to the journal (the session keeps a copy of its data)."""
+    if st.session_state.journal is not None:
+        view_dataset(st.session_state.dataset.copy())
+
+
+def _on_use_journal_change():
+    try:
+        if st.session_state.use_journal:
+            connect_journal(st.session_state.journal_path)
+        else:
+            disconnect_journal()
+    except Exception as e:
+        st.session_state.use_journal = False
+        st.session_state.journal_error = f"Could not open the autosave journal: {e}"
+
+
 def initialize_campaign_state():
     """Initializes the campaign state in session_state."""
     if 'selected_campaign' not in st.session_state:
         st.session_state.selected_campaign = "--- Select a Campaign ---"
-    if 'players' not in st.session_state:
-        st.session_state.players = []
-    if 'scenarios_played' not in st.session_state:
-        # Each scenario outcome will now include a list of heroes played (with aspect and health),
-        # modular sets, difficulty, villain health (if loss), turns, and threat.
-        st.session_state.scenarios_played = []
-    if 'campaign_boons' not in st.session_state:
-        # Stores campaign-specific boons/notes as a dictionary of lists
-        st.session_state.campaign_boons = {}
+    if 'tracker' not in st.session_state:
+        # The dataset the session views (players, scenarios in an indexed store with the
+        # views maintained from it, campaign boons and the save-file cache) and the
+        # session's undo history. Each scenario outcome includes a list of heroes played
+        # (with aspect and health), modular sets, difficulty, villain health (if loss),
+        # turns, and threat. A session starts with a dataset of its own.
+        st.session_state.tracker = CampaignTracker()
+    # Alias the dataset in session_state (another session may have replaced its data in place)
+    view_dataset(st.session_state.tracker.dataset)
     if 'num_heroes_selected_count' not in st.session_state:
         st.session_state.num_heroes_selected_count = 1
-
-
+    if 'profiler' not in st.session_state:
+        # Opt-in timings of the page sections and helpers (see the sidebar's profiler panel)
+        st.session_state.profiler = Profiler()
+        st.session_state.profiler_enabled = st.session_state.profiler.enabled = PROFILER_ENV_VAR in os.environ
+    if 'database_path' not in st.session_state:
+        # Optional local SQLite database every change is written through to
+        st.session_state.database_path = os.environ.get(DATABASE_PATH_ENV_VAR) or DEFAULT_DATABASE_FILE_NAME
+        st.session_state.use_database = DATABASE_PATH_ENV_VAR in os.environ
+        if st.session_state.use_database:
+            _on_use_database_change()
+    if 'journal_path' not in st.session_state:
+        # Optional autosave: a snapshot plus an append-only journal of changes
+        st.session_state.journal_path = os.environ.get(JOURNAL_PATH_ENV_VAR) or DEFAULT_JOURNAL_DIRECTORY
+        st.session_state.use_journal = JOURNAL_PATH_ENV_VAR in os.environ
+        if st.session_state.use_journal:
+            _on_use_journal_change()
+
+
+def add_player(player_name):
+    """Adds a player to the roster."""
+    st.session_state.tracker.add_player(player_name)
+
+
+@profiled("add_scenario_outcome")
 def add_scenario_outcome(
     campaign_name, scenario_name, heroes_played_data, outcome, difficulty,
     modular_sets, villain_health_remaining, turns_taken, threat_on_scheme, notes, date_played
 ):
     """Adds a new scenario outcome to the campaign log."""
-    st.session_state.scenarios_played.append({
-        "id": str(uuid.uuid4()), # Assign a unique ID for deletion
-        "campaign": campaign_name,
-        "scenario": scenario_name,
-        "heroes_played": heroes_played_data, # List of dicts with hero, aspect, health
-        "outcome": outcome,
-        "difficulty": difficulty,
-        "modular_sets": modular_sets,
-        "villain_health_remaining": villain_health_remaining,
-        "turns_taken": turns_taken,
-        "threat_on_scheme": threat_on_scheme,
-        "notes": notes,
-        "date": date_played.strftime("%Y-%m-%d") # Format date for display
-    })
+    st.session_state.tracker.add_scenario_outcome(
+        campaign_name, scenario_name, heroes_played_data, outcome, difficulty,
+        modular_sets, villain_health_remaining, turns_taken, threat_on_scheme, notes, date_played
+    )
     hero_names_with_aspects = ", ".join([
         f"{h['hero']} ({h['aspect']})" for h in heroes_played_data if h["hero"] != "N/A (Not Selected)"
     ])
-    st.success(f"'{scenario_name}' ({difficulty}) played with '{hero_names_with_aspects}' recorded as {outcome} in {campaign_name}!")
+    flash_message("scenario_form", f"'{scenario_name}' ({difficulty}) played with '{hero_names_with_aspects}' recorded as {outcome} in {campaign_name}!")
 
 
 def add_campaign_note(campaign_name, note_type, note_content, date):
     """Adds a campaign-specific note or boon/choice."""
-    if campaign_name not in st.session_state.campaign_boons:
-        st.session_state.campaign_boons[campaign_name] = []
-    st.session_state.campaign_boons[campaign_name].append({
-        "id": str(uuid.uuid4()), # Assign a unique ID for deletion
-        "date": date.strftime("%Y-%m-%d"),
-        "type": note_type, # e.g., "Boon", "Choice", "Note"
-        "content": note_content
-    })
-    st.success(f"{note_type} added to {campaign_name} campaign log!")
+    st.session_state.tracker.add_campaign_note(campaign_name, note_type, note_content, date)
+    flash_message("campaign_notes", f"{note_type} added to {campaign_name} campaign log!")
+
+
+def delete_scenario(record_id):
+    """Deletes a scenario outcome from the campaign log."""
+    st.session_state.tracker.delete_scenario(record_id)
+
+
+def delete_campaign_note(campaign_name, note_id):
+    """Deletes a campaign note or boon/choice."""
+    st.session_state.tracker.delete_campaign_note(campaign_name, note_id)
+
+
+def replace_campaign_data(data, label):
+    """Replaces the session's players, scenarios and boons with already validated data (undoably).
+
+    A dataset backed by a database or journal is replaced in place (for every
+    session viewing it); otherwise the session moves to a new dataset of its
+    own, leaving the one it may share with other sessions untouched.
+    """
+    tracker = st.session_state.tracker
+    tracker.replace_data(data, label)
+    view_dataset(tracker.dataset)
+
+
+def undo_last_action():
+    """Takes back the session's newest action; returns it, or None if there was nothing to undo."""
+    tracker = st.session_state.tracker
+    action = tracker.undo()
+    view_dataset(tracker.dataset)
+    return action
+
+
+def redo_last_action():
+    """Makes the newest undone action again; returns it, or None if there was nothing to redo."""
+    tracker = st.session_state.tracker
+    action = tracker.redo()
+    view_dataset(tracker.dataset)
+    return action
+
+
+def reset_all_data():
+    """Clears all campaign data (including the local database and autosave journal, if connected); can be undone."""
+    kept_keys = ('tracker', 'database_path', 'use_database', 'journal_path', 'use_journal', 'profiler', 'profiler_enabled')
+    replace_campaign_data({}, "resetting all data")
+    # Clear all other session state variables (the tracker with its new empty dataset, settings and the profiler are kept) to restart the entire app
+    for key in list(st.session_state.keys()):
+        if key not in kept_keys:
+            del st.session_state[key]
 
 # --- Helper Functions for Data Persistence ---
-def get_campaign_data_for_download():
+def campaign_data_download_builder(save_format="JSON"):
+    """Returns a zero-argument callable that produces the save file when called.
+
+    The payload is cached against the data version. The callable only holds the
+    dataset (not st.session_state), so Streamlit can run it on its download
+    thread when the Save button is actually clicked.
+    """
+    dataset = st.session_state.dataset
+    profiler = st.session_state.profiler
+
+    def build():
+        with profiler.section(f"export: {save_format}"):
+            return serialize_dataset(dataset, save_format)
+
+    return lambda: dataset.export_cache.get(save_format, build)
+
+
+def campaigns_with_data():
+    """Names of the campaigns that have plays or notes, in catalog order (then any others)."""
+    scenario_store = st.session_state.scenario_store
+    names = list(MARVEL_CHAMPIONS_CAMPAIGNS_AND_SCENARIOS)[1:]
+    names += [name for name in list(scenario_store.campaigns()) + list(st.session_state.campaign_boons) if name not in names]
+    return [
+        name for name in dict.fromkeys(names)
+        if scenario_store.count_for_campaign(name) or st.session_state.campaign_boons.get(name)
+    ]
+
+
+def start_report_job(report_format, campaigns):
+    """Starts building a report in the background (unless it is built already) and returns its job.
+
+    The report is built from a snapshot of the data taken now, on the report
+    thread pool; finished reports are kept until the data changes.
+    """
+    dataset = st.session_state.dataset
+    profiler = st.session_state.profiler
+    with dataset.lock:
+        data = report_snapshot(dataset.scenario_store, dataset.campaign_boons, campaigns)
+
+        def build(on_progress):
+            with profiler.section(f"report: {report_format}"):
+                return build_report(data, report_format, on_progress)
+
+        return dataset.reports.submit((report_format, tuple(campaigns)), build)
+
+
+@profiled("get_campaign_data_for_download")
+def get_campaign_data_for_download(compact=False):
     """Prepares the current session state data for download as a JSON string."""
-    data_to_save = {
-        "players": st.session_state.players,
-        "scenarios_played": st.session_state.scenarios_played,
-        "campaign_boons": st.session_state.campaign_boons
-    }
-    # Use indent for pretty-printing the JSON
-    return json.dumps(data_to_save, indent=4)
+    return campaign_data_download_builder("Compact JSON" if compact else "JSON")()
 
+@profiled("load_campaign_data")
 def load_campaign_data(uploaded_file):
     """Loads data from an uploaded file into the session state."""
     try:
-        data = json.loads(uploaded_file.read().decode("utf-8"))
-
-        # Initialize unique IDs for older entries if they don't have them
-        for scenario in data.get("scenarios_played", []):
-            if "id" not in scenario:
-                scenario["id"] = str(uuid.uuid4())
-        for campaign_notes in data.get("campaign_boons", {}).values():
-            for note in campaign_notes:
-                if "id" not in note:
-                    note["id"] = str(uuid.uuid4())
-
-        # Update session state with loaded data, providing defaults if keys are missing
-        st.session_state.players = data.get("players", [])
-        st.session_state.scenarios_played = data.get("scenarios_played", [])
-        st.session_state.campaign_boons = data.get("campaign_boons", {})
+        def read():
+            # Parse record by record (validating and upgrading older files as we go) with a progress bar
+            progress_bar = st.progress(0.0, text="Loading campaign data...")
+            data = read_campaign_data(
+                uploaded_file,
+                on_progress=lambda fraction: progress_bar.progress(fraction, text="Loading campaign data...")
+            )
+            progress_bar.empty()
+            if data["migration_report"].migrated:
+                flash_message("sidebar", data["migration_report"].summary())
+            return data
+
+        label = f"loading {getattr(uploaded_file, 'name', 'a campaign data file')}"
+        if st.session_state.dataset.is_durable:
+            # The file replaces what is in the database or journal
+            replace_campaign_data(read(), label)
+        else:
+            # Sessions loading the same file share one copy of its data (parsed once)
+            with uploaded_file.getbuffer() as contents:
+                file_hash = hashlib.sha256(contents).hexdigest()
+            opened = []
+
+            def build():
+                opened.append(SharedDataset(build_scenario_views, read()))
+                return opened[0]
+
+            dataset = shared_datasets().open(("file", file_hash), build)
+            if not opened:
+                # Another session has this file open: this one joins its live data, not the file as saved
+                flash_message(
+                    "sidebar",
+                    "This file is already open in another session, so you are sharing its live data: it includes "
+                    "any changes made there since it was loaded, and your changes show up there too."
+                )
+            view_dataset(dataset, label)
         # Reset selected campaign after loading, or try to select a default/first one
         st.session_state.selected_campaign = list(MARVEL_CHAMPIONS_CAMPAIGNS_AND_SCENARIOS.keys())[0]
 
         st.success("Campaign data loaded successfully! Reloading application...")
         # Use st.rerun() for stable rerun behavior
         st.rerun()
-    except json.JSONDecodeError:
+    except (json.JSONDecodeError, UnicodeDecodeError):
         st.error("Error: The uploaded file is not a valid campaign data file. Please check the file format.")
+    except CampaignDataError as e:
+        st.error(f"Error: The uploaded file is not a valid campaign data file. {e}")
     except Exception as e:
         st.error(f"An unexpected error occurred while loading data: {e}")
 
 
-# --- Main Streamlit Application ---
-def main():
-    st.set_page_config(
-        page_title="Marvel Champions Campaign Tracker",
-        layout="centered",
-        initial_sidebar_state="expanded"
-    )
+@profiled("merge_campaign_files")
+def merge_campaign_files(uploaded_files, include_current_data):
+    """Replaces the session data with the union of several uploaded campaign data files.
+
+    With ``include_current_data`` the current session data is merged in too
+    (first, so it wins conflicts). The merge report is kept in session_state
+    so it can be shown after the rerun.
+    """
+    sources = []
+    if include_current_data:
+        sources.append(("Current data", {
+            "players": st.session_state.players,
+            "scenarios_played": st.session_state.scenario_store.records(),
+            "campaign_boons": st.session_state.campaign_boons,
+        }))
+    try:
+        with st.spinner("Merging campaign data files..."):
+            for uploaded_file in uploaded_files:
+                sources.append((uploaded_file.name, read_campaign_data(uploaded_file, assign_ids=False, compact=False)))
+            report = merge_campaign_data(sources)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        st.error(f"Error: '{uploaded_file.name}' is not a valid campaign data file. Please check the file format.")
+        return
+    except CampaignDataError as e:
+        st.error(f"Error: '{uploaded_file.name}' is not a valid campaign data file. {e}")
+        return
+
+    replace_campaign_data(report.data, f"merging {len(uploaded_files)} files")
+    st.session_state.selected_campaign = list(MARVEL_CHAMPIONS_CAMPAIGNS_AND_SCENARIOS.keys())[0]
+    st.session_state.merge_report = report
+    st.rerun()
+
+
+@profiled("import_scenario_plays")
+def import_scenario_plays(uploaded_file):
+    """Appends the plays in an uploaded CSV or JSON Lines file to the current data.
+
+    The import report (rows rejected or skipped as duplicates) is kept in
+    session_state so it can be shown and downloaded after the rerun.
+    """
+    try:
+        with st.spinner("Importing plays..."):
+            report = import_plays(
+                uploaded_file,
+                uploaded_file.name,
+                st.session_state.content_hash_index,
+                campaign_scenarios(),
+                MARVEL_CHAMPIONS_HEROES[1:],
+                MARVEL_CHAMPIONS_ASPECTS[1:],
+                MARVEL_CHAMPIONS_DIFFICULTY
+            )
+    except CampaignDataError as e:
+        st.error(f"Error: The uploaded file could not be imported. {e}")
+        return
+
+    st.session_state.tracker.add_scenarios(report.records)
+    st.session_state.bulk_import_report = report
+    st.rerun()
+
+
+def render_pager(total_rows, key_prefix):
+    """Shows page size / page number controls and returns the (start, end) rows of the current page."""
+    pager_cols = st.columns([1, 1, 2])
+    with pager_cols[0]:
+        page_size = st.selectbox("Rows per page:", LOG_PAGE_SIZES, index=1, key=f"{key_prefix}_page_size")
+    page_count = page_bounds(total_rows, 1, page_size)[2]
+    with pager_cols[1]:
+        page_number = st.number_input("Page:", min_value=1, max_value=page_count, value=1, step=1, key=f"{key_prefix}_page")
+    start, end, _ = page_bounds(total_rows, page_number, page_size)
+    with pager_cols[2]:
+        st.caption(f"Showing {start + 1 if total_rows else 0}–{end} of {total_rows} (page {min(page_number, page_count)} of {page_count})")
+    return start, end
+
+
+def notes_frame(notes):
+    """Returns campaign notes as a table indexed by note id."""
+    df_boons = pd.DataFrame(notes, columns=["id", "date", "type", "content"]).set_index("id")
+    df_boons.rename(columns={"date": "Date Added", "type": "Type", "content": "Note/Boon/Choice"}, inplace=True)
+    df_boons['Date Added'] = pd.to_datetime(df_boons['Date Added'])
+    return df_boons
+
+
+def format_note_label(note):
+    """Returns the one-line description of a campaign note used by the delete selector."""
+    content = note['content'] if len(note['content']) <= 50 else f"{note['content'][:50]}..."
+    return f"{note['date']} - {note['type']}: {content}"
+
+
+# --- Page Sections ---
+# Each section is a fragment: interacting with one of its widgets reruns only that
+# section. When a section changes the campaign data it ends with a full rerun, so
+# every section shows the new data (the expensive parts of each section are
+# memoized on the data version, so a full rerun stays cheap too). Messages for
+# the user are queued with flash_message() to survive that rerun.
+def flash_message(section, message):
+    """Queues a success message to show in a section after the next rerun."""
+    st.session_state.setdefault(f"flash_{section}", []).append(message)
+
+
+def show_flash_messages(section):
+    """Shows (once) the messages queued for a section."""
+    for message in st.session_state.pop(f"flash_{section}", []):
+        st.success(message)
+
+
+def rerun_app_if_data_changed():
+    """Reruns the whole app if the campaign data changed since the page was last drawn."""
+    if st.session_state.dataset.version != st.session_state.get('rendered_data_version'):
+        st.rerun()
 
-    st.title("🛡️ Marvel Champions Campaign Tracker")
-    st.markdown("Welcome, True Believer! Track your Marvel Champions campaign progress here.")
 
-    initialize_campaign_state()
+@st.fragment(run_every=SHARED_DATASET_REFRESH_SECONDS)
+def watch_shared_dataset():
+    """Redraws the page when another session changed the shared dataset this one views."""
+    rerun_app_if_data_changed()
 
-    # --- Sidebar for Player Management and Data Operations ---
-    with st.sidebar:
-        st.header("Player Management")
-        new_player_name = st.text_input("Add Player Name:", help="Enter a name and click 'Add Player' to add them to this campaign's roster.")
-        if st.button("Add Player"):
-            if new_player_name and new_player_name not in st.session_state.players:
-                st.session_state.players.append(new_player_name)
-                st.success(f"Player '{new_player_name}' added!")
-            elif new_player_name:
-                st.warning("Player already exists or name is empty.")
-
-        st.markdown("**Current Players:**")
-        if st.session_state.players:
-            for player in st.session_state.players:
-                st.write(f"- {player}")
+
+@st.fragment(run_every=REPORT_PROGRESS_REFRESH_SECONDS)
+def watch_report_job(job):
+    """Progress bar of a report being built; redraws the page once it is done."""
+    if job.done:
+        st.rerun()
+    st.progress(job.progress, text=job.stage)
+
+
+def render_reports():
+    """Report export controls: format and campaigns, then build in the background and download."""
+    st.header("Reports")
+    st.caption("Shareable tables of the scenario log, results per scenario, hero plays and boons of each campaign.")
+    report_format = st.selectbox("Report format:", options=list(REPORT_FORMATS), key="report_format")
+    all_campaigns = campaigns_with_data()
+    report_campaigns = st.multiselect(
+        "Campaigns:", all_campaigns, key="report_campaigns", placeholder="All campaigns"
+    ) or all_campaigns
+    if not report_campaigns:
+        st.info("Play some scenarios or add notes to build a report.")
+        return
+
+    job = st.session_state.dataset.reports.get((report_format, tuple(report_campaigns)))
+    if job is not None and job.error is not None:
+        st.error(f"Could not build the report: {job.error}")
+    if job is None or job.error is not None or job.future.cancelled():
+        if not st.button("📊 Build Report", help="Builds the report in the background; you can keep using the app meanwhile."):
+            return
+        job = start_report_job(report_format, report_campaigns)
+    if not job.done:
+        watch_report_job(job)
+        return
+    if job.error is None and not job.future.cancelled():
+        report_file_name, report_mime = REPORT_FORMATS[report_format]
+        st.download_button(
+            label="📄 Download Report",
+            data=job.result,
+            file_name=report_file_name,
+            mime=report_mime,
+            on_click="ignore",
+            help="The report stays ready until the data changes."
+        )
+
+
+@st.fragment
+@holding_dataset_lock
+@profiled("sidebar")
+def render_sidebar():
+    """Sidebar: player management, save/load, the local database, autosave, undo/redo and reset."""
+    st.header("Player Management")
+    new_player_name = st.text_input("Add Player Name:", help="Enter a name and click 'Add Player' to add them to this campaign's roster.")
+    if st.button("Add Player"):
+        if new_player_name and new_player_name not in st.session_state.players:
+            add_player(new_player_name)
+            flash_message("sidebar", f"Player '{new_player_name}' added!")
+            rerun_app_if_data_changed()
+        elif new_player_name:
+            st.warning("Player already exists or name is empty.")
+    show_flash_messages("sidebar")
+
+    st.markdown("**Current Players:**")
+    if st.session_state.players:
+        for player in st.session_state.players:
+            st.write(f"- {player}")
+    else:
+        st.info("No players added yet. Please add at least one player to start.")
+
+    st.divider() # Visual separator
+
+    st.header("Save/Load Data")
+    st.caption("Manage your campaign progress files.")
+    if st.session_state.dataset.key is not None:
+        st.caption("👥 This data is shared with everyone who opened the same file, database or journal; their changes show up here too.")
+
+    # Save Data Button (the file is only generated when the button is clicked)
+    save_format = st.selectbox(
+        "Save format:",
+        options=list(SAVE_FORMATS),
+        key="save_format",
+        help="JSON is human-readable. Compact JSON drops the indentation. Columnar is a much smaller, faster binary file. All of them can be loaded back."
+    )
+    save_file_name, save_mime = SAVE_FORMATS[save_format]
+    st.download_button(
+        label="💾 Save Campaign Progress", # Added icon
+        data=campaign_data_download_builder(save_format),
+        file_name=save_file_name,
+        mime=save_mime,
+        on_click="ignore",
+        help="Download your current campaign data to your computer. You can upload this file later to continue your progress."
+    )
+
+    # Separate uploader and button for better control
+    uploaded_file = st.file_uploader(
+        "⬆️ Choose a Campaign Data File", # Changed label
+        type=["json", "zip"],
+        help=f"Upload a previously saved campaign data file (e.g., '{DEFAULT_DATA_FILE_NAME}')."
+    )
+    if st.button("Load Selected Data"): # Button to trigger load after file is chosen
+        if uploaded_file is not None:
+            load_campaign_data(uploaded_file)
+        else:
+            st.warning("Please choose a file to upload first.")
+
+    merge_files = st.file_uploader(
+        "🔀 Choose Campaign Data Files to Merge",
+        type=["json", "zip"],
+        accept_multiple_files=True,
+        key="merge_files",
+        help="Combine the saves of several tables. Plays and notes found in more than one file are kept once."
+    )
+    include_current_data = st.checkbox(
+        "Include the current data in the merge",
+        value=True,
+        key="merge_include_current_data",
+        help="When unchecked, the merged files replace the current data."
+    )
+    if st.button("Merge Selected Files"):
+        if merge_files:
+            merge_campaign_files(merge_files, include_current_data)
         else:
-            st.info("No players added yet. Please add at least one player to start.")
+            st.warning("Please choose the files to merge first.")
+    if 'merge_report' in st.session_state:
+        report = st.session_state.merge_report
+        st.success(
+            f"Merged {len(report.source_names)} sources into {report.scenario_count} plays and {report.note_count} notes. "
+            f"Skipped {report.duplicate_scenarios} duplicate plays and {report.duplicate_notes} duplicate notes."
+        )
+        if report.conflicts:
+            conflicts = pd.DataFrame(report.conflicts, columns=CONFLICT_COLUMNS)
+            st.warning(f"{len(conflicts)} records had the same id but different contents; the first one was kept.")
+            st.dataframe(conflicts.head(100), hide_index=True, width="stretch")
+            st.download_button(
+                label="📄 Download Conflict Report",
+                data=conflicts.to_csv(index=False),
+                file_name="merge_conflicts.csv",
+                mime="text/csv",
+                on_click="ignore"
+            )
+        st.button("Dismiss Merge Report", on_click=lambda: st.session_state.pop('merge_report', None))
 
-        st.divider() # Visual separator
+    st.divider() # Visual separator
 
-        st.header("Save/Load Data")
-        st.caption("Manage your campaign progress files.")
+    render_reports()
 
-        # Save Data Button
-        st.download_button(
-            label="💾 Save Campaign Progress", # Added icon
-            data=get_campaign_data_for_download(),
-            file_name=DEFAULT_DATA_FILE_NAME,
-            mime="application/json",
-            help="Download your current campaign data to your computer. You can upload this file later to continue your progress."
+    st.divider() # Visual separator
+
+    st.header("Bulk Import")
+    st.caption("Add many plays at once from a spreadsheet (CSV) or a JSON Lines file. Existing data is kept.")
+    bulk_import_file = st.file_uploader(
+        "📥 Choose a Play Log File",
+        type=["csv", "jsonl"],
+        key="bulk_import_file",
+        help="CSV columns: campaign, scenario, outcome, date (YYYY-MM-DD), hero_1, aspect_1, health_remaining_1 ... hero_4, plus optional difficulty, modular_sets, villain_health_remaining, turns_taken, threat_on_scheme, notes and id. JSON Lines files hold one scenario record per line, as in a saved data file."
+    )
+    if st.button("Import Plays"):
+        if bulk_import_file is not None:
+            import_scenario_plays(bulk_import_file)
+        else:
+            st.warning("Please choose a file to import first.")
+    if 'bulk_import_report' in st.session_state:
+        report = st.session_state.bulk_import_report
+        st.success(
+            f"Imported {len(report.records)} plays. Skipped {report.duplicate_count} already recorded "
+            f"and rejected {report.rejected_count} invalid rows."
         )
+        if len(report.skipped_rows):
+            st.dataframe(report.skipped_rows.head(100), hide_index=True, width="stretch")
+            st.download_button(
+                label="📄 Download Import Report",
+                data=report.skipped_rows.to_csv(index=False),
+                file_name="import_report.csv",
+                mime="text/csv",
+                on_click="ignore"
+            )
+        st.button("Dismiss Import Report", on_click=lambda: st.session_state.pop('bulk_import_report', None))
 
-        # Separate uploader and button for better control
-        uploaded_file = st.file_uploader(
-            "⬆️ Choose a Campaign Data File", # Changed label
-            type=["json"],
-            help=f"Upload a previously saved campaign data file (e.g., '{DEFAULT_DATA_FILE_NAME}')."
+    st.divider() # Visual separator
+
+    st.header("Local Database")
+    st.caption("Keep your data in a database file on the server so it survives restarts.")
+    st.text_input(
+        "Database file:",
+        key="database_path",
+        disabled=st.session_state.database is not None,
+        help=f"Path of the SQLite file. Set the {DATABASE_PATH_ENV_VAR} environment variable to connect on startup."
+    )
+    st.toggle(
+        "💽 Keep data in the local database",
+        key="use_database",
+        on_change=_on_use_database_change,
+        help="Every change is written to the database as it happens. An empty database is filled with the current data; otherwise the database's data is loaded."
+    )
+    if 'database_error' in st.session_state:
+        st.error(st.session_state.pop('database_error'))
+
+    st.divider() # Visual separator
+
+    st.header("Autosave")
+    st.caption("Save every change to a journal on the server as it happens; large archives are compacted in the background.")
+    st.text_input(
+        "Journal folder:",
+        key="journal_path",
+        disabled=st.session_state.journal is not None,
+        help=f"Folder for the snapshot and journal files. Set the {JOURNAL_PATH_ENV_VAR} environment variable to turn autosave on at startup."
+    )
+    st.toggle(
+        "📝 Autosave to the journal",
+        key="use_journal",
+        on_change=_on_use_journal_change,
+        help="Each change is appended to the journal. An empty folder is filled with the current data; otherwise the saved data is loaded."
+    )
+    if 'journal_error' in st.session_state:
+        st.error(st.session_state.pop('journal_error'))
+
+    st.divider() # Visual separator
+
+    st.header("Undo / Redo")
+    next_undo = st.session_state.tracker.next_undo()
+    next_redo = st.session_state.tracker.next_redo()
+    undo_column, redo_column = st.columns(2)
+    if undo_column.button(
+        "↩️ Undo", disabled=next_undo is None, width="stretch",
+        help=f"Undo {next_undo.label}." if next_undo is not None else "Nothing to undo."
+    ):
+        flash_message("sidebar", f"Undid {undo_last_action().label}.")
+        st.rerun()
+    if redo_column.button(
+        "↪️ Redo", disabled=next_redo is None, width="stretch",
+        help=f"Redo {next_redo.label}." if next_redo is not None else "Nothing to redo."
+    ):
+        flash_message("sidebar", f"Redid {redo_last_action().label}.")
+        st.rerun()
+
+    st.divider() # Visual separator
+
+    if st.button("🚨 Reset All Data", help="This will clear all current campaign data in the app (Undo brings it back)."):
+        reset_all_data()
+        st.rerun()
+        st.success("All campaign data has been reset.")
+
+    # Turning the database or autosave on may have loaded their data
+    rerun_app_if_data_changed()
+
+
+def render_team_recommendations(selected_heroes_data):
+    """Suggested teams for a scenario and difficulty, completing the heroes already picked in the form."""
+    # Behind a toggle rather than an expander, so nothing is computed or sent to the browser until asked for
+    if st.toggle("💡 Suggest teams", key="show_team_recommendations"):
+        hero_recommendations = st.session_state.hero_recommendations
+        if not hero_recommendations.total_plays:
+            st.info("Record some plays to get team suggestions!")
+            return
+        recommendation_cols = st.columns(2)
+        with recommendation_cols[0]:
+            recommendation_scenario = st.selectbox(
+                "Scenario:",
+                options=MARVEL_CHAMPIONS_CAMPAIGNS_AND_SCENARIOS.get(st.session_state.selected_campaign, []),
+                key="recommendation_scenario"
+            )
+        with recommendation_cols[1]:
+            recommendation_difficulty = st.selectbox("Difficulty:", MARVEL_CHAMPIONS_DIFFICULTY, key="recommendation_difficulty")
+        chosen = [
+            (hero_data["hero"], hero_data["aspect"]) for hero_data in selected_heroes_data
+            if hero_data["hero"] != "--- Select a Hero ---" and hero_data["aspect"] != "--- Select an Aspect ---"
+        ]
+        st.caption(
+            "Win chances are smoothed toward each hero's record elsewhere and the scenario's overall win rate, "
+            "so a few lucky plays don't top the list." + (" Teams include the heroes picked above." if chosen else "")
+        )
+        with profile_section("scenario_form: recommendations"):
+            teams = hero_recommendations.recommend(
+                recommendation_scenario, recommendation_difficulty, len(selected_heroes_data), fixed=chosen
+            )
+            heroes = hero_recommendations.hero_table(recommendation_scenario, recommendation_difficulty)
+        st.dataframe(
+            pd.DataFrame(
+                [[", ".join(f"{hero} ({aspect})" for hero, aspect in team), *values] for team, *values in teams],
+                columns=["Team", "Expected Win %", "Played", "Won", "Avg Turns", "Avg Villain Health Left (Losses)"]
+            ),
+            hide_index=True, width="stretch"
+        )
+        st.markdown("**Best heroes on this scenario:**")
+        st.dataframe(
+            pd.DataFrame(heroes, columns=[
+                "Hero", "Aspect", "Expected Win %", "Played", "Won", "Avg Turns",
+                "Avg Health Left (Wins)", "Avg Villain Health Left (Losses)"
+            ]),
+            hide_index=True, width="stretch"
         )
-        if st.button("Load Selected Data"): # Button to trigger load after file is chosen
-            if uploaded_file is not None:
-                load_campaign_data(uploaded_file)
+
+
+@st.fragment
+@holding_dataset_lock
+@profiled("scenario_form")
+def render_scenario_form():
+    """Form for recording a new scenario outcome."""
+    st.subheader("Record New Scenario Outcome")
+    st.write("Fill in the details of your latest scenario play.")
+
+    # Calculate initial value for num_heroes_selected_count, clamping as needed
+    initial_num_heroes_value = st.session_state.num_heroes_selected_count
+    if 'players' in st.session_state and len(st.session_state.players) > 0:
+        initial_num_heroes_value = min(initial_num_heroes_value, len(st.session_state.players))
+        if initial_num_heroes_value == 0:
+            initial_num_heroes_value = 1
+    else:
+        initial_num_heroes_value = 1 # Default to 1 if no players
+
+
+    # Input for number of heroes playing (outside the form for immediate reactivity)
+    num_heroes_playing_current = st.number_input(
+        "Number of Heroes Playing:",
+        min_value=1,
+        max_value=4, # Typically 1-4 players in Marvel Champions
+        value=initial_num_heroes_value, # Use the calculated initial value
+        step=1,
+        key="num_heroes_input_main" # Widget key
+    )
+    # Update session state with the current value from the widget
+    st.session_state.num_heroes_selected_count = num_heroes_playing_current
+
+
+    selected_heroes_data = []
+    # Dynamically create hero selection dropdowns (outside the form for immediate reactivity)
+    for i in range(st.session_state.num_heroes_selected_count):
+        cols = st.columns(2)
+        with cols[0]:
+            hero_choice = st.selectbox(
+                f"Hero {i+1} Used:",
+                options=MARVEL_CHAMPIONS_HEROES,
+                key=f"hero_select_{i}"
+            )
+        with cols[1]:
+            aspect_choice = st.selectbox(
+                f"Aspect {i+1}:",
+                options=MARVEL_CHAMPIONS_ASPECTS,
+                key=f"aspect_select_{i}"
+            )
+        selected_heroes_data.append({"hero": hero_choice, "aspect": aspect_choice, "health_remaining": "N/A"}) # Health added later if Win
+
+    render_team_recommendations(selected_heroes_data)
+
+    outcome = st.radio("Scenario Outcome:", ("Win", "Loss"), horizontal=True, key="scenario_outcome")
+
+    hero_health_inputs_for_submission = [] # This will store the final data for adding to scenarios_played
+
+    # Conditional health input for winning scenarios - displayed immediately if outcome is 'Win'
+    if outcome == "Win":
+        st.markdown("---")
+        st.subheader("Hero Health Remaining (After Win)")
+        st.write("Enter the health remaining for each hero that played.")
+        for i, hero_data in enumerate(selected_heroes_data):
+            if hero_data["hero"] != "--- Select a Hero ---":
+                health = st.number_input(
+                    f"Health Remaining for **{hero_data['hero']}**:", # Bold hero name
+                    min_value=0,
+                    value=0,
+                    key=f"hero_health_{i}"
+                )
+                hero_health_inputs_for_submission.append({"hero": hero_data['hero'], "aspect": hero_data['aspect'], "health_remaining": health})
+            else:
+                hero_health_inputs_for_submission.append({"hero": "N/A (Not Selected)", "aspect": "N/A", "health_remaining": "N/A"})
+    else: # If outcome is Loss, populate with N/A
+        for hero_data in selected_heroes_data:
+            if hero_data["hero"] != "--- Select a Hero ---":
+                hero_health_inputs_for_submission.append({"hero": hero_data['hero'], "aspect": hero_data['aspect'], "health_remaining": "N/A (Defeated)"})
             else:
-                st.warning("Please choose a file to upload first.")
+                hero_health_inputs_for_submission.append({"hero": "N/A (Not Selected)", "aspect": "N/A", "health_remaining": "N/A"})
+
+    # The form now only contains the fields that need to be submitted together
+    with st.form("scenario_submit_form"): # Changed form key to prevent conflicts
+        st.divider()
+        st.write("Final details for this scenario:")
+
+        col1, col2 = st.columns(2)
+        with col1:
+            selected_scenario = st.selectbox(
+                "Scenario Played:",
+                options=["--- Select a Scenario ---"] + MARVEL_CHAMPIONS_CAMPAIGNS_AND_SCENARIOS.get(
+                    st.session_state.selected_campaign, []
+                ),
+                index=0,
+                key="scenario_select_in_form"
+            )
+        with col2:
+            selected_difficulty = st.selectbox(
+                "Difficulty:",
+                options=MARVEL_CHAMPIONS_DIFFICULTY,
+                key="scenario_difficulty"
+            )
 
-        st.divider() # Visual separator
+        modular_sets = st.text_input("Modular Encounter Sets Used (e.g., Kree Fanatic, Standard II):", key="modular_sets_input")
 
-        if st.button("🚨 Reset All Data", help="This will permanently clear all current campaign data in the app."):
-            # Clear all session state variables to restart the entire app
-            for key in list(st.session_state.keys()):
-                del st.session_state[key]
-            st.rerun()
-            st.success("All campaign data has been reset.")
+        col_stats_1, col_stats_2 = st.columns(2)
+        villain_health = "N/A"
+        if outcome == "Loss":
+            with col_stats_1:
+                villain_health = st.number_input("Villain Health Remaining (on Loss):", min_value=0, value=0, key="villain_health_input")
 
+        with col_stats_2:
+            turns_taken = st.number_input("Turns Taken:", min_value=0, value=0, key="turns_taken_input")
 
-    # --- Main Content Area ---
+        threat_on_scheme = st.number_input("Threat on Main Scheme (at end):", min_value=0, value=0, key="threat_on_scheme_input")
 
-    # Campaign Selection
-    main_content_container = st.container()
-    with main_content_container:
-        st.subheader("Choose Your Campaign")
-        st.session_state.selected_campaign = st.selectbox(
-            "Select the campaign you are currently playing:",
-            options=list(MARVEL_CHAMPIONS_CAMPAIGNS_AND_SCENARIOS.keys()),
-            index=list(MARVEL_CHAMPIONS_CAMPAIGNS_AND_SCENARIOS.keys()).index(st.session_state.selected_campaign)
-        )
 
-        is_campaign_selected = st.session_state.selected_campaign != "--- Select a Campaign ---"
-        are_players_added = len(st.session_state.players) > 0
+        scenario_notes = st.text_area("Notes for this scenario (e.g., specific challenges, campaign choices, defeated villain):")
+        scenario_date_played = st.date_input("Date Played:", datetime.date.today(), key="scenario_date")
+
+        submit_scenario_button = st.form_submit_button("➕ Record Scenario Outcome")
 
-        if not is_campaign_selected or not are_players_added:
-            if not is_campaign_selected:
-                st.warning("Please select a campaign from the dropdown above to proceed.")
-            if not are_players_added:
-                st.warning("Please add at least one player in the sidebar to get started.")
+        if submit_scenario_button:
+            if selected_scenario == "--- Select a Scenario ---":
+                st.error("❌ Please select a scenario to record its outcome.")
+            elif any(h['hero'] == "--- Select a Hero ---" for h in hero_health_inputs_for_submission):
+                st.error("❌ Please select all heroes used for the scenario.")
+            elif any(h['aspect'] == "--- Select an Aspect ---" for h in hero_health_inputs_for_submission):
+                st.error("❌ Please select an aspect for all heroes used.")
+            else:
+                add_scenario_outcome(
+                    st.session_state.selected_campaign,
+                    selected_scenario,
+                    hero_health_inputs_for_submission, # Pass the collected list of hero data
+                    outcome,
+                    selected_difficulty,
+                    modular_sets,
+                    villain_health,
+                    turns_taken,
+                    threat_on_scheme,
+                    scenario_notes,
+                    scenario_date_played
+                )
+                rerun_app_if_data_changed()
+    show_flash_messages("scenario_form")
+
+
+@st.fragment
+@holding_dataset_lock
+@profiled("scenario_log")
+def render_scenario_log():
+    """The selected campaign's Scenario Log, with filters, paging and deletion."""
+    st.subheader("Scenario Log 📜")
+    st.write(f"All recorded scenarios for **{st.session_state.selected_campaign}**.")
+    show_flash_messages("scenario_log")
+
+    scenario_store = st.session_state.scenario_store
+    if scenario_store.count_for_campaign(st.session_state.selected_campaign):
+        # Filtering, sorting and paging happen on the server; only the visible page is sent to the browser
+        filter_cols = st.columns(3)
+        with filter_cols[0]:
+            log_scenario_filter = st.selectbox(
+                "Scenario:",
+                options=["All Scenarios"] + MARVEL_CHAMPIONS_CAMPAIGNS_AND_SCENARIOS.get(st.session_state.selected_campaign, []),
+                key="log_scenario_filter"
+            )
+        with filter_cols[1]:
+            log_outcome_filter = st.selectbox("Outcome:", ["All Outcomes", "Win", "Loss"], key="log_outcome_filter")
+        with filter_cols[2]:
+            log_hero_filter = st.selectbox(
+                "Hero:",
+                options=["All Heroes"] + sorted(
+                    hero for hero, _ in st.session_state.campaign_stats.hero_play_counts(st.session_state.selected_campaign)
+                ),
+                key="log_hero_filter"
+            )
+        sort_cols = st.columns(2)
+        with sort_cols[0]:
+            log_sort_by = st.selectbox("Sort by:", LOG_SORT_COLUMNS, key="log_sort_by")
+        with sort_cols[1]:
+            log_sort_descending = st.radio("Order:", ("Descending", "Ascending"), horizontal=True, key="log_sort_order") == "Descending"
+
+        log_filters = {
+            "scenario": None if log_scenario_filter == "All Scenarios" else log_scenario_filter,
+            "outcome": None if log_outcome_filter == "All Outcomes" else log_outcome_filter,
+        }
+        log_hero = None if log_hero_filter == "All Heroes" else log_hero_filter
+        database = st.session_state.database
+        scenario_log_cache = st.session_state.scenario_log_cache
+        if database is not None:
+            # The database reads only the rows of the page shown, with indexed queries
+            with profile_section("scenario_log: query"):
+                start, end = render_pager(
+                    database.count_scenarios(st.session_state.selected_campaign, hero=log_hero, **log_filters),
+                    "scenario_log"
+                )
+                df_scenarios_page = log_page_frame(database.scenario_page(
+                    st.session_state.selected_campaign, hero=log_hero, **log_filters,
+                    sort_by=log_sort_by, ascending=not log_sort_descending, offset=start, limit=end - start
+                ))
         else:
-            st.info(f"You are currently tracking **{st.session_state.selected_campaign}** with players: **{', '.join(st.session_state.players)}**")
+            hero_record_ids = None
+            if log_hero is not None:
+                hero_record_ids = {
+                    record["id"] for record in scenario_store.for_hero(log_hero, st.session_state.selected_campaign)
+                }
+
+            # Rows are formatted once when recorded; sorted frames are rebuilt only when the data changes
+            with profile_section("scenario_log: query"):
+                df_scenarios = scenario_log_cache.query(
+                    st.session_state.selected_campaign,
+                    scenario_store.version,
+                    **log_filters,
+                    record_ids=hero_record_ids,
+                    sort_by=log_sort_by,
+                    ascending=not log_sort_descending
+                )
+            start, end = render_pager(len(df_scenarios), "scenario_log")
+            df_scenarios_page = df_scenarios.iloc[start:end]
+        with profile_section("scenario_log: table"):
+            st.dataframe(df_scenarios_page, width="stretch", hide_index=True)
+
+        # Deletion UI for Scenarios (options are the record ids of the visible page)
+        st.markdown("---")
+        st.write("**:red[Delete a Scenario Entry:]**")
+
+        selected_scenario_id_to_delete = st.selectbox(
+            "Select a scenario to delete (from the page shown above):",
+            options=[None] + list(df_scenarios_page.index),
+            format_func=lambda record_id: "--- Select Scenario to Delete ---" if record_id is None
+            else scenario_log_cache.label(st.session_state.selected_campaign, record_id),
+            key="delete_scenario_select"
+        )
+
+        if st.button("🗑️ Delete Selected Scenario", key="delete_scenario_button"):
+            if selected_scenario_id_to_delete:
+                delete_scenario(selected_scenario_id_to_delete)
+                flash_message("scenario_log", "Scenario entry deleted!")
+                st.rerun()
+            else:
+                st.warning("Please select a scenario to delete.")
+
+    else:
+        st.info(f"No scenarios recorded yet for **{st.session_state.selected_campaign}**. Time to play!")
 
-            st.divider() # Visual separator
 
-            # --- Record New Scenario Outcome Section ---
-            st.subheader("Record New Scenario Outcome")
-            st.write("Fill in the details of your latest scenario play.")
+@st.fragment
+@holding_dataset_lock
+@profiled("campaign_notes")
+def render_campaign_notes():
+    """The selected campaign's boons and narrative notes."""
+    st.subheader("Campaign Boons & Narrative 📝")
+    st.write(f"Important ongoing effects or narrative notes for **{st.session_state.selected_campaign}**.")
 
-            # Calculate initial value for num_heroes_selected_count, clamping as needed
-            initial_num_heroes_value = st.session_state.num_heroes_selected_count
-            if 'players' in st.session_state and len(st.session_state.players) > 0:
-                initial_num_heroes_value = min(initial_num_heroes_value, len(st.session_state.players))
-                if initial_num_heroes_value == 0:
-                    initial_num_heroes_value = 1
+    note_type_choice = st.radio("Type of Note:", ("Boon", "Narrative Choice", "General Note"), horizontal=True, key="note_type_radio")
+
+    with st.form("campaign_notes_form"):
+        new_campaign_note_content = st.text_area(f"Add a new {note_type_choice.lower()}:", help="e.g., 'Permanent +1 HP for Captain America', 'Obligation: Betrayal added to deck', or a story beat.")
+        note_date = st.date_input("Date (Note Added):", datetime.date.today(), key="note_date_form")
+        submit_note_button = st.form_submit_button("➕ Add Campaign Note")
+
+        if submit_note_button:
+            if new_campaign_note_content:
+                add_campaign_note(st.session_state.selected_campaign, note_type_choice, new_campaign_note_content, note_date)
+                rerun_app_if_data_changed()
             else:
-                initial_num_heroes_value = 1 # Default to 1 if no players
+                st.warning("Please enter content for the note.")
+    show_flash_messages("campaign_notes")
 
+    current_campaign_boons = st.session_state.campaign_boons.get(
+        st.session_state.selected_campaign, []
+    )
+    if current_campaign_boons:
+        notes_by_id = {note['id']: note for note in current_campaign_boons}
+        database = st.session_state.database
+        with profile_section("campaign_notes: table"):
+            if database is not None:
+                # The database reads only the notes of the page shown
+                start, end = render_pager(database.count_notes(st.session_state.selected_campaign), "boons")
+                page_notes = database.note_page(st.session_state.selected_campaign, offset=start, limit=end - start)
+                df_boons_page = notes_frame(page_notes)
+            else:
+                df_boons = notes_frame(current_campaign_boons).sort_values(by='Date Added', ascending=False, kind='stable')
+                start, end = render_pager(len(df_boons), "boons")
+                df_boons_page = df_boons.iloc[start:end]
+            st.dataframe(df_boons_page, width="stretch", hide_index=True)
+
+        # Deletion UI for Boons/Notes (options are the note ids of the visible page)
+        st.markdown("---")
+        st.write("**:red[Delete a Note/Boon Entry:]**")
+
+        selected_boon_id_to_delete = st.selectbox(
+            "Select a note/boon to delete (from the page shown above):",
+            options=[None] + list(df_boons_page.index),
+            format_func=lambda note_id: "--- Select Note/Boon to Delete ---" if note_id is None
+            else format_note_label(notes_by_id[note_id]),
+            key="delete_boon_select"
+        )
 
-            # Input for number of heroes playing (outside the form for immediate reactivity)
-            num_heroes_playing_current = st.number_input(
-                "Number of Heroes Playing:",
-                min_value=1,
-                max_value=4, # Typically 1-4 players in Marvel Champions
-                value=initial_num_heroes_value, # Use the calculated initial value
-                step=1,
-                key="num_heroes_input_main" # Widget key
-            )
-            # Update session state with the current value from the widget
-            st.session_state.num_heroes_selected_count = num_heroes_playing_current
-
-
-            selected_heroes_data = []
-            # Dynamically create hero selection dropdowns (outside the form for immediate reactivity)
-            for i in range(st.session_state.num_heroes_selected_count):
-                cols = st.columns(2)
-                with cols[0]:
-                    hero_choice = st.selectbox(
-                        f"Hero {i+1} Used:",
-                        options=MARVEL_CHAMPIONS_HEROES,
-                        key=f"hero_select_{i}"
-                    )
-                with cols[1]:
-                    aspect_choice = st.selectbox(
-                        f"Aspect {i+1}:",
-                        options=MARVEL_CHAMPIONS_ASPECTS,
-                        key=f"aspect_select_{i}"
-                    )
-                selected_heroes_data.append({"hero": hero_choice, "aspect": aspect_choice, "health_remaining": "N/A"}) # Health added later if Win
-
-
-            outcome = st.radio("Scenario Outcome:", ("Win", "Loss"), horizontal=True, key="scenario_outcome")
-
-            hero_health_inputs_for_submission = [] # This will store the final data for adding to scenarios_played
-
-            # Conditional health input for winning scenarios - displayed immediately if outcome is 'Win'
-            if outcome == "Win":
-                st.markdown("---")
-                st.subheader("Hero Health Remaining (After Win)")
-                st.write("Enter the health remaining for each hero that played.")
-                for i, hero_data in enumerate(selected_heroes_data):
-                    if hero_data["hero"] != "--- Select a Hero ---":
-                        health = st.number_input(
-                            f"Health Remaining for **{hero_data['hero']}**:", # Bold hero name
-                            min_value=0,
-                            value=0,
-                            key=f"hero_health_{i}"
-                        )
-                        hero_health_inputs_for_submission.append({"hero": hero_data['hero'], "aspect": hero_data['aspect'], "health_remaining": health})
-                    else:
-                        hero_health_inputs_for_submission.append({"hero": "N/A (Not Selected)", "aspect": "N/A", "health_remaining": "N/A"})
-            else: # If outcome is Loss, populate with N/A
-                for hero_data in selected_heroes_data:
-                    if hero_data["hero"] != "--- Select a Hero ---":
-                        hero_health_inputs_for_submission.append({"hero": hero_data['hero'], "aspect": hero_data['aspect'], "health_remaining": "N/A (Defeated)"})
-                    else:
-                        hero_health_inputs_for_submission.append({"hero": "N/A (Not Selected)", "aspect": "N/A", "health_remaining": "N/A"})
-
-            # The form now only contains the fields that need to be submitted together
-            with st.form("scenario_submit_form"): # Changed form key to prevent conflicts
-                st.divider()
-                st.write("Final details for this scenario:")
-
-                col1, col2 = st.columns(2)
-                with col1:
-                    selected_scenario = st.selectbox(
-                        "Scenario Played:",
-                        options=["--- Select a Scenario ---"] + MARVEL_CHAMPIONS_CAMPAIGNS_AND_SCENARIOS.get(
-                            st.session_state.selected_campaign, []
-                        ),
-                        index=0,
-                        key="scenario_select_in_form"
-                    )
-                with col2:
-                    selected_difficulty = st.selectbox(
-                        "Difficulty:",
-                        options=MARVEL_CHAMPIONS_DIFFICULTY,
-                        key="scenario_difficulty"
-                    )
-
-                modular_sets = st.text_input("Modular Encounter Sets Used (e.g., Kree Fanatic, Standard II):", key="modular_sets_input")
-
-                col_stats_1, col_stats_2 = st.columns(2)
-                villain_health = "N/A"
-                if outcome == "Loss":
-                    with col_stats_1:
-                        villain_health = st.number_input("Villain Health Remaining (on Loss):", min_value=0, value=0, key="villain_health_input")
-                
-                with col_stats_2:
-                    turns_taken = st.number_input("Turns Taken:", min_value=0, value=0, key="turns_taken_input")
-                
-                threat_on_scheme = st.number_input("Threat on Main Scheme (at end):", min_value=0, value=0, key="threat_on_scheme_input")
-
-
-                scenario_notes = st.text_area("Notes for this scenario (e.g., specific challenges, campaign choices, defeated villain):")
-                scenario_date_played = st.date_input("Date Played:", datetime.date.today(), key="scenario_date")
-
-                submit_scenario_button = st.form_submit_button("➕ Record Scenario Outcome")
-
-                if submit_scenario_button:
-                    if selected_scenario == "--- Select a Scenario ---":
-                        st.error("❌ Please select a scenario to record its outcome.")
-                    elif any(h['hero'] == "--- Select a Hero ---" for h in hero_health_inputs_for_submission):
-                        st.error("❌ Please select all heroes used for the scenario.")
-                    elif any(h['aspect'] == "--- Select an Aspect ---" for h in hero_health_inputs_for_submission):
-                        st.error("❌ Please select an aspect for all heroes used.")
-                    else:
-                        add_scenario_outcome(
-                            st.session_state.selected_campaign,
-                            selected_scenario,
-                            hero_health_inputs_for_submission, # Pass the collected list of hero data
-                            outcome,
-                            selected_difficulty,
-                            modular_sets,
-                            villain_health,
-                            turns_taken,
-                            threat_on_scheme,
-                            scenario_notes,
-                            scenario_date_played
-                        )
-
-            st.divider()
-
-            # --- Campaign Log Section (Scenarios) ---
-            st.subheader("Scenario Log 📜")
-            st.write(f"All recorded scenarios for **{st.session_state.selected_campaign}**.")
-
-            current_campaign_scenarios_played = [
-                s for s in st.session_state.scenarios_played
-                if s["campaign"] == st.session_state.selected_campaign
-            ]
-
-            if current_campaign_scenarios_played:
-                # Prepare data for display and deletion selection
-                display_data = []
-                scenario_options_for_deletion = ["--- Select Scenario to Delete ---"]
-                for record in current_campaign_scenarios_played:
-                    heroes_str = []
-                    for hero_info in record["heroes_played"]:
-                        health_display = ""
-                        if isinstance(hero_info["health_remaining"], int):
-                            health_display = f" ({hero_info['health_remaining']} HP)"
-                        elif hero_info["health_remaining"] == "N/A (Defeated)":
-                             health_display = " (Defeated)"
-                        
-                        aspect_display = f" ({hero_info['aspect']})" if hero_info["aspect"] != "N/A" else ""
-                        
-                        heroes_str.append(f"{hero_info['hero']}{aspect_display}{health_display}")
-                    
-                    # Create a display string for deletion selectbox
-                    scenario_display_str = (
-                        f"{record['date']} - {record['scenario']} ({record['difficulty']}) "
-                        f"with {', '.join(heroes_str)} - {record['outcome']}"
-                    )
-                    scenario_options_for_deletion.append({"id": record['id'], "display": scenario_display_str})
-
-                    display_data.append({
-                        "Campaign": record["campaign"],
-                        "Scenario": record["scenario"],
-                        "Difficulty": record["difficulty"],
-                        "Heroes Used": ", ".join(heroes_str),
-                        "Outcome": record["outcome"],
-                        "Modular Sets": record["modular_sets"] if record["modular_sets"] else "N/A",
-                        "Villain HP Left (Loss)": record["villain_health_remaining"] if record["outcome"] == "Loss" else "N/A",
-                        "Turns Taken": record["turns_taken"],
-                        "Threat on Scheme": record["threat_on_scheme"],
-                        "Notes": record["notes"],
-                        "Date Played": record["date"]
-                    })
-
-                df_scenarios = pd.DataFrame(display_data)
-                df_scenarios['Date Played'] = pd.to_datetime(df_scenarios['Date Played'])
-                df_scenarios = df_scenarios.sort_values(by='Date Played', ascending=False).reset_index(drop=True)
-                st.dataframe(df_scenarios, use_container_width=True)
-
-                # Deletion UI for Scenarios
-                st.markdown("---")
-                st.write("**:red[Delete a Scenario Entry:]**")
-                
-                selected_scenario_to_delete_display = st.selectbox(
-                    "Select a scenario to delete:",
-                    options=[opt["display"] if isinstance(opt, dict) else opt for opt in scenario_options_for_deletion],
-                    key="delete_scenario_select"
+        if st.button("🗑️ Delete Selected Note/Boon", key="delete_boon_button"):
+            if selected_boon_id_to_delete:
+                delete_campaign_note(st.session_state.selected_campaign, selected_boon_id_to_delete)
+                flash_message("campaign_notes", "Note/Boon entry deleted!")
+                st.rerun()
+            else:
+                st.warning("Please select a note/boon to delete.")
+
+    else:
+        st.info(f"No special boons or notes recorded yet for **{st.session_state.selected_campaign}**.")
+
+
+@st.fragment
+@holding_dataset_lock
+@profiled("campaign_statistics")
+def render_campaign_statistics():
+    """Statistics for the selected campaign."""
+    st.subheader("Campaign Statistics 📊")
+    st.write(f"Insights into your plays for **{st.session_state.selected_campaign}**.")
+
+    campaign_stats = st.session_state.campaign_stats
+    wins, losses, total_plays = campaign_stats.overall_record(st.session_state.selected_campaign)
+    if total_plays:
+        # Overall Win/Loss Ratio (maintained incrementally as scenarios are added/deleted)
+        st.markdown(f"**Overall Record:** {wins} Wins / {losses} Losses ({total_plays} Total Plays)")
+
+        # Win/Loss per Scenario
+        with profile_section("campaign_statistics: per scenario"):
+            scenario_results = pd.DataFrame(
+                campaign_stats.scenario_results(st.session_state.selected_campaign),
+                columns=['scenario', 'Win', 'Loss', 'Total', 'Win %']
+            ).set_index('scenario')
+
+            st.markdown("---")
+            st.markdown("**Win/Loss Per Scenario:**")
+            st.dataframe(scenario_results, width="stretch")
+
+        # Most Played Heroes (for this campaign)
+        hero_play_counts = campaign_stats.hero_play_counts(st.session_state.selected_campaign)
+
+        if hero_play_counts:
+            hero_play_counts = pd.DataFrame(hero_play_counts, columns=['Hero', 'Plays'])
+            st.markdown("---")
+            st.markdown("**Most Played Heroes (in this Campaign):**")
+            st.dataframe(hero_play_counts, width="stretch")
+
+            # Simple bar chart for hero plays
+            with profile_section("campaign_statistics: bar chart"):
+                st.bar_chart(hero_play_counts.set_index('Hero'))
+
+            # Hero/aspect performance, computed with vectorized groupbys over the participation table
+            st.markdown("---")
+            st.markdown("**Hero & Aspect Performance (in this Campaign):**")
+            with profile_section("campaign_statistics: hero & aspect"):
+                st.dataframe(
+                    st.session_state.participation_table.hero_aspect_stats(st.session_state.selected_campaign),
+                    width="stretch"
                 )
-                
-                # Find the ID of the selected scenario
-                selected_scenario_id_to_delete = None
-                for opt in scenario_options_for_deletion:
-                    if isinstance(opt, dict) and opt["display"] == selected_scenario_to_delete_display:
-                        selected_scenario_id_to_delete = opt["id"]
-                        break
-
-                if st.button("🗑️ Delete Selected Scenario", key="delete_scenario_button"):
-                    if selected_scenario_id_to_delete:
-                        st.session_state.scenarios_played = [
-                            s for s in st.session_state.scenarios_played
-                            if s.get("id") != selected_scenario_id_to_delete
-                        ]
-                        st.success("Scenario entry deleted!")
-                        st.rerun()
-                    else:
-                        st.warning("Please select a scenario to delete.")
+        else:
+            st.info("No hero data available yet for statistics in this campaign.")
+
+    else:
+        st.info("Play some scenarios to see campaign statistics!")
+
+
+@st.fragment
+@holding_dataset_lock
+@profiled("analytics")
+def render_analytics():
+    """Cross-campaign analytics: win-rate matrices, health averages and turns/threat distributions."""
+    st.subheader("Cross-Campaign Analytics 🔎")
+    st.write("Slice every recorded play, across all campaigns.")
+
+    analytics_cubes = st.session_state.analytics_cubes
+    if not len(st.session_state.scenario_store):
+        st.info("Play some scenarios to see analytics!")
+        return
+
+    # Filters (an empty selection keeps everything)
+    filters = {}
+    filter_cols = st.columns(2)
+    for i, dimension in enumerate(["Campaign", "Villain", "Difficulty", "Hero", "Aspect"]):
+        with filter_cols[i % 2]:
+            filters[dimension] = st.multiselect(
+                f"{dimension}:", analytics_cubes.values(dimension), key=f"analytics_filter_{dimension}",
+                placeholder=f"All {dimension.lower()}s" if dimension != "Hero" else "All heroes"
+            )
 
-            else:
-                st.info(f"No scenarios recorded yet for **{st.session_state.selected_campaign}**. Time to play!")
-
-            st.divider()
-
-            # --- Campaign Boons & Notes Section ---
-            st.subheader("Campaign Boons & Narrative 📝")
-            st.write(f"Important ongoing effects or narrative notes for **{st.session_state.selected_campaign}**.")
-            
-            note_type_choice = st.radio("Type of Note:", ("Boon", "Narrative Choice", "General Note"), horizontal=True, key="note_type_radio")
-            
-            with st.form("campaign_notes_form"):
-                new_campaign_note_content = st.text_area(f"Add a new {note_type_choice.lower()}:", help="e.g., 'Permanent +1 HP for Captain America', 'Obligation: Betrayal added to deck', or a story beat.")
-                note_date = st.date_input("Date (Note Added):", datetime.date.today(), key="note_date_form")
-                submit_note_button = st.form_submit_button("➕ Add Campaign Note")
-
-                if submit_note_button:
-                    if new_campaign_note_content:
-                        add_campaign_note(st.session_state.selected_campaign, note_type_choice, new_campaign_note_content, note_date)
-                    else:
-                        st.warning("Please enter content for the note.")
-
-            current_campaign_boons = st.session_state.campaign_boons.get(
-                st.session_state.selected_campaign, []
+    st.markdown("---")
+    st.markdown("**Win Rate Matrix:**")
+    dimensions = list(ANALYTICS_DIMENSIONS)
+    matrix_cols = st.columns(3)
+    with matrix_cols[0]:
+        matrix_rows = st.selectbox("Rows:", dimensions, index=dimensions.index("Hero"), key="analytics_rows")
+    with matrix_cols[1]:
+        column_options = [dimension for dimension in dimensions if dimension != matrix_rows]
+        matrix_columns = st.selectbox("Columns:", column_options, key="analytics_columns")
+    with matrix_cols[2]:
+        min_plays = st.number_input("Min plays per cell:", min_value=1, value=5, step=1, key="analytics_min_plays")
+    with profile_section("analytics: win rate matrix"):
+        win_rates, plays = analytics_cubes.win_rate_matrix(matrix_rows, matrix_columns, filters, min_plays)
+        show_plays = st.toggle("Show play counts instead of win %", key="analytics_show_plays")
+        st.dataframe(plays if show_plays else win_rates, width="stretch")
+
+    st.markdown("---")
+    st.markdown("**Average Hero Health Remaining (Wins):**")
+    health_by = st.multiselect(
+        "Group by:", dimensions, default=["Hero"], key="analytics_health_by"
+    ) or ["Hero"]
+    with profile_section("analytics: health averages"):
+        st.dataframe(analytics_cubes.health_averages(health_by, filters), width="stretch")
+
+    st.markdown("---")
+    st.markdown("**Turns Taken and Threat Distributions:**")
+    st.caption("Counted per play; the hero and aspect filters don't apply.")
+    with profile_section("analytics: distributions"):
+        distribution_cols = st.columns(2)
+        with distribution_cols[0]:
+            st.markdown("Turns taken")
+            st.bar_chart(analytics_cubes.distribution("turns_taken", filters))
+        with distribution_cols[1]:
+            st.markdown("Threat on main scheme")
+            st.bar_chart(analytics_cubes.distribution("threat_on_scheme", filters))
+
+
+@st.fragment
+@holding_dataset_lock
+@profiled("trends")
+def render_trends():
+    """Win rate and turns taken over time, overall or per scenario / difficulty."""
+    st.subheader("Trends 📈")
+    st.write("How your results change over time.")
+
+    if not len(st.session_state.scenario_store):
+        st.info("Play some scenarios to see trends!")
+        return
+
+    trend_cols = st.columns(2)
+    with trend_cols[0]:
+        trend_campaign = st.selectbox(
+            "Campaign:", [ALL_CAMPAIGNS] + campaigns_with_data(), key="trends_campaign",
+            format_func=lambda name: "All Campaigns" if name is ALL_CAMPAIGNS else name
+        )
+        trend_split = st.radio("Lines:", list(TREND_SPLITS), horizontal=True, key="trends_split")
+    with trend_cols[1]:
+        trend_granularity = st.radio("Buckets:", list(TREND_GRANULARITIES), index=1, horizontal=True, key="trends_granularity")
+        trend_window = st.number_input(
+            "Rolling window (buckets):", min_value=1, max_value=365, value=4, step=1, key="trends_window",
+            help="Win % and turns taken are computed over this many buckets up to each point."
+        )
+
+    with profile_section("trends: buckets"):
+        trend = st.session_state.trend_buckets.trend(trend_campaign, trend_split, trend_granularity, trend_window)
+    if trend["Plays"].empty:
+        st.info("No plays with a date yet for this selection.")
+        return
+    if st.session_state.trend_buckets.out_of_range_plays:
+        st.caption(
+            f"{st.session_state.trend_buckets.out_of_range_plays} plays dated before {TREND_EARLIEST_DATE:%Y} "
+            "or more than a year ahead are left out (check their dates)."
+        )
+    if trend["days_per_point"] > TREND_GRANULARITIES[trend_granularity]:
+        st.caption(f"Long history: each point covers {trend['days_per_point']} days.")
+
+    with profile_section("trends: charts"):
+        st.markdown("**Win % (rolling):**")
+        st.line_chart(trend["Win %"], y_label="Win %")
+        st.markdown("**Average Turns Taken (rolling):**")
+        st.line_chart(trend["Turns Taken"], y_label="Turns")
+        st.markdown("**Plays:**")
+        st.bar_chart(trend["Plays"], y_label="Plays")
+
+
+@st.fragment
+@holding_dataset_lock
+@profiled("search")
+def render_search():
+    """Full-text search over scenario notes, modular sets and campaign boons/notes."""
+    st.subheader("Search 🔍")
+    st.write("Find plays and campaign notes by the words in them, across all campaigns.")
+
+    search_cols = st.columns([3, 2])
+    with search_cols[0]:
+        query = st.text_input(
+            "Search for:", key="search_query", placeholder="e.g. combo, hydra, betrayal",
+            help="Matches scenario notes, modular sets and campaign boons/notes containing every word (words match by their start)."
+        )
+    with search_cols[1]:
+        search_campaigns = st.multiselect(
+            "Campaigns:", list(MARVEL_CHAMPIONS_CAMPAIGNS_AND_SCENARIOS)[1:], key="search_campaigns",
+            placeholder="All campaigns"
+        )
+    if not query.strip():
+        st.info("Type one or more words to search for.")
+        return
+
+    with profile_section("search: query"):
+        scenario_ids, notes = st.session_state.search_index.search(query, search_campaigns or None)
+    st.caption(f"{len(scenario_ids)} scenario plays and {len(notes)} campaign notes match.")
+
+    st.markdown("**Scenario Plays:**")
+    if scenario_ids:
+        scenario_store = st.session_state.scenario_store
+        records = sorted(
+            (scenario_store.get(record_id) for record_id in scenario_ids),
+            key=lambda record: record.get("date") or "", reverse=True
+        )
+        start, end = render_pager(len(records), "search_scenarios")
+        page = records[start:end]
+        st.dataframe(
+            pd.DataFrame([format_log_row(record) for record in page], columns=LOG_COLUMNS),
+            width="stretch", hide_index=True
+        )
+    else:
+        st.caption("No scenario plays match.")
+
+    st.markdown("**Campaign Boons & Notes:**")
+    if notes:
+        notes = sorted(notes, key=lambda campaign_note: campaign_note[1].get("date") or "", reverse=True)
+        start, end = render_pager(len(notes), "search_notes")
+        st.dataframe(
+            pd.DataFrame(
+                [
+                    {"Campaign": campaign, "Date Added": note.get("date"), "Type": note.get("type"), "Note/Boon/Choice": note.get("content")}
+                    for campaign, note in notes[start:end]
+                ],
+                columns=["Campaign", "Date Added", "Type", "Note/Boon/Choice"]
+            ),
+            width="stretch", hide_index=True
+        )
+    else:
+        st.caption("No campaign notes match.")
+
+
+def _on_profiler_enabled_change():
+    st.session_state.profiler.enabled = st.session_state.profiler_enabled
+
+
+def render_profiler_panel():
+    """Collapsible sidebar panel with the profiler's per-section timings and trace export."""
+    profiler = st.session_state.profiler
+    with st.expander("⏱️ Performance Profiler"):
+        st.toggle(
+            "Time each section",
+            key="profiler_enabled",
+            on_change=_on_profiler_enabled_change,
+            help=f"Times every page section and data helper on each rerun. Set the {PROFILER_ENV_VAR} environment variable to turn it on at startup."
+        )
+        summary = profiler.summary()
+        if not summary:
+            st.caption("No timings recorded yet." if profiler.enabled else "Turn on profiling to record timings.")
+            return
+        st.caption(f"Recent timings over {profiler.rerun_count} reruns (this panel shows them up to the previous rerun).")
+        st.dataframe(pd.DataFrame(summary), hide_index=True, width="stretch")
+        histogram_section = st.selectbox("Histogram of:", [row["Section"] for row in summary], key="profiler_histogram_section")
+        st.bar_chart(pd.DataFrame(profiler.histogram(histogram_section), columns=["Duration", "Count"]).set_index("Duration"))
+        st.download_button(
+            "📄 Download Timings (JSON)", data=profiler.to_json, file_name="profile.json",
+            mime="application/json", on_click="ignore"
+        )
+        st.download_button(
+            "📄 Download Chrome Trace", data=profiler.to_chrome_trace, file_name="profile_trace.json",
+            mime="application/json", on_click="ignore",
+            help="Open in chrome://tracing or ui.perfetto.dev."
+        )
+        st.button("Clear Timings", on_click=profiler.reset)
+
+
+# --- Main Streamlit Application ---
+@profiled("main (full rerun)")
+def main():
+    st.set_page_config(
+        page_title="Marvel Champions Campaign Tracker",
+        layout="centered",
+        initial_sidebar_state="expanded"
+    )
+
+    st.title("🛡️ Marvel Champions Campaign Tracker")
+    st.markdown("Welcome, True Believer! Track your Marvel Champions campaign progress here.")
+
+    initialize_campaign_state()
+    st.session_state.profiler.begin_rerun()
+    st.session_state.rendered_data_version = st.session_state.dataset.version
+
+    # --- Sidebar for Player Management and Data Operations ---
+    with st.sidebar:
+        render_sidebar()
+
+
+    # --- Main Content Area ---
+
+    app_view = st.radio("View:", ["Campaign Tracker", ANALYTICS_VIEW, TRENDS_VIEW, SEARCH_VIEW], horizontal=True, key="app_view")
+    if app_view == ANALYTICS_VIEW:
+        render_analytics()
+    elif app_view == TRENDS_VIEW:
+        render_trends()
+    elif app_view == SEARCH_VIEW:
+        render_search()
+    else:
+        # Campaign Selection
+        main_content_container = st.container()
+        with main_content_container:
+            st.subheader("Choose Your Campaign")
+            st.session_state.selected_campaign = st.selectbox(
+                "Select the campaign you are currently playing:",
+                options=list(MARVEL_CHAMPIONS_CAMPAIGNS_AND_SCENARIOS.keys()),
+                index=list(MARVEL_CHAMPIONS_CAMPAIGNS_AND_SCENARIOS.keys()).index(st.session_state.selected_campaign)
             )
-            if current_campaign_boons:
-                df_boons = pd.DataFrame(current_campaign_boons)
-                df_boons.rename(columns={"date": "Date Added", "type": "Type", "content": "Note/Boon/Choice"}, inplace=True)
-                df_boons['Date Added'] = pd.to_datetime(df_boons['Date Added'])
-                df_boons = df_boons.sort_values(by='Date Added', ascending=False).reset_index(drop=True)
-                st.dataframe(df_boons, use_container_width=True)
-
-                # Deletion UI for Boons/Notes
-                st.markdown("---")
-                st.write("**:red[Delete a Note/Boon Entry:]**")
-
-                boon_options_for_deletion = ["--- Select Note/Boon to Delete ---"]
-                for note in current_campaign_boons:
-                    boon_display_str = (
-                        f"{note['date']} - {note['type']}: "
-                        f"{note['content'][:50]}..." if len(note['content']) > 50 else note['content']
-                    )
-                    boon_options_for_deletion.append({"id": note['id'], "display": boon_display_str})
-                
-                selected_boon_to_delete_display = st.selectbox(
-                    "Select a note/boon to delete:",
-                    options=[opt["display"] if isinstance(opt, dict) else opt for opt in boon_options_for_deletion],
-                    key="delete_boon_select"
-                )
 
-                selected_boon_id_to_delete = None
-                for opt in boon_options_for_deletion:
-                    if isinstance(opt, dict) and opt["display"] == selected_boon_to_delete_display:
-                        selected_boon_id_to_delete = opt["id"]
-                        break
-
-                if st.button("🗑️ Delete Selected Note/Boon", key="delete_boon_button"):
-                    if selected_boon_id_to_delete:
-                        st.session_state.campaign_boons[st.session_state.selected_campaign] = [
-                            n for n in st.session_state.campaign_boons[st.session_state.selected_campaign]
-                            if n.get("id") != selected_boon_id_to_delete
-                        ]
-                        st.success("Note/Boon entry deleted!")
-                        st.rerun()
-                    else:
-                        st.warning("Please select a note/boon to delete.")
+            is_campaign_selected = st.session_state.selected_campaign != "--- Select a Campaign ---"
+            are_players_added = len(st.session_state.players) > 0
 
+            if not is_campaign_selected or not are_players_added:
+                if not is_campaign_selected:
+                    st.warning("Please select a campaign from the dropdown above to proceed.")
+                if not are_players_added:
+                    st.warning("Please add at least one player in the sidebar to get started.")
             else:
-                st.info(f"No special boons or notes recorded yet for **{st.session_state.selected_campaign}**.")
-
-            st.divider()
-
-            # --- Campaign Statistics Section ---
-            st.subheader("Campaign Statistics 📊")
-            st.write(f"Insights into your plays for **{st.session_state.selected_campaign}**.")
-
-            if current_campaign_scenarios_played:
-                # Overall Win/Loss Ratio
-                total_plays = len(current_campaign_scenarios_played)
-                wins = sum(1 for s in current_campaign_scenarios_played if s['outcome'] == 'Win')
-                losses = total_plays - wins
-                
-                st.markdown(f"**Overall Record:** {wins} Wins / {losses} Losses ({total_plays} Total Plays)")
-                
-                # Win/Loss per Scenario
-                scenario_outcomes = pd.DataFrame(current_campaign_scenarios_played).groupby(['scenario', 'outcome']).size().unstack(fill_value=0)
-                if 'Win' not in scenario_outcomes.columns:
-                    scenario_outcomes['Win'] = 0
-                if 'Loss' not in scenario_outcomes.columns:
-                    scenario_outcomes['Loss'] = 0
-                scenario_outcomes['Total'] = scenario_outcomes['Win'] + scenario_outcomes['Loss']
-                scenario_outcomes['Win %'] = (scenario_outcomes['Win'] / scenario_outcomes['Total'] * 100).fillna(0).round(2)
-
-                st.markdown("---")
-                st.markdown("**Win/Loss Per Scenario:**")
-                st.dataframe(scenario_outcomes[['Win', 'Loss', 'Total', 'Win %']].sort_values(by='Win %', ascending=False), use_container_width=True)
-
-                # Most Played Heroes (for this campaign)
-                all_heroes_played_in_campaign = []
-                for record in current_campaign_scenarios_played:
-                    for hero_info in record['heroes_played']:
-                        if hero_info['hero'] != "N/A (Not Selected)":
-                            all_heroes_played_in_campaign.append(hero_info['hero'])
-                
-                if all_heroes_played_in_campaign:
-                    hero_play_counts = pd.Series(all_heroes_played_in_campaign).value_counts().reset_index()
-                    hero_play_counts.columns = ['Hero', 'Plays']
-                    st.markdown("---")
-                    st.markdown("**Most Played Heroes (in this Campaign):**")
-                    st.dataframe(hero_play_counts, use_container_width=True)
-                    
-                    # Simple bar chart for hero plays
-                    st.bar_chart(hero_play_counts.set_index('Hero'))
-                else:
-                    st.info("No hero data available yet for statistics in this campaign.")
+                st.info(f"You are currently tracking **{st.session_state.selected_campaign}** with players: **{', '.join(st.session_state.players)}**")
 
-            else:
-                st.info("Play some scenarios to see campaign statistics!")
+                st.divider() # Visual separator
+
+                # --- Record New Scenario Outcome Section ---
+                render_scenario_form()
+
+                st.divider()
+
+                # --- Campaign Log Section (Scenarios) ---
+                render_scenario_log()
+
+                st.divider()
+
+                # --- Campaign Boons & Notes Section ---
+                render_campaign_notes()
+
+                st.divider()
+
+                # --- Campaign Statistics Section ---
+                render_campaign_statistics()
+
+    with st.sidebar:
+        render_profiler_panel()
+
+    # Pick up the changes other sessions make to a shared dataset
+    if st.session_state.dataset.key is not None:
+        watch_shared_dataset()
 
 
 # --- Run the app ---
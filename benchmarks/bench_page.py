@@ -0,0 +1,65 @@
+# bench_page.py
+"""Streamlit page driven by run_benchmarks.py through AppTest.
+
+It renders the app exactly like app.py does, but first runs the action named
+in ``st.session_state.bench_action`` (load a file, build the download, add
+or delete a play, render the statistics section) and records how long the
+action and ``main()`` took in ``st.session_state.bench_timings`` (seconds).
+"""
+import datetime
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import streamlit as st
+
+import app
+
+BENCH_CAMPAIGN = "Rise of Red Skull"
+
+
+def timed(name, func, *args):
+    start = time.perf_counter()
+    try:
+        return func(*args)
+    finally:
+        st.session_state.bench_timings[name] = time.perf_counter() - start
+
+
+def add_play():
+    app.add_scenario_outcome(
+        BENCH_CAMPAIGN, "Zola",
+        [{"hero": "Thor", "aspect": "Justice", "health_remaining": 5}],
+        "Win", "Standard", "Kree Fanatic", "N/A", 9, 3, "Benchmark play", datetime.date.today()
+    )
+    st.session_state.bench_added_id = st.session_state.scenario_store.records()[-1]["id"]
+
+
+def run_action(action):
+    if action == "load":
+        upload = st.session_state.pop("bench_upload")
+        upload.seek(0)
+        timed("load_campaign_data", app.load_campaign_data, upload)
+    elif action == "download":
+        timed("get_campaign_data_for_download", app.get_campaign_data_for_download)
+        timed("get_campaign_data_for_download_cached", app.get_campaign_data_for_download)
+    elif action == "add":
+        timed("add_scenario", add_play)
+        # Right after a change, the statistics have to be recomputed
+        timed("statistics_section_after_change", app.render_campaign_statistics)
+    elif action == "delete":
+        timed("delete_scenario", app.delete_scenario, st.session_state.bench_added_id)
+    elif action == "statistics":
+        timed("statistics_section", app.render_campaign_statistics)
+
+
+st.session_state.setdefault("bench_timings", {})
+app.initialize_campaign_state()
+# Loading a file resets the selected campaign; keep the benchmark on one
+st.session_state.selected_campaign = BENCH_CAMPAIGN
+bench_action = st.session_state.pop("bench_action", None)
+if bench_action is not None:
+    run_action(bench_action)
+timed("main", app.main)
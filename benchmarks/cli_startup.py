@@ -0,0 +1,71 @@
+# cli_startup.py
+"""Wall time of command line runs (see cli.py), including the interpreter's startup.
+
+Each command runs as a new process, the way a script would call it, on a
+seeded data file (see generate_data.py) of each size; the median of a few runs
+is reported, plus whether importing the command line loaded pandas or Streamlit:
+
+    python benchmarks/cli_startup.py --sizes 0 1000 10000
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARKS_DIR)
+CLI = os.path.join(REPO_DIR, "cli.py")
+sys.path.insert(0, REPO_DIR)
+
+from campaign_io import serialize_campaign_data
+from generate_data import generate_campaign_data
+
+DEFAULT_SIZES = [0, 1000, 10000]
+RUNS = 5
+RECORD_ARGS = ["--campaign", "Rise of Red Skull", "--scenario", "Zola", "--hero", "Thor:Justice:5", "--outcome", "Win"]
+
+
+def _median_seconds(args):
+    times = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, CLI, *args], check=True, stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return round(statistics.median(times), 3)
+
+
+def heavy_imports():
+    """The heavy packages importing the command line loads (none, if the core stays lean)."""
+    check = "import sys, cli; print(' '.join(m for m in ('pandas', 'numpy', 'streamlit') if m in sys.modules))"
+    return subprocess.run([sys.executable, "-c", check], cwd=REPO_DIR, check=True, capture_output=True, text=True).stdout.split()
+
+
+def measure(num_plays, seed, directory):
+    path = os.path.join(directory, f"campaign_{num_plays}.json")
+    data = generate_campaign_data(num_plays, seed)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(serialize_campaign_data(data["players"], data["scenarios_played"], data["campaign_boons"]))
+    return {
+        "plays": num_plays,
+        "stats_seconds": _median_seconds(["stats", path]),
+        "record_seconds": _median_seconds(["record", path, *RECORD_ARGS]),
+        "merge_seconds": _median_seconds(["merge", os.path.join(directory, "merged.json"), path, path]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time command line runs on synthetic campaign data.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="numbers of plays")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print({"heavy_imports": heavy_imports()}, flush=True)
+    with tempfile.TemporaryDirectory() as directory:
+        for num_plays in args.sizes:
+            print(measure(num_plays, args.seed, directory), flush=True)
+
+
+if __name__ == "__main__":
+    main()
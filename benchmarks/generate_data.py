@@ -0,0 +1,109 @@
+# generate_data.py
+"""Seeded generator of realistic campaign data for the benchmarks.
+
+Plays are drawn from the app's own catalogs (campaigns and their scenarios,
+heroes, aspects and difficulties), with the shapes the app records: 1-4
+distinct heroes per play, health left on wins, villain health left on losses,
+turns, threat, modular sets, notes and dates spread over a few years. Each
+campaign also gets a handful of boons and narrative notes.
+
+The same size and seed always give the same data:
+
+    python benchmarks/generate_data.py 10000 --seed 1 -o campaign_data.json
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from campaign_io import serialize_campaign_data
+from catalog import MARVEL_CHAMPIONS_ASPECTS, MARVEL_CHAMPIONS_DIFFICULTY, MARVEL_CHAMPIONS_HEROES, campaign_scenarios
+
+CAMPAIGNS = campaign_scenarios()
+HEROES = MARVEL_CHAMPIONS_HEROES[1:]
+ASPECTS = MARVEL_CHAMPIONS_ASPECTS[1:]
+# Most plays are on the lower difficulties
+DIFFICULTY_WEIGHTS = [30, 20, 8, 10, 4, 4, 2, 2, 1, 1]
+MODULAR_SETS = ["Standard", "Kree Fanatic", "Hydra Assault", "Weapon Master", "Legions of Hydra", "Ship Command", ""]
+NOTE_TYPES = ["Boon", "Narrative Choice", "General Note"]
+FIRST_DATE = datetime.date(2019, 1, 1)
+DATE_RANGE_DAYS = 6 * 365
+PLAYERS = ["Alice", "Bob", "Carol", "Dave"]
+NOTES_PER_PLAYS = 20  # one campaign note per this many plays (at least 2 per campaign)
+
+
+def generate_play(rng):
+    campaign = rng.choice(list(CAMPAIGNS))
+    scenarios = CAMPAIGNS[campaign]
+    # Later scenarios are played (and lost) a little less often
+    scenario_index = min(int(rng.expovariate(0.6)), len(scenarios) - 1)
+    win = rng.random() < 0.65 - 0.08 * scenario_index
+    heroes_played = [
+        {
+            "hero": hero,
+            "aspect": rng.choice(ASPECTS),
+            "health_remaining": rng.randint(0, 14) if win else "N/A (Defeated)"
+        }
+        for hero in rng.sample(HEROES, rng.choices([1, 2, 3, 4], weights=[35, 40, 15, 10])[0])
+    ]
+    return {
+        "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+        "campaign": campaign,
+        "scenario": scenarios[scenario_index],
+        "heroes_played": heroes_played,
+        "outcome": "Win" if win else "Loss",
+        "difficulty": rng.choices(MARVEL_CHAMPIONS_DIFFICULTY, weights=DIFFICULTY_WEIGHTS)[0],
+        "modular_sets": rng.choice(MODULAR_SETS),
+        "villain_health_remaining": "N/A" if win else rng.randint(1, 40),
+        "turns_taken": rng.randint(4, 16),
+        "threat_on_scheme": rng.randint(0, 14),
+        "notes": rng.choice(["", "", "Close game.", "Great combo with the team.", "Lost to a bad encounter draw."]),
+        "date": (FIRST_DATE + datetime.timedelta(days=rng.randrange(DATE_RANGE_DAYS))).isoformat()
+    }
+
+
+def generate_note(rng):
+    return {
+        "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+        "date": (FIRST_DATE + datetime.timedelta(days=rng.randrange(DATE_RANGE_DAYS))).isoformat(),
+        "type": rng.choice(NOTE_TYPES),
+        "content": rng.choice([
+            "Permanent +1 HP for the team.", "Obligation added to the encounter deck.",
+            "Chose to rescue the hostages.", "Kept the Infinity Stone."
+        ])
+    }
+
+
+def generate_campaign_data(num_plays, seed=0):
+    """Returns {"players", "scenarios_played", "campaign_boons"} with ``num_plays`` plays."""
+    rng = random.Random(seed)
+    scenarios_played = [generate_play(rng) for _ in range(num_plays)]
+    notes_per_campaign = max(2, num_plays // NOTES_PER_PLAYS // len(CAMPAIGNS))
+    campaign_boons = {
+        campaign: [generate_note(rng) for _ in range(notes_per_campaign)] for campaign in CAMPAIGNS
+    }
+    return {"players": PLAYERS[:], "scenarios_played": scenarios_played, "campaign_boons": campaign_boons}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic campaign data file.")
+    parser.add_argument("plays", type=int, help="number of scenario plays")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", default="-", help="output file (default: stdout)")
+    args = parser.parse_args()
+
+    data = generate_campaign_data(args.plays, args.seed)
+    contents = serialize_campaign_data(data["players"], data["scenarios_played"], data["campaign_boons"])
+    if args.output == "-":
+        sys.stdout.write(contents)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(contents)
+
+
+if __name__ == "__main__":
+    main()
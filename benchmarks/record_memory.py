@@ -0,0 +1,80 @@
+# record_memory.py
+"""Memory of the scenario records: dicts as loaded from a JSON file vs compact ScenarioRecords.
+
+For each size, seeded data (see generate_data.py) is saved as JSON and loaded
+back with read_campaign_data, which gives the dict-of-dicts layout (already
+sharing repeated strings, as the app loads files). The same records are then
+converted to ScenarioRecords. tracemalloc measures the memory each layout
+holds (with tracing on, so the times are only comparable with each other),
+plus the ScenarioStore with its indexes, which is what the app keeps:
+
+    python benchmarks/record_memory.py --sizes 100000 1000000
+"""
+import argparse
+import gc
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from campaign_io import read_campaign_data, serialize_campaign_data
+from compact_records import ScenarioRecord
+from generate_data import generate_campaign_data
+from scenario_store import ScenarioStore
+
+DEFAULT_SIZES = [100000, 1000000]
+
+
+def _traced(build):
+    """Returns (result, bytes still allocated by build(), seconds)."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    seconds = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size, seconds
+
+
+def measure(num_plays, seed):
+    data = generate_campaign_data(num_plays, seed)
+    payload = serialize_campaign_data(data["players"], data["scenarios_played"], data["campaign_boons"], compact=True)
+    del data
+    gc.collect()
+
+    dicts, dict_bytes, load_seconds = _traced(
+        lambda: read_campaign_data(io.BytesIO(payload.encode("utf-8")), compact=False)["scenarios_played"]
+    )
+    del payload
+    compact, compact_bytes, convert_seconds = _traced(lambda: [ScenarioRecord(record) for record in dicts])
+    del compact
+    store, store_bytes, store_seconds = _traced(lambda: ScenarioStore(dicts))
+    assert [record.to_dict() for record in store] == dicts, "compact records must convert back losslessly"
+    return {
+        "plays": num_plays,
+        "dict_records_mb": round(dict_bytes / (1 << 20), 1),
+        "compact_records_mb": round(compact_bytes / (1 << 20), 1),
+        "dict_bytes_per_play": round(dict_bytes / num_plays),
+        "compact_bytes_per_play": round(compact_bytes / num_plays),
+        "compact_store_mb": round(store_bytes / (1 << 20), 1),
+        "load_seconds": round(load_seconds, 2),
+        "convert_seconds": round(convert_seconds, 2),
+        "store_seconds": round(store_seconds, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the memory of dict and compact scenario records.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="numbers of plays")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    for num_plays in args.sizes:
+        print(measure(num_plays, args.seed), flush=True)
+
+
+if __name__ == "__main__":
+    main()
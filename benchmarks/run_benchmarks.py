@@ -0,0 +1,190 @@
+# run_benchmarks.py
+"""Benchmarks of the app's rerun, save/load and statistics paths on synthetic data.
+
+For each dataset size, a fresh Python process generates seeded data (see
+generate_data.py), drives the app headlessly with Streamlit's AppTest harness
+(through bench_page.py) and measures:
+
+* load_campaign_data on the JSON save file, then the cold rerun that follows
+* the median of several warm reruns (flipping the outcome radio)
+* get_campaign_data_for_download, freshly built and cached
+* adding a play (and the statistics section right after) and deleting it
+* the statistics section on its own
+* the process's peak memory
+
+Results are written as JSON, so runs of two versions can be compared:
+
+    python benchmarks/run_benchmarks.py --sizes 100 10000 -o before.json
+    python benchmarks/run_benchmarks.py --sizes 100 10000 -o after.json --compare before.json
+"""
+import argparse
+import datetime
+import io
+import json
+import logging
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+import warnings
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARKS_DIR)
+BENCH_PAGE = os.path.join(BENCHMARKS_DIR, "bench_page.py")
+DEFAULT_SIZES = [100, 1000, 10000, 100000]
+WARM_RERUNS = 5
+RESULTS_FORMAT_VERSION = 1
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+
+
+def _run(app_test, action=None, **session_values):
+    """Runs the page once (optionally with an action) and returns its recorded timings."""
+    app_test.session_state["bench_timings"] = {}
+    if action is not None:
+        app_test.session_state["bench_action"] = action
+    for key, value in session_values.items():
+        app_test.session_state[key] = value
+    app_test.run()
+    if app_test.exception:
+        raise RuntimeError(f"The app raised an exception during '{action or 'rerun'}': {app_test.exception[0].value}")
+    return app_test.session_state["bench_timings"]
+
+
+def benchmark_size(num_plays, seed):
+    """Runs every benchmark on one dataset size; returns a dict of results (times in milliseconds)."""
+    sys.path.insert(0, REPO_DIR)
+    from streamlit.testing.v1 import AppTest
+
+    from campaign_io import serialize_campaign_data
+    from generate_data import generate_campaign_data
+
+    start = time.perf_counter()
+    data = generate_campaign_data(num_plays, seed)
+    payload = serialize_campaign_data(data["players"], data["scenarios_played"], data["campaign_boons"]).encode("utf-8")
+    generate_seconds = time.perf_counter() - start
+    del data
+
+    timings = {}
+    app_test = AppTest.from_file(BENCH_PAGE, default_timeout=3600)
+    _run(app_test)
+
+    # Loading reruns the app; that first rerun builds every view from scratch
+    load_timings = _run(app_test, "load", bench_upload=io.BytesIO(payload))
+    timings["load_campaign_data"] = load_timings["load_campaign_data"]
+    timings["cold_rerun"] = load_timings["main"]
+    del payload
+
+    warm = []
+    for i in range(WARM_RERUNS):
+        app_test.radio(key="scenario_outcome").set_value("Loss" if i % 2 == 0 else "Win")
+        warm.append(_run(app_test)["main"])
+    timings["warm_rerun"] = statistics.median(warm)
+
+    timings.update((name, seconds) for name, seconds in _run(app_test, "download").items() if name != "main")
+    add_timings = _run(app_test, "add")
+    timings["add_scenario"] = add_timings["add_scenario"]
+    timings["statistics_section_after_change"] = add_timings["statistics_section_after_change"]
+    timings["rerun_after_add"] = add_timings["main"]
+    delete_timings = _run(app_test, "delete")
+    timings["delete_scenario"] = delete_timings["delete_scenario"]
+    timings["rerun_after_delete"] = delete_timings["main"]
+    timings["statistics_section"] = _run(app_test, "statistics")["statistics_section"]
+
+    return {
+        "plays": num_plays,
+        "seed": seed,
+        "generate_seconds": round(generate_seconds, 3),
+        "timings_ms": {name: round(seconds * 1000, 2) for name, seconds in timings.items()},
+        "peak_memory_mb": round(_peak_rss_mb(), 1),
+    }
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(sizes, seed):
+    """Benchmarks each size in its own process (so peak memory is per size)."""
+    results = []
+    for num_plays in sizes:
+        print(f"Benchmarking {num_plays} plays...", file=sys.stderr)
+        worker = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--worker", "--sizes", str(num_plays), "--seed", str(seed)],
+            capture_output=True, text=True
+        )
+        if worker.returncode != 0:
+            raise RuntimeError(f"The benchmark for {num_plays} plays failed:\n{worker.stderr}")
+        results.append(json.loads(worker.stdout))
+    import streamlit
+    return {
+        "format_version": RESULTS_FORMAT_VERSION,
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "streamlit": streamlit.__version__,
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+def compare(baseline, current):
+    """Returns a text table of current vs baseline timings for the sizes both runs have."""
+    baseline_by_size = {result["plays"]: result for result in baseline["results"]}
+    lines = [f"{'plays':>8}  {'measurement':<38} {'baseline ms':>12} {'current ms':>12} {'ratio':>7}"]
+    for result in current["results"]:
+        base = baseline_by_size.get(result["plays"])
+        if base is None:
+            continue
+        rows = list(result["timings_ms"].items()) + [("peak_memory_mb", result["peak_memory_mb"])]
+        base_values = dict(base["timings_ms"], peak_memory_mb=base["peak_memory_mb"])
+        for name, value in rows:
+            if name in base_values:
+                old = base_values[name]
+                ratio = f"{value / old:.2f}x" if old else "-"
+                lines.append(f"{result['plays']:>8}  {name:<38} {old:>12.1f} {value:>12.1f} {ratio:>7}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the campaign tracker on synthetic data.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="numbers of plays (up to 1000000)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", default="-", help="results JSON file (default: stdout)")
+    parser.add_argument("--compare", metavar="BASELINE", help="results JSON of an earlier run to compare with")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        # AppTest logs a warning per rerun about running outside `streamlit run`
+        logging.disable(logging.WARNING)
+        warnings.filterwarnings("ignore")
+        json.dump(benchmark_size(args.sizes[0], args.seed), sys.stdout)
+        return
+
+    results = run_benchmarks(args.sizes, args.seed)
+    output = json.dumps(results, indent=2)
+    if args.output == "-":
+        print(output)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            print(compare(json.load(f), results), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
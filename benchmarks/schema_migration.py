@@ -0,0 +1,70 @@
+# schema_migration.py
+"""Load time of current files vs legacy files that need upgrading (see schema_migrations).
+
+For each size, seeded data (see generate_data.py) is saved once as a current
+file and once as a legacy (version 1) file: no "schema_version" header, no
+ids on half the plays and on every note, and hero health saved as strings.
+Both are loaded with read_campaign_data, and the migration report gives the
+time of each upgrade step:
+
+    python benchmarks/schema_migration.py --sizes 100000 1000000
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from campaign_io import read_campaign_data, serialize_campaign_data
+from generate_data import generate_campaign_data
+
+DEFAULT_SIZES = [100000, 1000000]
+
+
+def _legacy_payload(data):
+    for i, record in enumerate(data["scenarios_played"]):
+        if i % 2:
+            del record["id"]
+        for hero_info in record["heroes_played"]:
+            if isinstance(hero_info["health_remaining"], int):
+                hero_info["health_remaining"] = str(hero_info["health_remaining"])
+    for notes in data["campaign_boons"].values():
+        for note in notes:
+            del note["id"]
+    return json.dumps(data, separators=(",", ":")).encode("utf-8")
+
+
+def _timed_load(payload):
+    start = time.perf_counter()
+    data = read_campaign_data(io.BytesIO(payload))
+    return data["migration_report"], time.perf_counter() - start
+
+
+def measure(num_plays, seed):
+    data = generate_campaign_data(num_plays, seed)
+    current = serialize_campaign_data(data["players"], data["scenarios_played"], data["campaign_boons"], compact=True)
+    _, current_seconds = _timed_load(current.encode("utf-8"))
+    del current
+    report, legacy_seconds = _timed_load(_legacy_payload(data))
+    return {
+        "plays": num_plays,
+        "current_load_seconds": round(current_seconds, 2),
+        "legacy_load_seconds": round(legacy_seconds, 2),
+        "steps": {name: {"changed": changed, "seconds": round(seconds, 3)} for name, (changed, seconds) in report.steps.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare loading current and legacy campaign data files.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="numbers of plays")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    for num_plays in args.sizes:
+        print(measure(num_plays, args.seed), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+# bulk_import.py
+"""Bulk import of scenario plays from CSV or JSON Lines files.
+
+CSV files have one play per row, with these columns (only the first five are
+required; blank numbers count as 0, like in the form):
+
+    campaign, scenario, outcome, date (YYYY-MM-DD), hero_1, aspect_1,
+    health_remaining_1, ... hero_4, aspect_4, health_remaining_4,
+    difficulty, modular_sets, villain_health_remaining, turns_taken,
+    threat_on_scheme, notes, id
+
+JSON Lines files have one scenario record per line, shaped like the records in
+a saved campaign data file (with a "heroes_played" list).
+
+All rows are checked against the app's catalogs in one vectorized pass over
+pandas columns. Plays that are already recorded are skipped: by id when the
+row has one, otherwise by a hash of its content, looked up in the dataset's
+ContentHashIndex. Rejected and skipped rows
+are listed, with the reason, in the import report.
+"""
+import json
+import uuid
+from collections.abc import Mapping
+
+import pandas as pd
+
+from campaign_io import CampaignDataError
+from scenario_store import NOT_SELECTED_HERO
+
+MAX_HEROES = 4
+REQUIRED_CSV_COLUMNS = ("campaign", "scenario", "outcome", "date", "hero_1")
+PLAY_COLUMNS = [
+    "id", "campaign", "scenario", "difficulty", "outcome", "date", "modular_sets",
+    "villain_health_remaining", "turns_taken", "threat_on_scheme", "notes"
+]
+HERO_COLUMNS = ["hero", "aspect", "health_remaining"]
+OUTCOMES = ("Win", "Loss")
+DEFEATED_HEALTH = "N/A (Defeated)"
+REPORT_COLUMNS = ["Row", "Id", "Status", "Reason"]
+REJECTED = "Rejected"
+DUPLICATE = "Duplicate"
+
+
+class ImportReport:
+    """Result of a bulk import: the new records plus the rows that were left out."""
+
+    def __init__(self, records, skipped_rows):
+        self.records = records
+        self.skipped_rows = skipped_rows  # DataFrame with REPORT_COLUMNS
+
+    @property
+    def rejected_count(self):
+        return int((self.skipped_rows["Status"] == REJECTED).sum())
+
+    @property
+    def duplicate_count(self):
+        return int((self.skipped_rows["Status"] == DUPLICATE).sum())
+
+
+# --- Reading ---
+def _cell(value):
+    """Returns a cell as text ("" for missing values)."""
+    if value is None:
+        return ""
+    return value if isinstance(value, str) else str(value)
+
+
+def _read_csv(binary_stream):
+    try:
+        frame = pd.read_csv(binary_stream, dtype=str, keep_default_na=False, skipinitialspace=True)
+    except (pd.errors.ParserError, pd.errors.EmptyDataError, UnicodeDecodeError) as e:
+        raise CampaignDataError(f"The CSV file could not be read ({e}).") from e
+    frame.columns = [str(column).strip().lower() for column in frame.columns]
+    missing = [column for column in REQUIRED_CSV_COLUMNS if column not in frame.columns]
+    if missing:
+        raise CampaignDataError(f"The CSV file is missing required columns: {', '.join(missing)}.")
+
+    # Spreadsheet rows start at 2 (row 1 is the header)
+    rows = pd.RangeIndex(2, len(frame) + 2)
+    plays = pd.DataFrame({"row": rows})
+    for column in PLAY_COLUMNS:
+        plays[column] = frame[column].str.strip().to_numpy() if column in frame.columns else ""
+
+    hero_frames = []
+    for position in range(1, MAX_HEROES + 1):
+        if f"hero_{position}" not in frame.columns:
+            continue
+        heroes = pd.DataFrame({"row": rows, "position": position})
+        for column in HERO_COLUMNS:
+            name = f"{column}_{position}"
+            heroes[column] = frame[name].str.strip().to_numpy() if name in frame.columns else ""
+        hero_frames.append(heroes[heroes["hero"] != ""])
+    return plays, pd.concat(hero_frames, ignore_index=True), pd.DataFrame(columns=["row", "reason"])
+
+
+def _read_jsonl(binary_stream):
+    play_rows = []
+    hero_rows = []
+    errors = []
+    for row, line in enumerate(binary_stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            errors.append((row, "Not valid JSON"))
+            continue
+        if not isinstance(record, dict):
+            errors.append((row, "Not a JSON object"))
+            continue
+        heroes_played = record.get("heroes_played", [])
+        if not isinstance(heroes_played, list) or not all(isinstance(h, dict) for h in heroes_played):
+            errors.append((row, "heroes_played must be a list of objects"))
+            continue
+        play_rows.append([row] + [_cell(record.get(column)) for column in PLAY_COLUMNS])
+        for position, hero_info in enumerate(heroes_played, start=1):
+            hero_rows.append([row, position] + [_cell(hero_info.get(column)) for column in HERO_COLUMNS])
+    return (
+        pd.DataFrame(play_rows, columns=["row"] + PLAY_COLUMNS),
+        pd.DataFrame(hero_rows, columns=["row", "position"] + HERO_COLUMNS),
+        pd.DataFrame(errors, columns=["row", "reason"])
+    )
+
+
+# --- Validation ---
+def _counts(values):
+    """Parses whole, non-negative numbers; blanks count as 0. Returns (numbers, invalid mask)."""
+    numbers = pd.to_numeric(values.mask(values == "", "0"), errors="coerce")
+    invalid = numbers.isna() | (numbers < 0) | (numbers % 1 != 0)
+    return numbers.fillna(0).astype("int64"), invalid
+
+
+def _validate(plays, heroes, catalogs):
+    """Returns (per-row reasons, normalized play and hero columns); one vectorized pass per check."""
+    campaigns_and_scenarios, hero_names, aspects, difficulties = catalogs
+    reasons = []
+
+    def reject(mask, message):
+        if mask.any():
+            flagged = plays.loc[mask, "row"]
+            text = message if isinstance(message, str) else message[mask]
+            reasons.append(pd.DataFrame({"row": flagged.to_numpy(), "reason": text}))
+
+    known_campaign = plays["campaign"].isin(list(campaigns_and_scenarios))
+    reject(~known_campaign, "Unknown campaign '" + plays["campaign"] + "'")
+    valid_pairs = pd.MultiIndex.from_tuples(
+        [(campaign, scenario) for campaign, scenarios in campaigns_and_scenarios.items() for scenario in scenarios]
+    )
+    known_scenario = pd.MultiIndex.from_arrays([plays["campaign"], plays["scenario"]]).isin(valid_pairs)
+    reject(known_campaign & ~known_scenario, "Scenario '" + plays["scenario"] + "' is not part of the campaign")
+
+    plays["difficulty"] = plays["difficulty"].mask(plays["difficulty"] == "", difficulties[0])
+    reject(~plays["difficulty"].isin(difficulties), "Unknown difficulty '" + plays["difficulty"] + "'")
+    reject(~plays["outcome"].isin(OUTCOMES), "Outcome must be Win or Loss")
+
+    dates = pd.to_datetime(plays["date"], format="%Y-%m-%d", errors="coerce")
+    reject(dates.isna(), "Date must be YYYY-MM-DD")
+    plays["date"] = dates.dt.strftime("%Y-%m-%d")
+
+    for column in ("turns_taken", "threat_on_scheme"):
+        plays[column], invalid = _counts(plays[column])
+        reject(invalid, f"{column} must be a whole number of at least 0")
+    is_loss = plays["outcome"] == "Loss"
+    villain_health, invalid = _counts(plays["villain_health_remaining"])
+    reject(is_loss & invalid, "villain_health_remaining must be a whole number of at least 0")
+    plays["villain_health_remaining"] = villain_health.astype(object).where(is_loss, "N/A")
+
+    # Hero checks run over the flattened hero rows, then fold back onto their play
+    hero_count = heroes.groupby("row").size().reindex(plays["row"], fill_value=0).to_numpy()
+    reject(hero_count == 0, "No heroes")
+    reject(hero_count > MAX_HEROES, f"More than {MAX_HEROES} heroes")
+
+    win_by_row = pd.Series(plays["outcome"].to_numpy() == "Win", index=plays["row"])
+    hero_win = win_by_row.reindex(heroes["row"]).fillna(False).to_numpy(dtype=bool)
+    not_selected = heroes["hero"] == NOT_SELECTED_HERO
+    health, invalid_health = _counts(heroes["health_remaining"])
+    hero_problems = [
+        (~not_selected & ~heroes["hero"].isin(hero_names), "Unknown hero '" + heroes["hero"] + "'"),
+        (~not_selected & ~heroes["aspect"].isin(aspects), "Unknown aspect '" + heroes["aspect"] + "' for " + heroes["hero"]),
+        (~not_selected & hero_win & invalid_health, "Health remaining for " + heroes["hero"] + " must be a whole number of at least 0"),
+    ]
+    for mask, message in hero_problems:
+        if mask.any():
+            reasons.append(pd.DataFrame({"row": heroes.loc[mask, "row"].to_numpy(), "reason": message[mask].to_numpy()}))
+    heroes["aspect"] = heroes["aspect"].where(~not_selected, "N/A")
+    heroes["health_remaining"] = (
+        health.astype(object).where(hero_win, DEFEATED_HEALTH).where(~not_selected, "N/A")
+    )
+    return reasons
+
+
+def content_hash(record):
+    """Hashes a record's content (everything but its id); equal plays hash alike within a process."""
+    return hash(tuple(_cell(record.get(column)) for column in PLAY_COLUMNS[1:]) + (";".join(
+        f"{_cell(h.get('hero'))}|{_cell(h.get('aspect'))}|{_cell(h.get('health_remaining'))}"
+        for h in record.get("heroes_played", ()) if isinstance(h, Mapping)
+    ),))
+
+
+class ContentHashIndex:
+    """The content hashes of the recorded plays, for spotting imported rows that are already recorded.
+
+    Subscribed to the ScenarioStore. The hashes are only computed the first
+    time an import needs them (most sessions never import); from then on each
+    added or removed record updates them, so an import hashes its own rows
+    and none of the archive.
+    """
+
+    def __init__(self, store):
+        self._store = store
+        self._counts = None  # content hash -> number of records with that content, once built
+
+    # --- ScenarioStore listener interface ---
+    def record_added(self, record):
+        if self._counts is not None:
+            key = content_hash(record)
+            self._counts[key] = self._counts.get(key, 0) + 1
+
+    def record_removed(self, record):
+        if self._counts is not None:
+            key = content_hash(record)
+            if self._counts[key] == 1:
+                del self._counts[key]
+            else:
+                self._counts[key] -= 1
+
+    # --- Reads ---
+    def has_id(self, record_id):
+        return record_id in self._store
+
+    def has_content(self, key):
+        """True if a recorded play has the content hash ``key`` (see content_hash)."""
+        if self._counts is None:
+            self._counts = {}
+            for record in self._store:
+                key_of_record = content_hash(record)
+                self._counts[key_of_record] = self._counts.get(key_of_record, 0) + 1
+        return key in self._counts
+
+
+def _build_records(plays, heroes):
+    heroes_by_row = {}
+    for row, hero, aspect, health in zip(
+        heroes["row"].to_numpy(), heroes["hero"].to_numpy(), heroes["aspect"].to_numpy(),
+        heroes["health_remaining"].to_numpy()
+    ):
+        heroes_by_row.setdefault(row, []).append({
+            "hero": hero, "aspect": aspect, "health_remaining": health if type(health) is str else int(health)
+        })
+    records = []
+    for values in zip(*(plays[column].to_numpy() for column in ["row"] + PLAY_COLUMNS)):
+        row, record_id, campaign, scenario, difficulty, outcome, date, modular_sets, villain_health, turns, threat, notes = values
+        records.append({
+            "id": record_id or str(uuid.uuid4()),
+            "campaign": campaign,
+            "scenario": scenario,
+            "heroes_played": heroes_by_row.get(row, []),
+            "outcome": outcome,
+            "difficulty": difficulty,
+            "modular_sets": modular_sets,
+            "villain_health_remaining": villain_health if type(villain_health) is str else int(villain_health),
+            "turns_taken": int(turns),
+            "threat_on_scheme": int(threat),
+            "notes": notes,
+            "date": date
+        })
+    return records
+
+
+def import_plays(binary_stream, file_name, recorded_plays, campaigns_and_scenarios, heroes, aspects, difficulties):
+    """Reads, validates and de-duplicates the plays in a CSV or JSON Lines file.
+
+    ``recorded_plays`` is the ContentHashIndex of the plays already recorded;
+    rows matching one of them (or an earlier row of the file) are skipped. The catalogs are the
+    values the app offers, without their "--- Select ... ---" placeholders.
+    Returns an ImportReport; raises CampaignDataError if the file can't be
+    read at all.
+    """
+    if file_name.lower().endswith(".csv"):
+        plays, hero_rows, read_errors = _read_csv(binary_stream)
+    else:
+        plays, hero_rows, read_errors = _read_jsonl(binary_stream)
+    if plays.empty:
+        # Nothing to validate (a header-only CSV); lines that couldn't be read are still reported
+        return ImportReport([], pd.DataFrame({
+            "Row": read_errors["row"].to_numpy(), "Id": "", "Status": REJECTED, "Reason": read_errors["reason"].to_numpy()
+        }, columns=REPORT_COLUMNS))
+    hero_rows = hero_rows.sort_values(["row", "position"], kind="stable").reset_index(drop=True)
+
+    reasons = _validate(plays, hero_rows, (campaigns_and_scenarios, heroes, aspects, difficulties))
+    reasons = pd.concat([read_errors] + reasons, ignore_index=True) if reasons else read_errors
+    rejected = reasons.groupby("row", sort=True)["reason"].agg("; ".join)
+
+    valid = ~plays["row"].isin(rejected.index)
+    valid_plays = plays[valid]
+    records = _build_records(valid_plays, hero_rows[hero_rows["row"].isin(valid_plays["row"])])
+
+    # Duplicates: by id when the row has one, otherwise by content
+    ids = valid_plays["id"].reset_index(drop=True)
+    has_id = ids != ""
+    recorded = ids.map(recorded_plays.has_id).astype(bool)
+    duplicate = has_id & (recorded | (ids.duplicated() & has_id))
+    if not has_id.all():
+        hashes = pd.Series([content_hash(record) for record in records], dtype=object)
+        recorded = hashes.map(recorded_plays.has_content).astype(bool)
+        duplicate |= ~has_id & (recorded | (hashes.duplicated() & ~has_id))
+    duplicate_mask = duplicate.to_numpy()
+    records = [record for record, is_duplicate in zip(records, duplicate_mask) if not is_duplicate]
+
+    id_by_row = plays.set_index("row")["id"]
+    skipped = pd.concat([
+        pd.DataFrame({"Row": rejected.index, "Status": REJECTED, "Reason": rejected.to_numpy()}),
+        pd.DataFrame({
+            "Row": valid_plays["row"].to_numpy()[duplicate_mask],
+            "Status": DUPLICATE,
+            "Reason": "Already recorded"
+        }),
+    ], ignore_index=True).sort_values("Row", kind="stable").reset_index(drop=True)
+    skipped.insert(1, "Id", skipped["Row"].map(id_by_row).fillna(""))
+    return ImportReport(records, skipped[REPORT_COLUMNS])
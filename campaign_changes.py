@@ -0,0 +1,56 @@
+# campaign_changes.py
+"""Small dicts describing a single change to the campaign data.
+
+Every mutation in the app (adding a player, recording, importing or deleting
+scenarios, adding or deleting a note, loading or resetting all data) is
+described by one of these, so persistence backends can apply exactly that
+change instead of re-saving the whole archive. The undo history keeps them
+too, with the change that takes each one back (see undo_history).
+"""
+
+ADD_PLAYER = "add_player"
+ADD_SCENARIO = "add_scenario"
+ADD_SCENARIOS = "add_scenarios"
+DELETE_SCENARIO = "delete_scenario"
+DELETE_SCENARIOS = "delete_scenarios"
+ADD_NOTE = "add_note"
+DELETE_NOTE = "delete_note"
+REPLACE_ALL = "replace_all"
+
+
+def add_player(name):
+    return {"op": ADD_PLAYER, "name": name}
+
+
+def add_scenario(record):
+    return {"op": ADD_SCENARIO, "record": record}
+
+
+def add_scenarios(records):
+    """Appends many scenario records at once (a bulk import)."""
+    return {"op": ADD_SCENARIOS, "records": records}
+
+
+def delete_scenario(record_id):
+    return {"op": DELETE_SCENARIO, "id": record_id}
+
+
+def delete_scenarios(record_ids):
+    """Deletes many scenario records at once (undoing a bulk import)."""
+    return {"op": DELETE_SCENARIOS, "ids": list(record_ids)}
+
+
+def add_note(campaign_name, note):
+    return {"op": ADD_NOTE, "campaign": campaign_name, "note": note}
+
+
+def delete_note(campaign_name, note_id):
+    return {"op": DELETE_NOTE, "campaign": campaign_name, "id": note_id}
+
+
+def replace_all(players, scenarios_played, campaign_boons):
+    """Replaces everything (loading a file, or resetting with empty data)."""
+    return {
+        "op": REPLACE_ALL,
+        "data": {"players": players, "scenarios_played": scenarios_played, "campaign_boons": campaign_boons}
+    }
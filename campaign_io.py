@@ -0,0 +1,411 @@
+# campaign_io.py
+"""Saving and loading campaign data files."""
+import contextlib
+import gc
+import io
+import json
+import re
+import threading
+import zipfile
+
+from compact_records import compact_record, to_json_value
+from columnar_format import ZIP_MAGIC, is_columnar_file, read_campaign_data_columnar
+from schema_migrations import (
+    LEGACY_SCHEMA_VERSION, MIGRATION_BATCH_SIZE, NOTE_FIELD_DEFAULTS, NOTES, SCENARIO_FIELD_DEFAULTS, SCENARIOS,
+    SCHEMA_VERSION, Migrator, fill_missing_fields, new_ids
+)
+
+# Keys every scenario record / campaign note must have; the optional ones are filled in
+# (see schema_migrations.SCENARIO_FIELD_DEFAULTS and NOTE_FIELD_DEFAULTS)
+REQUIRED_SCENARIO_KEYS = ("campaign", "scenario", "heroes_played", "outcome")
+REQUIRED_NOTE_KEYS = ("content",)
+
+LOAD_CHUNK_SIZE = 1 << 20  # characters decoded per read while streaming a file
+
+# String values repeated across many records; they are shared (interned) while loading
+SHARED_VALUE_KEYS = frozenset((
+    "campaign", "scenario", "outcome", "difficulty", "modular_sets", "date", "hero", "aspect",
+    "health_remaining", "villain_health_remaining", "type"
+))
+
+
+class CampaignDataError(ValueError):
+    """Raised when a campaign data file is valid JSON but not a valid campaign file."""
+
+
+@contextlib.contextmanager
+def gc_paused():
+    """Pauses the cyclic garbage collector while building many container objects.
+
+    Loading creates millions of dicts and lists that all survive; letting the
+    collector repeatedly traverse them roughly doubles load time.
+    """
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
+
+def serialize_campaign_data(players, scenarios_played, campaign_boons, compact=False):
+    """Returns the campaign data file contents as a JSON string.
+
+    The default output is pretty-printed; ``compact=True`` drops the indentation
+    and spaces for a noticeably smaller file that loads exactly the same way.
+    The schema version comes first, so the loader knows it before any record.
+    """
+    data_to_save = {
+        "schema_version": SCHEMA_VERSION,
+        "players": players,
+        "scenarios_played": scenarios_played,
+        "campaign_boons": campaign_boons
+    }
+    if compact:
+        return json.dumps(data_to_save, separators=(",", ":"), default=to_json_value)
+    # Use indent for pretty-printing the JSON
+    return json.dumps(data_to_save, indent=4, default=to_json_value)
+
+
+class ExportCache:
+    """Save-file payloads memoized against a data version.
+
+    ``invalidate()`` is called whenever campaign data changes. ``get()`` may be
+    called from Streamlit's download thread, hence the lock.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self._payloads = {}
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        with self._lock:
+            self.version += 1
+            self._payloads.clear()
+
+    def get(self, variant, build):
+        """Returns the cached payload for ``variant``, building it with ``build()`` if needed."""
+        with self._lock:
+            key = (self.version, variant)
+            if key not in self._payloads:
+                self._payloads[key] = build()
+            return self._payloads[key]
+
+
+# --- Loading ---
+class _JsonStreamReader:
+    """Reads a JSON document piece by piece from a text stream.
+
+    Only the current, not yet consumed part of the document is buffered, so
+    large arrays can be walked one element at a time without holding the raw
+    file, the decoded text and the parsed tree in memory at once.
+    """
+
+    _WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+    def __init__(self, text_stream, on_read=None):
+        self._stream = text_stream
+        self._on_read = on_read
+        # Each parsed value gets its own key memo, so share keys and repeated values across records
+        shared = {}
+
+        def share_strings(pairs):
+            return {
+                shared.setdefault(key, key): (
+                    shared.setdefault(value, value) if key in SHARED_VALUE_KEYS and type(value) is str else value
+                )
+                for key, value in pairs
+            }
+
+        self._decoder = json.JSONDecoder(object_pairs_hook=share_strings)
+        self._plain_decoder = json.JSONDecoder()
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self, min_chars=LOAD_CHUNK_SIZE):
+        """Drops the consumed prefix and appends at least ``min_chars`` more characters."""
+        if self._eof:
+            return False
+        chunk = self._stream.read(max(min_chars, LOAD_CHUNK_SIZE))
+        self._buf = self._buf[self._pos:] + chunk
+        self._pos = 0
+        if not chunk:
+            self._eof = True
+        if self._on_read is not None:
+            self._on_read()
+        return bool(chunk)
+
+    def _error(self, message):
+        return json.JSONDecodeError(message, self._buf, self._pos)
+
+    def peek(self):
+        """Returns the next non-whitespace character without consuming it ('' at the end)."""
+        while True:
+            self._pos = self._WHITESPACE.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise self._error(f"Expecting '{char}'")
+        self._pos += 1
+
+    def read_value(self, share_strings=True):
+        """Parses and consumes one complete JSON value.
+
+        With ``share_strings=False`` its keys and values are not shared with
+        other values (faster, for records that are compacted right away).
+        """
+        decoder = self._decoder if share_strings else self._plain_decoder
+        self.peek()
+        while True:
+            try:
+                value, end = decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                # Most likely the value continues past the buffer; read more (doubling) and retry
+                if not self._fill(len(self._buf) - self._pos):
+                    raise
+                continue
+            # A number that ends exactly at the buffer end may continue in the next chunk
+            if end == len(self._buf) and not self._eof:
+                self._fill(len(self._buf) - self._pos)
+                continue
+            self._pos = end
+            return value
+
+    def iter_array(self, share_strings=True):
+        """Yields the elements of the array at the current position one by one (see read_value)."""
+        self.expect("[")
+        if self.peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield self.read_value(share_strings)
+            if self.peek() == ",":
+                self._pos += 1
+            else:
+                self.expect("]")
+                return
+
+    def iter_object(self):
+        """Yields the keys of the object at the current position.
+
+        The caller must consume each key's value (with read_value, iter_array
+        or iter_object) before asking for the next key.
+        """
+        self.expect("{")
+        if self.peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            if self.peek() != '"':
+                raise self._error("Expecting property name enclosed in double quotes")
+            key = self.read_value()
+            self.expect(":")
+            yield key
+            if self.peek() == ",":
+                self._pos += 1
+            else:
+                self.expect("}")
+                return
+
+    def expect_end(self):
+        if self.peek() != "":
+            raise self._error("Extra data")
+
+
+def _stream_size(binary_stream):
+    size = getattr(binary_stream, "size", None)
+    if size is None and binary_stream.seekable():
+        start = binary_stream.tell()
+        size = binary_stream.seek(0, io.SEEK_END)
+        binary_stream.seek(start)
+    return size
+
+
+def _check_keys(item, required_keys, description):
+    if not isinstance(item, dict):
+        raise CampaignDataError(f"{description} is not an object.")
+    missing = [key for key in required_keys if key not in item]
+    if missing:
+        raise CampaignDataError(f"{description} is missing: {', '.join(missing)}.")
+
+
+def _ensure_unique_id(record, seen_ids):
+    """Gives a record a fresh id if it has none or one already in ``seen_ids``, then adds its id there."""
+    record_id = record.get("id")
+    if record_id is None or record_id in seen_ids:
+        record_id = record["id"] = new_ids(1)[0]
+    seen_ids.add(record_id)
+
+
+class _RecordChecker:
+    """Validates loaded records and upgrades those saved with an older schema (see schema_migrations).
+
+    Checked scenarios are collected in ``scenarios``, as ScenarioRecords with
+    ``compact=True``. When the file's schema version has scenario steps to
+    run, records are upgraded in batches before they are compacted; current
+    files skip that, but their records still get the optional fields they lack,
+    and their ids are still checked: a record without an id, or with one an
+    earlier record has, gets a fresh one (a hand-edited file, or one written by
+    another tool, may have either). With ``assign_ids=False`` ids are left as
+    they are in the file (see campaign_merge).
+    """
+
+    def __init__(self, assign_ids=True, compact=False):
+        self._assign_ids = assign_ids
+        self.compact = compact
+        self.scenarios = []
+        self._pending_scenarios = []  # waiting to be upgraded as a batch
+        self._notes = []  # upgraded once the file is read (there are few)
+        self.scenario_count = 0
+        self._scenario_ids = set()  # ids seen so far, when the migrator doesn't assign them
+        self.set_schema_version(LEGACY_SCHEMA_VERSION)
+
+    def set_schema_version(self, version):
+        """Sets the file's schema version; a header that comes after the records is ignored."""
+        if self.scenario_count or self._notes:
+            return
+        if type(version) is not int or version < 1:
+            raise CampaignDataError("'schema_version' must be a whole number of at least 1.")
+        try:
+            self._migrator = Migrator(version, self._assign_ids)
+        except ValueError as e:
+            raise CampaignDataError(f"The file was saved by a newer version of the app ({e}).") from e
+        self._migrate_scenarios = self._migrator.needs(SCENARIOS)
+        # Version 1 files get their ids from the migration steps; later ones are checked here
+        self._check_ids = self._assign_ids and not self._migrator.assigns_ids
+
+    def check_scenario(self, scenario):
+        self.scenario_count += 1
+        _check_keys(scenario, REQUIRED_SCENARIO_KEYS, f"Scenario #{self.scenario_count}")
+        if self._migrate_scenarios:
+            self._pending_scenarios.append(scenario)
+            if len(self._pending_scenarios) >= MIGRATION_BATCH_SIZE:
+                self._upgrade_pending_scenarios()
+        else:
+            fill_missing_fields(scenario, SCENARIO_FIELD_DEFAULTS)
+            if self._check_ids:
+                _ensure_unique_id(scenario, self._scenario_ids)
+            self.scenarios.append(compact_record(scenario) if self.compact else scenario)
+
+    def _upgrade_pending_scenarios(self):
+        self._migrator.migrate(SCENARIOS, self._pending_scenarios)
+        if self.compact:
+            self.scenarios.extend(map(compact_record, self._pending_scenarios))
+        else:
+            self.scenarios.extend(self._pending_scenarios)
+        self._pending_scenarios = []
+
+    def check_note(self, note, campaign_name):
+        _check_keys(note, REQUIRED_NOTE_KEYS, f"A note in '{campaign_name}'")
+        self._notes.append(note)
+        return note
+
+    def finish(self):
+        """Upgrades the records still waiting and returns the MigrationReport."""
+        if self._pending_scenarios:
+            self._upgrade_pending_scenarios()
+        if self._notes and self._migrator.needs(NOTES):
+            self._migrator.migrate(NOTES, self._notes)
+        else:
+            for note in self._notes:
+                fill_missing_fields(note, NOTE_FIELD_DEFAULTS)
+        if self._check_ids:
+            note_ids = set()
+            for note in self._notes:
+                _ensure_unique_id(note, note_ids)
+        return self._migrator.report
+
+
+def read_campaign_data(binary_stream, on_progress=None, assign_ids=True, compact=True):
+    """Reads a campaign data file (JSON or columnar, detected from its first bytes).
+
+    Scenarios and campaign notes are validated. Files saved with an older
+    schema are upgraded (see schema_migrations): among other things records
+    get a fresh unique "id" when missing or duplicated, unless ``assign_ids``
+    is False. ``on_progress`` is called with the fraction of the file read so
+    far. Returns a dict with "players", "scenarios_played" and
+    "campaign_boons", like the saved file, plus the "migration_report". Scenarios are compact ScenarioRecords as they are
+    read, so the file's record dicts never all exist at once; pass
+    ``compact=False`` for plain dicts.
+    """
+    header = binary_stream.read(len(ZIP_MAGIC))
+    binary_stream.seek(-len(header), io.SEEK_CUR)
+    checker = _RecordChecker(assign_ids, compact)
+    with gc_paused():
+        if is_columnar_file(header):
+            return _read_columnar_campaign_data(binary_stream, checker, on_progress)
+        return _read_json_campaign_data(binary_stream, checker, on_progress)
+
+
+def _read_columnar_campaign_data(binary_stream, checker, on_progress=None):
+    try:
+        data = read_campaign_data_columnar(binary_stream)
+    except (KeyError, ValueError, zipfile.BadZipFile) as e:
+        raise CampaignDataError(f"The columnar file could not be read ({e}).") from e
+    checker.set_schema_version(data.pop("schema_version"))
+    for scenario in data["scenarios_played"]:
+        checker.check_scenario(scenario)
+    for campaign_name, campaign_notes in data["campaign_boons"].items():
+        for note in campaign_notes:
+            checker.check_note(note, campaign_name)
+    data["migration_report"] = checker.finish()
+    data["scenarios_played"] = checker.scenarios
+    if on_progress is not None:
+        on_progress(1.0)
+    return data
+
+
+def _read_json_campaign_data(binary_stream, checker, on_progress=None):
+    """Parses a JSON campaign data file record by record, checking each record as it is read."""
+    total_size = _stream_size(binary_stream)
+
+    def report_progress():
+        if on_progress is not None and total_size:
+            on_progress(min(binary_stream.tell() / total_size, 1.0))
+
+    text_stream = io.TextIOWrapper(binary_stream, encoding="utf-8")
+    try:
+        reader = _JsonStreamReader(text_stream, on_read=report_progress)
+        data = {"players": [], "scenarios_played": [], "campaign_boons": {}}
+
+        if reader.peek() != "{":
+            raise CampaignDataError("The file does not contain a campaign data object.")
+        for key in reader.iter_object():
+            if key == "scenarios_played":
+                if reader.peek() != "[":
+                    raise CampaignDataError("'scenarios_played' must be a list.")
+                # Compact records keep no keys and intern their values themselves, so only plain dicts share strings
+                for scenario in reader.iter_array(share_strings=not checker.compact):
+                    checker.check_scenario(scenario)
+            elif key == "campaign_boons":
+                if reader.peek() != "{":
+                    raise CampaignDataError("'campaign_boons' must be an object.")
+                for campaign_name in reader.iter_object():
+                    if reader.peek() != "[":
+                        raise CampaignDataError(f"Notes for '{campaign_name}' must be a list.")
+                    campaign_notes = data["campaign_boons"].setdefault(campaign_name, [])
+                    for note in reader.iter_array():
+                        campaign_notes.append(checker.check_note(note, campaign_name))
+            elif key == "schema_version":
+                checker.set_schema_version(reader.read_value())
+            elif key == "players":
+                players = reader.read_value()
+                if not isinstance(players, list):
+                    raise CampaignDataError("'players' must be a list.")
+                data["players"] = players
+            else:
+                reader.read_value()  # Unknown top-level keys are ignored
+        reader.expect_end()
+        data["migration_report"] = checker.finish()
+        data["scenarios_played"] = checker.scenarios
+        return data
+    finally:
+        # Don't let the wrapper close the caller's stream
+        text_stream.detach()
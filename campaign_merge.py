@@ -0,0 +1,140 @@
+# campaign_merge.py
+"""Merging several campaign data files into one.
+
+Players, scenario records and campaign notes are unioned in a single pass
+over the sources, in order. Records are matched by their "id"; legacy records
+saved without one are matched by a hash of their content instead (and given a
+fresh id). When two records share an id but differ, the first one wins and
+the pair is listed in the merge report as a conflict.
+"""
+import hashlib
+import json
+import uuid
+
+from compact_records import as_dict, to_json_value
+
+CONFLICT_COLUMNS = ["Kind", "Id", "Campaign", "Kept From", "Dropped From", "Differences"]
+
+
+class MergeReport:
+    """Result of a merge: the merged data plus counts and conflicts per kind of record."""
+
+    def __init__(self, data, source_names):
+        self.data = data  # dict with "players", "scenarios_played" and "campaign_boons"
+        self.source_names = source_names
+        self.duplicate_scenarios = 0
+        self.duplicate_notes = 0
+        self.conflicts = []  # dicts with CONFLICT_COLUMNS
+
+    @property
+    def scenario_count(self):
+        return len(self.data["scenarios_played"])
+
+    @property
+    def note_count(self):
+        return sum(len(notes) for notes in self.data["campaign_boons"].values())
+
+
+def _content_hash(item, campaign):
+    """Hashes the campaign and everything but the id of a record or note (key order doesn't matter)."""
+    content = {key: value for key, value in item.items() if key != "id"}
+    return hashlib.blake2b(
+        json.dumps([campaign, content], sort_keys=True, separators=(",", ":"), default=to_json_value).encode("utf-8"),
+        digest_size=16
+    ).digest()
+
+
+def _differences(kept, dropped):
+    kept, dropped = as_dict(kept), as_dict(dropped)
+    keys = [key for key in kept if key != "id"] + [key for key in dropped if key != "id" and key not in kept]
+    return ", ".join(key for key in keys if kept.get(key) != dropped.get(key))
+
+
+class _Deduplicator:
+    """Keeps the first item seen per id (or per content hash for items without one).
+
+    Every kept item's content hash is recorded, so a legacy copy of a record
+    is recognized whichever order the files come in: after a copy with an id
+    it is dropped; before one, it is kept and takes that copy's id when it
+    shows up (so later copies with the id are duplicates too).
+    """
+
+    def __init__(self, kind, report):
+        self._kind = kind
+        self._report = report
+        self._by_id = {}  # id -> (item, source name)
+        self._hashes = set()  # content hashes of the kept items
+        self._legacy = {}  # content hash -> kept item that had no id in its file (and got a fresh one)
+
+    def _keep(self, item, source_name, content_hash):
+        self._by_id[item["id"]] = (item, source_name)
+        self._hashes.add(content_hash)
+        return item
+
+    def add(self, item, source_name, campaign):
+        """Returns the item to keep, or None if it duplicates (or conflicts with) one already kept."""
+        item_id = item.get("id")
+        content_hash = _content_hash(item, campaign)
+        if item_id is None:
+            if content_hash in self._hashes:
+                return None
+            kept_item = self._legacy[content_hash] = dict(item, id=str(uuid.uuid4()))
+            return self._keep(kept_item, source_name, content_hash)
+        kept = self._by_id.get(item_id)
+        if kept is None:
+            legacy_item = self._legacy.pop(content_hash, None)
+            if legacy_item is None:
+                return self._keep(item, source_name, content_hash)
+            # The legacy copy kept earlier is this record: it takes the record's id
+            self._by_id[item_id] = self._by_id.pop(legacy_item["id"])
+            legacy_item["id"] = item_id
+            return None
+        kept_item, kept_source = kept
+        if kept_item != item:
+            self._report.conflicts.append({
+                "Kind": self._kind,
+                "Id": item_id,
+                "Campaign": campaign,
+                "Kept From": kept_source,
+                "Dropped From": source_name,
+                "Differences": _differences(kept_item, item),
+            })
+        return None
+
+
+def merge_campaign_data(sources):
+    """Merges ``(name, data)`` pairs, where data is as read with ``read_campaign_data(..., assign_ids=False, compact=False)``.
+
+    Earlier sources win conflicts. Returns a MergeReport.
+    """
+    players = []
+    seen_players = set()
+    scenarios_played = []
+    campaign_boons = {}
+    report = MergeReport(
+        {"players": players, "scenarios_played": scenarios_played, "campaign_boons": campaign_boons},
+        [name for name, _ in sources]
+    )
+    scenarios = _Deduplicator("Scenario", report)
+    notes = _Deduplicator("Note", report)
+
+    for name, data in sources:
+        for player in data.get("players", []):
+            if player not in seen_players:
+                seen_players.add(player)
+                players.append(player)
+        for record in data.get("scenarios_played", []):
+            kept = scenarios.add(record, name, record.get("campaign"))
+            if kept is None:
+                report.duplicate_scenarios += 1
+            else:
+                scenarios_played.append(kept)
+        for campaign_name, campaign_notes in data.get("campaign_boons", {}).items():
+            merged_notes = campaign_boons.setdefault(campaign_name, [])
+            for note in campaign_notes:
+                kept = notes.add(note, name, campaign_name)
+                if kept is None:
+                    report.duplicate_notes += 1
+                else:
+                    merged_notes.append(kept)
+    return report
@@ -0,0 +1,95 @@
+# campaign_stats.py
+"""Running per-campaign aggregates for the Campaign Statistics section.
+
+CampaignStats subscribes to the ScenarioStore and adjusts its counters on every
+add and delete, so the statistics panel renders from a handful of small dicts
+instead of rescanning and regrouping every recorded play.
+"""
+from collections import Counter
+
+from scenario_store import NOT_SELECTED_HERO
+
+
+class _CampaignTotals:
+    __slots__ = ("outcomes", "scenario_outcomes", "hero_plays")
+
+    def __init__(self):
+        self.outcomes = Counter()  # outcome -> plays
+        self.scenario_outcomes = {}  # scenario -> Counter(outcome -> plays)
+        self.hero_plays = Counter()  # hero -> plays
+
+    def is_empty(self):
+        return not self.outcomes
+
+
+class CampaignStats:
+    """Win/loss counts, per-scenario outcomes and hero play counts per campaign."""
+
+    def __init__(self):
+        self._campaigns = {}
+
+    # --- ScenarioStore listener interface ---
+    def record_added(self, record):
+        self._apply(record, 1)
+
+    def record_removed(self, record):
+        self._apply(record, -1)
+
+    def _apply(self, record, delta):
+        campaign = record.get("campaign")
+        totals = self._campaigns.get(campaign)
+        if totals is None:
+            totals = self._campaigns[campaign] = _CampaignTotals()
+
+        outcome = record.get("outcome")
+        self._bump(totals.outcomes, outcome, delta)
+        scenario_counter = totals.scenario_outcomes.setdefault(record.get("scenario"), Counter())
+        self._bump(scenario_counter, outcome, delta)
+        if not scenario_counter:
+            del totals.scenario_outcomes[record.get("scenario")]
+        for hero_info in record.get("heroes_played", []):
+            if hero_info.get("hero") != NOT_SELECTED_HERO:
+                self._bump(totals.hero_plays, hero_info.get("hero"), delta)
+
+        if totals.is_empty():
+            del self._campaigns[campaign]
+
+    @staticmethod
+    def _bump(counter, key, delta):
+        counter[key] += delta
+        if counter[key] <= 0:
+            del counter[key]
+
+    # --- Reads ---
+    def overall_record(self, campaign_name):
+        """Returns (wins, losses, total_plays) for a campaign."""
+        totals = self._campaigns.get(campaign_name)
+        if totals is None:
+            return 0, 0, 0
+        total_plays = sum(totals.outcomes.values())
+        wins = totals.outcomes.get("Win", 0)
+        return wins, total_plays - wins, total_plays
+
+    def scenario_outcomes(self, campaign_name):
+        """Returns {scenario: {outcome: plays}} for a campaign."""
+        totals = self._campaigns.get(campaign_name)
+        if totals is None:
+            return {}
+        return {scenario: dict(counter) for scenario, counter in totals.scenario_outcomes.items()}
+
+    def scenario_results(self, campaign_name):
+        """Returns [[scenario, wins, losses, total, win %], ...] for a campaign, best win rate first."""
+        results = []
+        for scenario, outcomes in self.scenario_outcomes(campaign_name).items():
+            wins, losses = outcomes.get("Win", 0), outcomes.get("Loss", 0)
+            total = wins + losses
+            results.append([scenario, wins, losses, total, round(wins / total * 100, 2) if total else 0])
+        results.sort(key=lambda row: row[-1], reverse=True)
+        return results
+
+    def hero_play_counts(self, campaign_name):
+        """Returns [(hero, plays), ...] for a campaign, most played first."""
+        totals = self._campaigns.get(campaign_name)
+        if totals is None:
+            return []
+        return totals.hero_plays.most_common()
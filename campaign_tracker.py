@@ -0,0 +1,251 @@
+# campaign_tracker.py
+"""The campaign tracker without a user interface: its data views, changes, undo and save files.
+
+A CampaignTracker is what one user works on: the dataset they view (see
+shared_store) and their undo history (see undo_history). Every change goes
+through it as a campaign change (see campaign_changes), which is applied to
+the data in memory, written through to the database or journal, and recorded
+for undo. The Streamlit app keeps a tracker per browser session and the
+command line (cli.py) one per run.
+
+Nothing here imports Streamlit, and pandas is only imported to build the views
+that need it (``build_scenario_views``). Scripts that only record plays or
+read the statistics use ``build_core_views`` and never load it.
+"""
+import uuid
+
+import campaign_changes
+from campaign_io import read_campaign_data, serialize_campaign_data
+from campaign_stats import CampaignStats
+from catalog import category_catalogs
+from columnar_format import serialize_campaign_data_columnar
+from compact_records import compact_record
+from scenario_store import ScenarioStore
+from shared_store import SharedDataset
+from undo_history import UndoHistory
+
+SAVE_FORMAT_NAMES = ("JSON", "Compact JSON", "Columnar")
+
+
+# --- Views ---
+def build_core_views(records=(), campaign_boons=None):
+    """Returns a new scenario store plus the campaign statistics kept from it, by session_state key."""
+    store = ScenarioStore(records)
+    return {"scenario_store": store, "campaign_stats": store.add_listener(CampaignStats())}
+
+
+def build_scenario_views(records=(), campaign_boons=None):
+    """Returns the core views plus every view the app shows (maintained from the store and the notes)."""
+    # Imported here, so building only the core views never loads pandas
+    from analytics import AnalyticsCubes
+    from bulk_import import ContentHashIndex
+    from participation import ParticipationTable
+    from recommendations import HeroRecommendations
+    from scenario_log import ScenarioLogCache
+    from search_index import SearchIndex
+    from trends import TrendBuckets
+
+    views = build_core_views(records, campaign_boons)
+    store = views["scenario_store"]
+    # Category catalogs (without placeholders) the columnar views are coded against
+    catalogs = category_catalogs()
+    views.update({
+        "scenario_log_cache": store.add_listener(ScenarioLogCache()),
+        "participation_table": store.add_listener(ParticipationTable(**catalogs)),
+        "analytics_cubes": store.add_listener(AnalyticsCubes(**catalogs)),
+        "search_index": store.add_listener(SearchIndex(campaign_boons)),
+        "trend_buckets": store.add_listener(TrendBuckets()),
+        "hero_recommendations": store.add_listener(HeroRecommendations(catalogs["heroes"], catalogs["aspects"])),
+        "content_hash_index": store.add_listener(ContentHashIndex(store)),
+    })
+    return views
+
+
+# --- Records ---
+def new_scenario_record(
+    campaign_name, scenario_name, heroes_played, outcome, difficulty,
+    modular_sets, villain_health_remaining, turns_taken, threat_on_scheme, notes, date_played
+):
+    """Returns a new scenario record with a fresh id; ``heroes_played`` is a list of hero / aspect / health dicts."""
+    return compact_record({
+        "id": str(uuid.uuid4()),
+        "campaign": campaign_name,
+        "scenario": scenario_name,
+        "heroes_played": heroes_played,
+        "outcome": outcome,
+        "difficulty": difficulty,
+        "modular_sets": modular_sets,
+        "villain_health_remaining": villain_health_remaining,
+        "turns_taken": turns_taken,
+        "threat_on_scheme": threat_on_scheme,
+        "notes": notes,
+        "date": date_played.strftime("%Y-%m-%d")
+    })
+
+
+def new_campaign_note(note_type, content, date):
+    """Returns a new campaign note with a fresh id; ``note_type`` is e.g. "Boon" or "General Note"."""
+    return {
+        "id": str(uuid.uuid4()),
+        "date": date.strftime("%Y-%m-%d"),
+        "type": note_type,
+        "content": content
+    }
+
+
+# --- Save files ---
+def read_campaign_file(path, **options):
+    """Reads a campaign data file (any save format) from disk; see read_campaign_data for the options."""
+    with open(path, "rb") as f:
+        return read_campaign_data(f, **options)
+
+
+def serialize_dataset(dataset, save_format="JSON"):
+    """Returns a dataset's save file in one of SAVE_FORMAT_NAMES (bytes for Columnar, else a str)."""
+    with dataset.lock:
+        players, scenarios_played, campaign_boons = dataset.players, dataset.scenario_store.records(), dataset.campaign_boons
+        if save_format == "Columnar":
+            return serialize_campaign_data_columnar(players, scenarios_played, campaign_boons)
+        return serialize_campaign_data(players, scenarios_played, campaign_boons, compact=save_format == "Compact JSON")
+
+
+class CampaignTracker:
+    """One user's view of a dataset: the changes they make to it, and their undo history.
+
+    ``build_views`` builds the views of the datasets the tracker creates
+    (when data is replaced, or to start with an empty one).
+    """
+
+    def __init__(self, dataset=None, build_views=build_scenario_views):
+        self._build_views = build_views
+        self.dataset = dataset if dataset is not None else SharedDataset(build_views)
+        self.undo_history = UndoHistory()
+
+    def apply(self, change):
+        """Applies a change (see campaign_changes) to the dataset and publishes what it actually changed."""
+        for applied in self.dataset.apply(change):
+            self.dataset.publish(applied)
+
+    def _record(self, label, change, inverse):
+        self.undo_history.record(label, self.dataset, changes=[change], inverse=[inverse])
+
+    # --- Changes ---
+    def add_player(self, name):
+        """Adds a player to the roster (not undoable); returns False if they are on it already."""
+        if name in self.dataset.players:
+            return False
+        self.apply(campaign_changes.add_player(name))
+        return True
+
+    def add_scenario_outcome(
+        self, campaign_name, scenario_name, heroes_played, outcome, difficulty,
+        modular_sets, villain_health_remaining, turns_taken, threat_on_scheme, notes, date_played
+    ):
+        """Records a play (see new_scenario_record) and returns its record."""
+        record = new_scenario_record(
+            campaign_name, scenario_name, heroes_played, outcome, difficulty,
+            modular_sets, villain_health_remaining, turns_taken, threat_on_scheme, notes, date_played
+        )
+        change = campaign_changes.add_scenario(record)
+        self.apply(change)
+        self._record(f"recording a {record['scenario']} play", change, campaign_changes.delete_scenario(record["id"]))
+        return record
+
+    def add_scenarios(self, records):
+        """Records many plays at once (a bulk import) and returns their records."""
+        records = [compact_record(record) for record in records]
+        if records:
+            change = campaign_changes.add_scenarios(records)
+            self.apply(change)
+            self._record(
+                f"importing {len(records):,} plays", change,
+                campaign_changes.delete_scenarios(record["id"] for record in records)
+            )
+        return records
+
+    def delete_scenario(self, record_id):
+        """Deletes a play; returns its record, or None if there is no play with that id."""
+        record = self.dataset.scenario_store.get(record_id)
+        if record is not None:
+            change = campaign_changes.delete_scenario(record_id)
+            self.apply(change)
+            self._record(f"deleting a {record.get('scenario')} play", change, campaign_changes.add_scenario(record))
+        return record
+
+    def add_campaign_note(self, campaign_name, note_type, content, date):
+        """Adds a note, boon or choice to a campaign and returns it."""
+        note = new_campaign_note(note_type, content, date)
+        change = campaign_changes.add_note(campaign_name, note)
+        self.apply(change)
+        self._record(f"adding a {note_type.lower()}", change, campaign_changes.delete_note(campaign_name, note["id"]))
+        return note
+
+    def delete_campaign_note(self, campaign_name, note_id):
+        """Deletes a campaign note; returns it, or None if the campaign has no note with that id."""
+        notes = self.dataset.campaign_boons.get(campaign_name, [])
+        note = next((note for note in notes if note.get("id") == note_id), None)
+        if note is not None:
+            change = campaign_changes.delete_note(campaign_name, note_id)
+            self.apply(change)
+            self._record(
+                f"deleting a {str(note.get('type', 'note')).lower()}", change, campaign_changes.add_note(campaign_name, note)
+            )
+        return note
+
+    def replace_data(self, data, label):
+        """Replaces the players, scenarios and boons with already validated data (loading, merging, resetting).
+
+        A dataset backed by a database or journal is replaced in place (for
+        everyone viewing it); otherwise the tracker moves to a new dataset,
+        leaving the one it may share with others untouched.
+        """
+        before = self.dataset
+        if not before.is_durable:
+            self.view(SharedDataset(self._build_views, data), label)
+            return
+        # Replaced in place, so undo needs the old data (new lists holding the same records)
+        inverse = campaign_changes.replace_all(**before.data())
+        before.replace(data)
+        change = campaign_changes.replace_all(**before.data())
+        before.publish(change)
+        self._record(label, change, inverse)
+
+    def view(self, dataset, label=None):
+        """Moves the tracker to another dataset.
+
+        With a label the move can be undone (e.g. loading a shared file);
+        without one (connecting a database, say) the undo history is
+        cleared, since its actions were made to the dataset left behind.
+        """
+        if dataset is self.dataset:
+            return
+        before, self.dataset = self.dataset, dataset
+        if label is None:
+            self.undo_history.clear()
+        else:
+            self.undo_history.record(label, before, dataset)
+
+    # --- Undo ---
+    def next_undo(self):
+        return self.undo_history.next_undo(self.dataset)
+
+    def next_redo(self):
+        return self.undo_history.next_redo(self.dataset)
+
+    def undo(self):
+        """Takes back the newest action; returns it, or None if there was nothing to undo."""
+        action = self.undo_history.undo(self.dataset)
+        if action is not None:
+            for change in reversed(action.inverse):
+                self.apply(change)
+            self.dataset = action.before
+        return action
+
+    def redo(self):
+        """Makes the newest undone action again; returns it, or None if there was nothing to redo."""
+        action = self.undo_history.redo(self.dataset)
+        if action is not None:
+            for change in action.changes:
+                self.apply(change)
+            self.dataset = action.after
+        return action
@@ -0,0 +1,114 @@
+# catalog.py
+"""The game catalogs: campaigns and their scenarios, heroes, aspects and difficulties.
+
+The lists start with the placeholder the app's selectors show before a choice
+is made ("--- Select a Hero ---"); ``category_catalogs`` gives them without it.
+"""
+
+
+# Define specific campaigns and their 5 associated scenarios/villains
+MARVEL_CHAMPIONS_CAMPAIGNS_AND_SCENARIOS = {
+    "--- Select a Campaign ---": [], # Default empty state
+    "Rise of Red Skull": [
+        "Crossbones",
+        "Absorbing Man",
+        "Taskmaster",
+        "Zola",
+        "Red Skull"
+    ],
+    "Galaxy's Most Wanted": [
+        "Drang",
+        "Collector (Museum)",
+        "Collector (Ship)",
+        "Nebula",
+        "Ronan"
+    ],
+    "Mad Titan's Shadow": [
+        "Ebony Maw",
+        "Tower Defense",
+        "Thanos",
+        "Hela",
+        "Loki"
+    ],
+    "Sinister Motives": [
+        "Sandman",
+        "Venom",
+        "Mysterio",
+        "Sinister Six",
+        "Venom Goblin"
+    ],
+    "Mutant Genesis": [
+        "Sabretooth",
+        "Project Wideawake",
+        "Master Mold",
+        "Mansion Attack",
+        "Magneto"
+    ],
+    "Next Evolution": [
+        "Morlock Siege",
+        "On the Run",
+        "Juggernaut",
+        "Mister Sinister",
+        "Stryfe"
+    ],
+    "Age of Apocalypse": [
+        "Unus",
+        "Four Horseman",
+        "Apocalypse",
+        "Dark Beast",
+        "En Sabah Nur"
+    ],
+    "Agents of S.H.I.E.L.D.": [
+        "Black Widow",
+        "Batroc",
+        "M.O.D.O.K.",
+        "Thunderbolts",
+        "Baron Zero"
+    ]
+    # Add more campaigns as needed
+}
+
+# Define a list of Marvel Champions heroes.
+MARVEL_CHAMPIONS_HEROES_RAW = [
+    "Adam Warlock", "Angel", "Ant-Man", "Bishop", "Black Panther",
+    "Black Widow", "Cable", "Captain America", "Captain Marvel", "Cloak & Dagger",
+    "Colossus", "Cyclops", "Dazzler", "Deadpool", "Doctor Strange",
+    "Doctor Voodoo", "Domino", "Drax", "Falcon", "Gambit", "Gamora",
+    "Ghost-Spider", "Goliath", "Groot", "Hawkeye", "Hulk", "Iceman", "Iron Man",
+    "Ironheart", "Jean Grey", "Jubilee", "Kitty Pryde", "Magik", "Magneto",
+    "Maria Hill", "Miles Morales", "Mister Sinister", "Ms. Marvel", "Nebula",
+    "Nick Fury", "Nightcrawler", "Nova", "Phoenix", "Psylocke", "Quicksilver",
+    "Rocket Racoon", "Rogue", "Ronin", "Scarlet Witch", "Shadowcat", "She-Hulk",
+    "Silk", "Silver Surfer", "SP//dr", "Spider-Ham", "Spider-Man (Peter Parker)",
+    "Spider-Woman", "Spectrum", "Star-Lord", "Storm", "Thor", "Valkyrie",
+    "Venom (Flash Thompson)", "Vision", "War Machine", "Wasp", "Winter Soldier", "Wolverine", "X-23"
+]
+MARVEL_CHAMPIONS_HEROES = ["--- Select a Hero ---"] + sorted(MARVEL_CHAMPIONS_HEROES_RAW)
+
+# Define aspects
+MARVEL_CHAMPIONS_ASPECTS = ["--- Select an Aspect ---", "Aggression", "Justice", "Leadership", "Protection", "Basic", "Pool"]
+
+# Define difficulty options - UPDATED
+MARVEL_CHAMPIONS_DIFFICULTY = [
+    "Standard", "Standard II", "Standard III",
+    "Standard/Expert", "Standard/Expert II",
+    "Standard II/Expert", "Standard II/Expert II",
+    "Standard III/Expert", "Standard III/Expert II",
+    "Heroic"
+]
+
+
+def category_catalogs():
+    """The catalogs without placeholders, as keyword arguments for the columnar views (see participation)."""
+    return dict(
+        campaigns=list(MARVEL_CHAMPIONS_CAMPAIGNS_AND_SCENARIOS)[1:],
+        scenarios=[s for scenarios in MARVEL_CHAMPIONS_CAMPAIGNS_AND_SCENARIOS.values() for s in scenarios],
+        difficulties=MARVEL_CHAMPIONS_DIFFICULTY,
+        heroes=MARVEL_CHAMPIONS_HEROES[1:],
+        aspects=MARVEL_CHAMPIONS_ASPECTS[1:]
+    )
+
+
+def campaign_scenarios():
+    """{campaign: scenarios} for the real campaigns (without the placeholder)."""
+    return {campaign: scenarios for campaign, scenarios in MARVEL_CHAMPIONS_CAMPAIGNS_AND_SCENARIOS.items() if scenarios}
@@ -0,0 +1,171 @@
+# cli.py
+"""Command line for the campaign tracker: record plays, merge save files and print statistics.
+
+    python cli.py record campaign.json --campaign "Rise of Red Skull" --scenario Zola \\
+        --hero "Thor:Justice:7" --hero "Storm:Leadership:3" --outcome Win --turns 9
+    python cli.py merge merged.json alice.json bob.json
+    python cli.py stats campaign.json --campaign "Rise of Red Skull"
+
+It reads and writes the app's save files (a .zip file is written in the
+Columnar format, anything else as JSON) through campaign_tracker, so it needs
+neither Streamlit nor pandas and a command starts in a fraction of a second.
+"""
+import argparse
+import datetime
+import json
+import os
+import sys
+
+from campaign_io import CampaignDataError
+from campaign_merge import merge_campaign_data
+from campaign_tracker import CampaignTracker, build_core_views, read_campaign_file, serialize_dataset
+from catalog import MARVEL_CHAMPIONS_ASPECTS, MARVEL_CHAMPIONS_DIFFICULTY, MARVEL_CHAMPIONS_HEROES, campaign_scenarios
+from shared_store import SharedDataset
+
+OUTCOMES = ("Win", "Loss")
+
+
+# --- Save files ---
+def _open_dataset(path, missing_ok=False):
+    """The data of a save file (only the core views are built); an empty dataset if it doesn't exist yet and ``missing_ok``."""
+    if missing_ok and not os.path.exists(path):
+        return SharedDataset(build_core_views)
+    return SharedDataset(build_core_views, read_campaign_file(path))
+
+
+def _save_dataset(dataset, path, compact=False):
+    """Writes a save file (Columnar for .zip paths, else JSON) through a temporary file, so a failed write leaves the old one intact."""
+    if path.lower().endswith(".zip"):
+        payload = serialize_dataset(dataset, "Columnar")
+    else:
+        payload = serialize_dataset(dataset, "Compact JSON" if compact else "JSON").encode("utf-8")
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "wb") as f:
+        f.write(payload)
+    os.replace(temporary_path, path)
+
+
+# --- Commands ---
+def _parse_hero(value, outcome):
+    """'Hero:Aspect' or 'Hero:Aspect:Health' -> a heroes_played entry, as the app's form records them."""
+    hero, _, rest = value.partition(":")
+    aspect, _, health = rest.partition(":")
+    if hero not in MARVEL_CHAMPIONS_HEROES[1:]:
+        raise ValueError(f"unknown hero {hero!r}")
+    if aspect not in MARVEL_CHAMPIONS_ASPECTS[1:]:
+        raise ValueError(f"unknown aspect {aspect!r} for {hero} (one of: {', '.join(MARVEL_CHAMPIONS_ASPECTS[1:])})")
+    if outcome == "Loss":
+        return {"hero": hero, "aspect": aspect, "health_remaining": "N/A (Defeated)"}
+    if health and not health.isdigit():
+        raise ValueError(f"health remaining of {hero} must be a whole number, not {health!r}")
+    return {"hero": hero, "aspect": aspect, "health_remaining": int(health or 0)}
+
+
+def record_command(args):
+    scenarios = campaign_scenarios()
+    if args.campaign not in scenarios:
+        raise ValueError(f"unknown campaign {args.campaign!r} (one of: {', '.join(scenarios)})")
+    if args.scenario not in scenarios[args.campaign]:
+        raise ValueError(f"{args.campaign} has no scenario {args.scenario!r} (one of: {', '.join(scenarios[args.campaign])})")
+    heroes_played = [_parse_hero(value, args.outcome) for value in args.hero]
+
+    tracker = CampaignTracker(_open_dataset(args.file, missing_ok=True), build_views=build_core_views)
+    for player in args.player:
+        tracker.add_player(player)
+    record = tracker.add_scenario_outcome(
+        args.campaign, args.scenario, heroes_played, args.outcome, args.difficulty, args.modular_sets,
+        args.villain_health if args.outcome == "Loss" else "N/A",
+        args.turns, args.threat, args.notes, args.date
+    )
+    _save_dataset(tracker.dataset, args.file, args.compact)
+    print(f"Recorded {args.scenario} ({args.difficulty}) as a {args.outcome} in {args.campaign}: {record['id']}")
+
+
+def merge_command(args):
+    sources = [(path, read_campaign_file(path, assign_ids=False, compact=False)) for path in args.files]
+    report = merge_campaign_data(sources)
+    _save_dataset(SharedDataset(build_core_views, report.data), args.output, args.compact)
+    print(
+        f"Merged {len(report.source_names)} files into {report.scenario_count} plays and {report.note_count} notes. "
+        f"Skipped {report.duplicate_scenarios} duplicate plays and {report.duplicate_notes} duplicate notes."
+    )
+    for conflict in report.conflicts:
+        print("Conflict (first kept): " + ", ".join(f"{key}: {value}" for key, value in conflict.items()), file=sys.stderr)
+
+
+def _print_table(columns, rows):
+    widths = [max(len(str(value)) for value in column) for column in zip(columns, *rows)]
+    for row in [columns, ["-" * width for width in widths], *rows]:
+        print("  ".join(str(value).ljust(width) for value, width in zip(row, widths)).rstrip())
+
+
+def stats_command(args):
+    dataset = _open_dataset(args.file)
+    campaign_stats = dataset.views["campaign_stats"]
+    campaigns = [args.campaign] if args.campaign else dataset.scenario_store.campaigns()
+    for campaign in campaigns:
+        wins, losses, total_plays = campaign_stats.overall_record(campaign)
+        print(f"== {campaign} ==")
+        if not total_plays:
+            print("No plays recorded.\n")
+            continue
+        print(f"Overall Record: {wins} Wins / {losses} Losses ({total_plays} Total Plays)\n")
+        _print_table(["Scenario", "Win", "Loss", "Total", "Win %"], campaign_stats.scenario_results(campaign))
+        print()
+        _print_table(["Hero", "Plays"], campaign_stats.hero_play_counts(campaign))
+        print()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Record Marvel Champions plays, merge save files and print statistics.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record = commands.add_parser("record", help="record a scenario play in a save file (created if missing)")
+    record.add_argument("file", help="campaign data file")
+    record.add_argument("--campaign", required=True)
+    record.add_argument("--scenario", required=True)
+    record.add_argument(
+        "--hero", action="append", required=True, metavar="HERO:ASPECT[:HEALTH]",
+        help="a hero who played, with their aspect and health remaining after a win (repeat for each hero)"
+    )
+    record.add_argument("--outcome", choices=OUTCOMES, required=True)
+    record.add_argument("--difficulty", choices=MARVEL_CHAMPIONS_DIFFICULTY, default=MARVEL_CHAMPIONS_DIFFICULTY[0])
+    record.add_argument("--modular-sets", default="")
+    record.add_argument("--villain-health", type=int, default=0, help="villain health remaining (on a loss)")
+    record.add_argument("--turns", type=int, default=0, help="turns taken")
+    record.add_argument("--threat", type=int, default=0, help="threat on the main scheme at the end")
+    record.add_argument("--notes", default="")
+    record.add_argument("--date", type=datetime.date.fromisoformat, default=datetime.date.today(), help="YYYY-MM-DD (default: today)")
+    record.add_argument("--player", action="append", default=[], help="add a player to the roster (repeatable)")
+    record.set_defaults(run=record_command)
+
+    merge = commands.add_parser("merge", help="merge save files into one (the first file wins conflicts)")
+    merge.add_argument("output", help="merged campaign data file to write")
+    merge.add_argument("files", nargs="+", help="campaign data files to merge")
+    merge.set_defaults(run=merge_command)
+
+    stats = commands.add_parser("stats", help="print the statistics of a save file")
+    stats.add_argument("file", help="campaign data file")
+    stats.add_argument("--campaign", help="only this campaign (default: every campaign with plays)")
+    stats.set_defaults(run=stats_command)
+
+    for command in (record, merge):
+        command.add_argument("--compact", action="store_true", help="write JSON without indentation")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        args.run(args)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        print("error: not a valid campaign data file", file=sys.stderr)
+        return 1
+    except (CampaignDataError, OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
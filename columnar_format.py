@@ -0,0 +1,268 @@
+# columnar_format.py
+"""Columnar (Parquet) campaign data files.
+
+A columnar save file is a zip archive holding a small JSON manifest and three
+flat Parquet tables:
+
+* ``scenarios.parquet`` - one row per scenario play
+* ``heroes.parquet`` - one row per hero per play, pointing at its scenario row
+* ``boons.parquet`` - one row per campaign note/boon/choice
+
+Repeated strings (campaign, scenario, hero, aspect, difficulty, ...) are
+dictionary-encoded, so each distinct value is stored once per file. Fields
+that mix integers with "N/A" style strings are split into an integer column
+and a text column. Anything that does not fit the expected shape (a missing
+key, an unexpected type, extra keys) is kept verbatim as JSON in an ``extra``
+column, so loading a columnar file gives back exactly the records that were
+saved.
+
+pyarrow is imported lazily; it ships with Streamlit.
+"""
+import io
+import json
+import zipfile
+
+from compact_records import as_dict
+from schema_migrations import LEGACY_SCHEMA_VERSION, SCHEMA_VERSION
+
+FORMAT_NAME = "marvel-champions-columnar"
+FORMAT_VERSION = 1
+ZIP_MAGIC = b"PK\x03\x04"
+
+MANIFEST_FILE = "manifest.json"
+SCENARIOS_FILE = "scenarios.parquet"
+HEROES_FILE = "heroes.parquet"
+BOONS_FILE = "boons.parquet"
+
+MISSING_KEYS_FIELD = "__missing__"
+
+# (field, kind) in the order fields are written back to each record.
+# kind: "str" -> dictionary-encoded string, "text" -> plain string,
+#       "int_or_str" -> nullable int64 column plus a dictionary-encoded text column
+SCENARIO_FIELDS = [
+    ("id", "text"),
+    ("campaign", "str"),
+    ("scenario", "str"),
+    ("heroes_played", "heroes"),
+    ("outcome", "str"),
+    ("difficulty", "str"),
+    ("modular_sets", "str"),
+    ("villain_health_remaining", "int_or_str"),
+    ("turns_taken", "int_or_str"),
+    ("threat_on_scheme", "int_or_str"),
+    ("notes", "text"),
+    ("date", "str"),
+]
+HERO_FIELDS = [
+    ("hero", "str"),
+    ("aspect", "str"),
+    ("health_remaining", "int_or_str"),
+]
+BOON_FIELDS = [
+    ("id", "text"),
+    ("date", "str"),
+    ("type", "str"),
+    ("content", "text"),
+]
+
+_INT64_MIN = -(1 << 63)
+_INT64_MAX = (1 << 63) - 1
+
+
+def is_columnar_file(header):
+    """Returns True if the first bytes of a file belong to a columnar save file."""
+    return header.startswith(ZIP_MAGIC)
+
+
+def _import_pyarrow():
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    return pa, pq
+
+
+# --- Writing ---
+class _TableBuilder:
+    """Accumulates the columns of one flat table, one record at a time."""
+
+    def __init__(self, fields, leading_columns=()):
+        self.known_fields = {field for field, _ in fields}
+        self.fields = [(field, kind) for field, kind in fields if kind != "heroes"]
+        self.columns = {}
+        self.column_types = {}
+        for name, column_type in leading_columns:
+            self._add_column(name, column_type)
+        for field, kind in self.fields:
+            if kind == "int_or_str":
+                self._add_column(field, "int")
+                self._add_column(field + "_text", "str")
+            else:
+                self._add_column(field, kind)
+        self._add_column("extra", "text")
+
+    def _add_column(self, name, column_type):
+        self.columns[name] = []
+        self.column_types[name] = column_type
+
+    def add(self, item, extra=None, **leading_values):
+        """Appends one record. Values that don't fit their column go to ``extra``."""
+        extra = dict(extra or {})
+        for name, value in leading_values.items():
+            self.columns[name].append(value)
+        for field, kind in self.fields:
+            value = item.get(field)
+            if kind == "int_or_str":
+                fits_int = type(value) is int and _INT64_MIN <= value <= _INT64_MAX
+                self.columns[field].append(value if fits_int else None)
+                self.columns[field + "_text"].append(value if type(value) is str else None)
+                fits = fits_int or type(value) is str
+            else:
+                fits = type(value) is str
+                self.columns[field].append(value if fits else None)
+            if field not in item:
+                extra.setdefault(MISSING_KEYS_FIELD, []).append(field)
+            elif not fits:
+                extra[field] = value
+        for key, value in item.items():
+            if key not in self.known_fields:
+                extra[key] = value
+        self.columns["extra"].append(json.dumps(extra) if extra else None)
+
+    def to_parquet(self, pa, pq):
+        arrays = {}
+        for name, values in self.columns.items():
+            column_type = self.column_types[name]
+            if column_type == "int":
+                arrays[name] = pa.array(values, type=pa.int64())
+            elif column_type == "str":
+                arrays[name] = pa.array(values, type=pa.string()).dictionary_encode()
+            else:
+                arrays[name] = pa.array(values, type=pa.string())
+        buffer = io.BytesIO()
+        pq.write_table(pa.table(arrays), buffer, compression="zstd")
+        return buffer.getvalue()
+
+
+def serialize_campaign_data_columnar(players, scenarios_played, campaign_boons):
+    """Returns the campaign data as a columnar save file (bytes)."""
+    pa, pq = _import_pyarrow()
+
+    scenarios = _TableBuilder(SCENARIO_FIELDS)
+    heroes = _TableBuilder(HERO_FIELDS, leading_columns=[("scenario_row", "int")])
+    for row, record in enumerate(scenarios_played):
+        record = as_dict(record)
+        heroes_played = record.get("heroes_played")
+        extra = {}
+        if isinstance(heroes_played, list) and all(isinstance(h, dict) for h in heroes_played):
+            for hero_info in heroes_played:
+                heroes.add(hero_info, scenario_row=row)
+        elif "heroes_played" in record:
+            extra["heroes_played"] = heroes_played
+        else:
+            extra[MISSING_KEYS_FIELD] = ["heroes_played"]
+        scenarios.add(record, extra)
+
+    boons = _TableBuilder(BOON_FIELDS, leading_columns=[("campaign", "str")])
+    for campaign_name, campaign_notes in campaign_boons.items():
+        for note in campaign_notes:
+            boons.add(note, campaign=campaign_name)
+
+    manifest = {
+        "format": FORMAT_NAME,
+        "version": FORMAT_VERSION,
+        "schema_version": SCHEMA_VERSION,
+        "players": players,
+        # Keeps campaigns whose note list is empty, and the campaigns' order
+        "boon_campaigns": list(campaign_boons),
+    }
+    buffer = io.BytesIO()
+    # The Parquet tables are already compressed
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_STORED) as archive:
+        archive.writestr(MANIFEST_FILE, json.dumps(manifest))
+        archive.writestr(SCENARIOS_FILE, scenarios.to_parquet(pa, pq))
+        archive.writestr(HEROES_FILE, heroes.to_parquet(pa, pq))
+        archive.writestr(BOONS_FILE, boons.to_parquet(pa, pq))
+    return buffer.getvalue()
+
+
+# --- Reading ---
+def _column_values(table, name):
+    """Returns a column as a Python list; dictionary columns share one str per distinct value."""
+    pa = _import_pyarrow()[0]
+    column = table.column(name)
+    if pa.types.is_dictionary(column.type):
+        values = []
+        for chunk in column.chunks:
+            dictionary = chunk.dictionary.to_pylist()
+            if chunk.null_count:
+                values.extend([None if i is None else dictionary[i] for i in chunk.indices.to_pylist()])
+            else:
+                values.extend([dictionary[i] for i in chunk.indices.to_pylist()])
+        return values
+    return column.to_pylist()
+
+
+def _read_records(table, fields, nested_columns=None):
+    """Rebuilds the record dicts of a flat table.
+
+    ``nested_columns`` supplies per-row values for fields that are stored in
+    another table (the scenarios' heroes_played lists).
+    """
+    nested_columns = nested_columns or {}
+    names = []
+    columns = []
+    for field, kind in fields:
+        names.append(field)
+        if field in nested_columns:
+            columns.append(nested_columns[field])
+            continue
+        values = _column_values(table, field)
+        if kind == "int_or_str":
+            text_values = _column_values(table, field + "_text")
+            values = [text if value is None else value for value, text in zip(values, text_values)]
+        columns.append(values)
+    extras = table.column("extra").to_pylist()
+
+    records = []
+    for extra, row in zip(extras, zip(*columns)):
+        if extra is None:
+            # Every field was present and fit its column
+            records.append(dict(zip(names, row)))
+            continue
+        extra = json.loads(extra)
+        missing = set(extra.pop(MISSING_KEYS_FIELD, ()))
+        record = {}
+        for field, value in zip(names, row):
+            if field in missing:
+                continue
+            record[field] = extra.pop(field) if field in extra else value
+        record.update(extra)
+        records.append(record)
+    return records
+
+
+def read_campaign_data_columnar(binary_stream):
+    """Reads a columnar save file into a dict shaped like the JSON save file."""
+    pa, pq = _import_pyarrow()
+    with zipfile.ZipFile(binary_stream) as archive:
+        manifest = json.loads(archive.read(MANIFEST_FILE))
+        if manifest.get("format") != FORMAT_NAME or manifest.get("version", 0) > FORMAT_VERSION:
+            raise ValueError("Unsupported columnar campaign data file.")
+        scenario_table = pq.read_table(io.BytesIO(archive.read(SCENARIOS_FILE)))
+        hero_table = pq.read_table(io.BytesIO(archive.read(HEROES_FILE)))
+        boon_table = pq.read_table(io.BytesIO(archive.read(BOONS_FILE)))
+
+    heroes_by_row = [[] for _ in range(scenario_table.num_rows)]
+    for scenario_row, hero_info in zip(_column_values(hero_table, "scenario_row"), _read_records(hero_table, HERO_FIELDS)):
+        heroes_by_row[scenario_row].append(hero_info)
+    scenarios_played = _read_records(scenario_table, SCENARIO_FIELDS, {"heroes_played": heroes_by_row})
+
+    campaign_boons = {campaign_name: [] for campaign_name in manifest.get("boon_campaigns", [])}
+    for campaign_name, note in zip(_column_values(boon_table, "campaign"), _read_records(boon_table, BOON_FIELDS)):
+        campaign_boons.setdefault(campaign_name, []).append(note)
+
+    return {
+        "schema_version": manifest.get("schema_version", LEGACY_SCHEMA_VERSION),
+        "players": manifest.get("players", []),
+        "scenarios_played": scenarios_played,
+        "campaign_boons": campaign_boons,
+    }
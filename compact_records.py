@@ -0,0 +1,295 @@
+# compact_records.py
+"""Compact in-memory scenario records.
+
+A scenario record loaded from a data file is a dict of 12 keys whose hero list
+holds one more dict per hero, plus a "%Y-%m-%d" date string: well over a
+kilobyte per play. ScenarioRecord keeps the same values in ``__slots__``
+instead, with the hero list as a tuple of slotted HeroPlay entries (shared
+between records, since the same hero/aspect/health entries recur),
+catalog-like strings (campaign, scenario, hero, ...) interned, and the date
+as a shared day ordinal (dates in any other form are kept as they are).
+
+Both classes are read-only mappings that look exactly like the dicts of the
+JSON schema: ``record["date"]`` is the date string and
+``record["heroes_played"]`` a sequence of hero mappings, so code written
+against dict records keeps working. ``to_dict()`` converts back losslessly;
+keys that aren't part of the schema are kept in ``extra``.
+
+The shared hero entries and dates live in process-wide tables that every
+session uses. They stay small: only hero entries made of catalog values are
+shared, and the date tables are emptied once they hold DATE_CACHE_LIMIT
+dates. The tables need no lock, since a lookup or insert is a single dict
+operation; two threads missing the same key just build equal values.
+"""
+import datetime
+import sys
+from collections.abc import Mapping
+
+from catalog import MARVEL_CHAMPIONS_ASPECTS, MARVEL_CHAMPIONS_HEROES
+
+SCENARIO_FIELDS = (
+    "id", "campaign", "scenario", "heroes_played", "outcome", "difficulty", "modular_sets",
+    "villain_health_remaining", "turns_taken", "threat_on_scheme", "notes", "date"
+)
+HERO_FIELDS = ("hero", "aspect", "health_remaining")
+# String values shared between many records
+INTERNED_SCENARIO_FIELDS = frozenset((
+    "campaign", "scenario", "outcome", "difficulty", "modular_sets", "villain_health_remaining"
+))
+INTERNED_HERO_FIELDS = frozenset(HERO_FIELDS)
+
+# Hero entries shared between records: catalog heroes and aspects (or the form's "not selected"
+# values) with a health the app records
+SHARED_HEROES = frozenset(MARVEL_CHAMPIONS_HEROES[1:] + ["N/A (Not Selected)"])
+SHARED_ASPECTS = frozenset(MARVEL_CHAMPIONS_ASPECTS[1:] + ["N/A"])
+SHARED_HEALTH_VALUES = frozenset(["N/A", "N/A (Defeated)"])
+MAX_SHARED_HEALTH = 99
+DATE_CACHE_LIMIT = 1 << 15  # dates kept in each date table (about 90 years of days)
+
+_MISSING = object()  # slot value of a key the record doesn't have
+_PLAIN_SCENARIO_FIELDS = frozenset(SCENARIO_FIELDS) - {"date"}  # slots holding the value as it is
+_shared_hero_plays = {}  # (hero, aspect, health) -> the shared HeroPlay
+_ordinals_by_date = {}  # "%Y-%m-%d" string -> the shared day ordinal
+_date_strings = {}  # day ordinal -> its "%Y-%m-%d" string
+
+
+def _interned(value):
+    return sys.intern(value) if type(value) is str else value
+
+
+def _date_ordinal(value):
+    """Returns the shared day ordinal of a "%Y-%m-%d" date string, or None if the value isn't one."""
+    ordinal = _ordinals_by_date.get(value) if type(value) is str else None
+    if ordinal is not None or type(value) is not str or len(value) != 10:
+        return ordinal
+    try:
+        date = datetime.date.fromisoformat(value)
+    except ValueError:
+        return None
+    if date.isoformat() != value:
+        return None
+    if len(_ordinals_by_date) >= DATE_CACHE_LIMIT:
+        _ordinals_by_date.clear()
+    ordinal = _ordinals_by_date[value] = date.toordinal()
+    return ordinal
+
+
+def _date_string(ordinal):
+    text = _date_strings.get(ordinal)
+    if text is None:
+        if len(_date_strings) >= DATE_CACHE_LIMIT:
+            _date_strings.clear()
+        text = _date_strings[ordinal] = datetime.date.fromordinal(ordinal).isoformat()
+    return text
+
+
+def _is_shared_hero(hero, aspect, health):
+    """True if a hero entry is made of values the app records (so there are only so many of them)."""
+    if hero not in SHARED_HEROES or aspect not in SHARED_ASPECTS:
+        return False
+    if type(health) is int:
+        return 0 <= health <= MAX_SHARED_HEALTH
+    return health in SHARED_HEALTH_VALUES
+
+
+class _CompactMapping(Mapping):
+    """Read-only mapping over slots; subclasses define ``_fields`` and ``_value(key)``."""
+
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        value = self._value(key)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def get(self, key, default=None):
+        value = self._value(key)
+        return default if value is _MISSING else value
+
+    def __contains__(self, key):
+        return self._value(key) is not _MISSING
+
+    def __iter__(self):
+        for field in self._fields:
+            if getattr(self, field) is not _MISSING:
+                yield field
+        if self.extra:
+            yield from self.extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __eq__(self, other):
+        if isinstance(other, Mapping):
+            return self.to_dict() == as_dict(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class HeroPlay(_CompactMapping):
+    """One entry of a record's heroes_played list."""
+
+    __slots__ = HERO_FIELDS + ("extra",)
+    _fields = HERO_FIELDS
+
+    def __init__(self, hero_info):
+        get = hero_info.get
+        self.hero = _interned(get("hero", _MISSING))
+        self.aspect = _interned(get("aspect", _MISSING))
+        self.health_remaining = _interned(get("health_remaining", _MISSING))
+        self.extra = None
+        if len(hero_info) > len(HERO_FIELDS) or _MISSING in (self.hero, self.aspect, self.health_remaining):
+            self.extra = {key: value for key, value in hero_info.items() if key not in INTERNED_HERO_FIELDS} or None
+
+    # The listeners read these a lot; the plain fields skip _value
+    def __getitem__(self, key):
+        if key in INTERNED_HERO_FIELDS:
+            value = getattr(self, key)
+            if value is not _MISSING:
+                return value
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        if key in INTERNED_HERO_FIELDS:
+            value = getattr(self, key)
+            return default if value is _MISSING else value
+        return super().get(key, default)
+
+    def _value(self, key):
+        if key in INTERNED_HERO_FIELDS:
+            return getattr(self, key)
+        if self.extra is not None:
+            return self.extra.get(key, _MISSING)
+        return _MISSING
+
+    def to_dict(self):
+        item = {field: getattr(self, field) for field in HERO_FIELDS if getattr(self, field) is not _MISSING}
+        if self.extra:
+            item.update(self.extra)
+        return item
+
+
+class ScenarioRecord(_CompactMapping):
+    """A scenario record with slots instead of a dict (see the module docstring)."""
+
+    __slots__ = SCENARIO_FIELDS + ("extra",)
+    _fields = SCENARIO_FIELDS
+    _field_set = frozenset(SCENARIO_FIELDS)
+
+    def __init__(self, record):
+        get = record.get
+        self.id = get("id", _MISSING)
+        self.campaign = _interned(get("campaign", _MISSING))
+        self.scenario = _interned(get("scenario", _MISSING))
+        self.outcome = _interned(get("outcome", _MISSING))
+        self.difficulty = _interned(get("difficulty", _MISSING))
+        self.modular_sets = _interned(get("modular_sets", _MISSING))
+        self.villain_health_remaining = _interned(get("villain_health_remaining", _MISSING))
+        self.turns_taken = get("turns_taken", _MISSING)
+        self.threat_on_scheme = get("threat_on_scheme", _MISSING)
+        self.notes = get("notes", _MISSING)
+
+        heroes_played = get("heroes_played", _MISSING)
+        if type(heroes_played) in (list, tuple) and all(type(h) is dict or type(h) is HeroPlay for h in heroes_played):
+            heroes_played = tuple(_hero_play(h) for h in heroes_played)
+        self.heroes_played = heroes_played
+
+        date = get("date", _MISSING)
+        ordinal = _date_ordinal(date)
+        self.date = _MISSING if ordinal is None else ordinal
+
+        extra = None
+        if len(record) > len(SCENARIO_FIELDS) or ordinal is None:
+            extra = {key: value for key, value in record.items() if key not in self._field_set}
+            if ordinal is None and date is not _MISSING:
+                # Dates in any other form are kept as they are
+                extra["date"] = date
+        self.extra = extra or None
+
+    def __eq__(self, other):
+        if type(other) is ScenarioRecord:
+            return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+        return super().__eq__(other)
+
+    __hash__ = None
+
+    # The listeners read these a lot; the plain fields skip _value
+    def __getitem__(self, key):
+        if key in _PLAIN_SCENARIO_FIELDS:
+            value = getattr(self, key)
+            if value is not _MISSING:
+                return value
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        if key in _PLAIN_SCENARIO_FIELDS:
+            value = getattr(self, key)
+            return default if value is _MISSING else value
+        return super().get(key, default)
+
+    def _value(self, key):
+        if key in _PLAIN_SCENARIO_FIELDS:
+            return getattr(self, key)
+        if key == "date" and self.date is not _MISSING:
+            return _date_string(self.date)
+        if self.extra is not None:
+            return self.extra.get(key, _MISSING)
+        return _MISSING
+
+    @property
+    def date_ordinal(self):
+        """The play's day ordinal (datetime.date.toordinal), or None if its date isn't "%Y-%m-%d"."""
+        return None if self.date is _MISSING else self.date
+
+    def to_dict(self):
+        """The record as a dict of the JSON schema."""
+        item = {}
+        for field in SCENARIO_FIELDS:
+            value = getattr(self, field)
+            if value is _MISSING:
+                continue
+            if field == "heroes_played" and type(value) is tuple:
+                value = [hero_info.to_dict() for hero_info in value]
+            elif field == "date":
+                value = _date_string(value)
+            item[field] = value
+        if self.extra:
+            item.update(self.extra)
+        return item
+
+
+def _hero_play(hero_info):
+    """Returns a HeroPlay for a hero dict; plain entries are shared between records (they never change)."""
+    if type(hero_info) is HeroPlay:
+        return hero_info
+    if len(hero_info) == len(HERO_FIELDS):
+        key = (hero_info.get("hero"), hero_info.get("aspect"), hero_info.get("health_remaining"))
+        if type(key[0]) is str and type(key[1]) is str and type(key[2]) in (int, str):
+            hero_play = _shared_hero_plays.get(key)
+            if hero_play is None and _is_shared_hero(*key):
+                hero_play = _shared_hero_plays[key] = HeroPlay(hero_info)
+            if hero_play is not None:
+                return hero_play
+    return HeroPlay(hero_info)
+
+
+def compact_record(record):
+    """Returns a ScenarioRecord for a record dict (or the record itself if it is one already)."""
+    return record if type(record) is ScenarioRecord else ScenarioRecord(record)
+
+
+def as_dict(item):
+    """Returns a plain dict for a compact record or hero entry (other mappings are returned as they are)."""
+    return item.to_dict() if isinstance(item, _CompactMapping) else item
+
+
+def to_json_value(value):
+    """``default`` hook for json.dumps that writes compact records as their dicts."""
+    if isinstance(value, _CompactMapping):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
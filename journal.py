@@ -0,0 +1,273 @@
+# journal.py
+"""Autosave of campaign data as a snapshot plus an append-only journal of changes.
+
+The journal directory holds numbered generations:
+
+* ``snapshot-000003.json`` - the full data at the start of generation 3, as a
+  regular (compact) campaign data file that can also be loaded in the app
+* ``journal-000003.jsonl`` - every change made since, one JSON line per change
+  (see campaign_changes)
+
+Each change costs one short append, however large the archive is. Once the
+journal grows past a limit, it is compacted: a new generation is started
+right away, and a background thread writes the snapshot for it and then
+deletes older generations (the previous one is kept as a backup). Files are
+only ever created under a temporary name and renamed into place, so a crash at
+any point leaves a snapshot plus journals that replay to the latest state.
+
+A crash can cut short only the change being appended, the last line of the
+newest journal; reopening the journal drops it. Any other line that can't be
+read means the journal was damaged, and loading raises JournalError rather
+than silently replaying the changes around it.
+"""
+import json
+import os
+import re
+import threading
+
+import campaign_changes
+from campaign_io import read_campaign_data, serialize_campaign_data
+from compact_records import to_json_value
+
+SNAPSHOT_PATTERN = re.compile(r"^snapshot-(\d+)\.json$")
+JOURNAL_PATTERN = re.compile(r"^journal-(\d+)\.jsonl$")
+COMPACT_MIN_BYTES = 1 << 20  # never compact a journal smaller than this
+COMPACT_MAX_CHANGES = 10000  # always compact a journal with this many changes
+
+
+def _snapshot_name(generation):
+    return f"snapshot-{generation:06d}.json"
+
+
+def _journal_name(generation):
+    return f"journal-{generation:06d}.jsonl"
+
+
+def _generations(directory, pattern):
+    generations = []
+    for name in os.listdir(directory):
+        match = pattern.match(name)
+        if match:
+            generations.append(int(match.group(1)))
+    return sorted(generations)
+
+
+class JournalError(ValueError):
+    """Raised when a journal has a change that can't be read before its end (not a crash, so not skipped)."""
+
+
+def _end_after_last_line(path):
+    """Makes a journal end with a complete line, so the next change starts a line of its own.
+
+    A crash while a change was being appended can leave it cut short: it is
+    removed, unless only its newline is missing (then the newline is added).
+    This keeps a cut-short change the last line of the newest journal, the
+    only place replaying allows one.
+    """
+    with open(path, "rb+") as f:
+        end = f.seek(0, os.SEEK_END)
+        line_start = end
+        while line_start > 0:
+            block_start = max(0, line_start - 65536)
+            f.seek(block_start)
+            block = f.read(line_start - block_start)
+            if line_start == end and block.endswith(b"\n"):
+                return
+            newline = block.rfind(b"\n")
+            if newline >= 0:
+                line_start = block_start + newline + 1
+                break
+            line_start = block_start
+        if line_start == end:
+            return
+        f.seek(line_start)
+        try:
+            json.loads(f.read())
+        except ValueError:
+            f.truncate(line_start)
+        else:
+            f.write(b"\n")
+
+
+class _ReplayState:
+    """Campaign data being rebuilt from a snapshot; scenarios are keyed by id for O(1) deletes."""
+
+    def __init__(self, data):
+        self.players = list(data.get("players", []))
+        self.scenarios = {record["id"]: record for record in data.get("scenarios_played", [])}
+        self.campaign_boons = {campaign: list(notes) for campaign, notes in data.get("campaign_boons", {}).items()}
+
+    def apply(self, change):
+        op = change["op"]
+        if op == campaign_changes.ADD_PLAYER:
+            if change["name"] not in self.players:
+                self.players.append(change["name"])
+        elif op == campaign_changes.ADD_SCENARIO:
+            self.scenarios[change["record"]["id"]] = change["record"]
+        elif op == campaign_changes.ADD_SCENARIOS:
+            for record in change["records"]:
+                self.scenarios[record["id"]] = record
+        elif op == campaign_changes.DELETE_SCENARIO:
+            self.scenarios.pop(change["id"], None)
+        elif op == campaign_changes.DELETE_SCENARIOS:
+            for record_id in change["ids"]:
+                self.scenarios.pop(record_id, None)
+        elif op == campaign_changes.ADD_NOTE:
+            self.campaign_boons.setdefault(change["campaign"], []).append(change["note"])
+        elif op == campaign_changes.DELETE_NOTE:
+            notes = self.campaign_boons.get(change["campaign"], [])
+            self.campaign_boons[change["campaign"]] = [note for note in notes if note.get("id") != change["id"]]
+        elif op == campaign_changes.REPLACE_ALL:
+            self.__init__(change["data"])
+        else:
+            raise ValueError(f"Unknown change: {op}")
+
+    def data(self):
+        return {
+            "players": self.players,
+            "scenarios_played": list(self.scenarios.values()),
+            "campaign_boons": self.campaign_boons,
+        }
+
+
+class CampaignJournal:
+    """Snapshot + append-only journal autosave in a directory.
+
+    Appends come from Streamlit's script threads and compaction runs on its
+    own thread, so the current journal file is guarded by a lock.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._compaction = None  # the running compaction thread, if any
+        snapshots = _generations(directory, SNAPSHOT_PATTERN)
+        journals = _generations(directory, JOURNAL_PATTERN)
+        self.generation = max(snapshots[-1:] + journals[-1:] + [0])
+        self._file = None
+        self._open_generation(self.generation)
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _open_generation(self, generation):
+        if self._file is not None:
+            self._file.close()
+        self.generation = generation
+        path = self._path(_journal_name(generation))
+        if os.path.exists(path):
+            _end_after_last_line(path)
+        self._file = open(path, "a", encoding="utf-8")
+        self.journal_bytes = self._file.tell()
+        self.journal_changes = 0
+        snapshot_path = self._path(_snapshot_name(generation))
+        self.snapshot_bytes = os.path.getsize(snapshot_path) if os.path.exists(snapshot_path) else 0
+
+    def close(self):
+        if self._compaction is not None:
+            self._compaction.join()
+        with self._lock:
+            self._file.close()
+
+    # --- Reads ---
+    def is_empty(self):
+        """True if nothing has been saved in the directory yet."""
+        with self._lock:
+            if _generations(self.directory, SNAPSHOT_PATTERN):
+                return False
+            return all(
+                os.path.getsize(self._path(_journal_name(generation))) == 0
+                for generation in _generations(self.directory, JOURNAL_PATTERN)
+            )
+
+    def load(self):
+        """Replays the latest complete snapshot and every later journal; returns the data dict."""
+        with self._lock:
+            snapshots = _generations(self.directory, SNAPSHOT_PATTERN)
+            base_generation = snapshots[-1] if snapshots else 0
+            data = {"players": [], "scenarios_played": [], "campaign_boons": {}}
+            if snapshots:
+                with open(self._path(_snapshot_name(base_generation)), "rb") as f:
+                    data = read_campaign_data(f)
+            state = _ReplayState(data)
+            generations = [
+                generation for generation in _generations(self.directory, JOURNAL_PATTERN)
+                if generation >= base_generation
+            ]
+            for generation in generations:
+                self._replay(self._path(_journal_name(generation)), state, generation == generations[-1])
+            return state.data()
+
+    @staticmethod
+    def _replay(path, state, is_latest):
+        """Applies the changes of one journal; only the latest one's last line may be cut short."""
+        with open(path, encoding="utf-8") as f:
+            lines = enumerate(f, 1)
+            for line_number, line in lines:
+                try:
+                    change = json.loads(line)
+                except json.JSONDecodeError as e:
+                    if is_latest and next(lines, None) is None:
+                        # A change cut short by a crash while it was being appended
+                        return
+                    raise JournalError(
+                        f"Line {line_number} of {os.path.basename(path)} could not be read ({e}); "
+                        "only the last change of the newest journal can be cut short by a crash."
+                    ) from e
+                state.apply(change)
+
+    # --- Writes ---
+    def append(self, change):
+        """Appends one change to the journal."""
+        line = json.dumps(change, separators=(",", ":"), default=to_json_value) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            self.journal_bytes += len(line)
+            self.journal_changes += 1
+
+    def needs_compaction(self):
+        if self._compaction is not None and self._compaction.is_alive():
+            return False
+        return (
+            self.journal_changes >= COMPACT_MAX_CHANGES
+            or self.journal_bytes > max(COMPACT_MIN_BYTES, self.snapshot_bytes // 2)
+        )
+
+    def compact(self, players, scenarios_played, campaign_boons, background=True):
+        """Starts a new generation whose snapshot is the given (current) data.
+
+        The caller passes copies of its containers (the records themselves are
+        never modified in place), so the snapshot can be written on a
+        background thread while the app keeps changing its data.
+        """
+        with self._lock:
+            new_generation = self.generation + 1
+            self._open_generation(new_generation)
+        if background:
+            self._compaction = threading.Thread(
+                target=self._write_snapshot, args=(new_generation, players, scenarios_played, campaign_boons),
+                name="journal-compaction", daemon=True
+            )
+            self._compaction.start()
+        else:
+            self._write_snapshot(new_generation, players, scenarios_played, campaign_boons)
+
+    def _write_snapshot(self, generation, players, scenarios_played, campaign_boons):
+        contents = serialize_campaign_data(players, scenarios_played, campaign_boons, compact=True)
+        path = self._path(_snapshot_name(generation))
+        temporary_path = path + ".tmp"
+        with open(temporary_path, "w", encoding="utf-8") as f:
+            f.write(contents)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary_path, path)
+        with self._lock:
+            if self.generation == generation:
+                self.snapshot_bytes = len(contents)
+        # Keep the previous generation as a backup
+        for pattern, name in ((SNAPSHOT_PATTERN, _snapshot_name), (JOURNAL_PATTERN, _journal_name)):
+            for old_generation in _generations(self.directory, pattern):
+                if old_generation < generation - 1:
+                    os.remove(self._path(name(old_generation)))
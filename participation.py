@@ -0,0 +1,167 @@
+# participation.py
+"""Flat, typed hero participation table for vectorized statistics.
+
+Scenario records nest their heroes as a list of dicts whose health is either
+an int or a string like "N/A (Defeated)". ParticipationTable flattens them into
+one row per hero per play, stored in compact typed arrays:
+
+* campaign, scenario, difficulty, hero and aspect as integer codes into the
+  catalog lists (values outside the catalogs get new codes, nothing is lost)
+* win and defeated as 0/1 flags
+* health remaining as an integer with a separate "known" mask
+
+It subscribes to the ScenarioStore, so rows are appended and tombstoned as
+plays are recorded and deleted. ``frame()`` exposes the table as a pandas
+DataFrame with categorical and nullable-integer columns, rebuilt only when the
+store version changes.
+"""
+from array import array
+
+import numpy as np
+import pandas as pd
+
+from scenario_store import NOT_SELECTED_HERO
+
+DEFEATED_HEALTH = "N/A (Defeated)"
+
+_CODE_COLUMNS = ("campaign", "scenario", "difficulty", "hero", "aspect")
+_FLAG_COLUMNS = ("win", "defeated", "health_known")
+
+
+class Codebook:
+    """Maps category values to stable integer codes, starting from a catalog."""
+
+    def __init__(self, catalog=()):
+        self.categories = []
+        self._codes = {}
+        for value in catalog:
+            self.code(value)
+
+    def code(self, value):
+        if not isinstance(value, str):
+            value = str(value)
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.categories)
+            self.categories.append(value)
+        return code
+
+
+class ParticipationTable:
+    """One row per hero per recorded play, maintained incrementally."""
+
+    def __init__(self, campaigns=(), scenarios=(), difficulties=(), heroes=(), aspects=()):
+        self._codebooks = {
+            "campaign": Codebook(campaigns),
+            "scenario": Codebook(scenarios),
+            "difficulty": Codebook(difficulties),
+            "hero": Codebook(heroes),
+            "aspect": Codebook(aspects),
+        }
+        self._reset_columns()
+        self._rows_by_id = {}  # record id -> row indexes
+        self._frame = None
+        self._frame_key = None
+        self._stats_cache = {}
+        self._version = 0
+
+    def _reset_columns(self):
+        self._columns = {name: array("i") for name in _CODE_COLUMNS}
+        self._columns.update({name: array("b") for name in _FLAG_COLUMNS})
+        self._columns["health"] = array("q")
+        self._alive = array("b")
+        self._dead_rows = 0
+
+    # --- ScenarioStore listener interface ---
+    def record_added(self, record):
+        base_codes = {
+            name: self._codebooks[name].code(record.get(name))
+            for name in ("campaign", "scenario", "difficulty")
+        }
+        win = 1 if record.get("outcome") == "Win" else 0
+        rows = []
+        for hero_info in record.get("heroes_played", []):
+            if hero_info.get("hero") == NOT_SELECTED_HERO:
+                continue
+            health = hero_info.get("health_remaining")
+            health_known = type(health) is int
+            rows.append(len(self._alive))
+            for name, code in base_codes.items():
+                self._columns[name].append(code)
+            self._columns["hero"].append(self._codebooks["hero"].code(hero_info.get("hero")))
+            self._columns["aspect"].append(self._codebooks["aspect"].code(hero_info.get("aspect")))
+            self._columns["win"].append(win)
+            self._columns["defeated"].append(1 if health == DEFEATED_HEALTH else 0)
+            self._columns["health_known"].append(1 if health_known else 0)
+            self._columns["health"].append(health if health_known else 0)
+            self._alive.append(1)
+        self._rows_by_id[record["id"]] = rows
+        self._version += 1
+
+    def record_removed(self, record):
+        for row in self._rows_by_id.pop(record["id"], ()):
+            self._alive[row] = 0
+            self._dead_rows += 1
+        self._version += 1
+        if self._dead_rows > len(self._alive) // 2:
+            self._compact()
+
+    def _compact(self):
+        """Drops deleted rows once they make up more than half of the table."""
+        keep = np.frombuffer(self._alive, dtype=np.int8).astype(bool)
+        new_index = np.cumsum(keep) - 1
+        old_columns = self._columns
+        self._reset_columns()
+        for name, column in old_columns.items():
+            values = np.frombuffer(column, dtype=column.typecode)[keep]
+            self._columns[name].frombytes(values.tobytes())
+        self._alive.frombytes(np.ones(int(keep.sum()), dtype=np.int8).tobytes())
+        self._rows_by_id = {
+            record_id: [int(new_index[row]) for row in rows] for record_id, rows in self._rows_by_id.items()
+        }
+
+    # --- Reads ---
+    def __len__(self):
+        return len(self._alive) - self._dead_rows
+
+    def frame(self):
+        """Returns the live rows as a DataFrame with categorical and nullable-integer columns."""
+        if self._frame is not None and self._frame_key == self._version:
+            return self._frame
+
+        alive = np.frombuffer(self._alive, dtype=np.int8).astype(bool)
+
+        def column(name):
+            column_values = self._columns[name]
+            return np.frombuffer(column_values, dtype=column_values.typecode)[alive]
+
+        data = {
+            name: pd.Categorical.from_codes(column(name), categories=self._codebooks[name].categories)
+            for name in _CODE_COLUMNS
+        }
+        data["win"] = column("win").astype(bool)
+        data["defeated"] = column("defeated").astype(bool)
+        data["health_remaining"] = pd.arrays.IntegerArray(column("health"), ~column("health_known").astype(bool))
+        self._frame = pd.DataFrame(data)
+        self._frame_key = self._version
+        return self._frame
+
+    def hero_aspect_stats(self, campaign_name=None):
+        """Plays, wins, win % and average health left on wins per hero and aspect."""
+        cached = self._stats_cache.get(campaign_name)
+        if cached is not None and cached[0] == self._version:
+            return cached[1]
+        df = self.frame()
+        if campaign_name is not None:
+            df = df[df["campaign"] == campaign_name]
+        stats = df.groupby(["hero", "aspect"], observed=True).agg(
+            Plays=("win", "size"),
+            Wins=("win", "sum"),
+            avg_health=("health_remaining", "mean"),
+        )
+        stats["Win %"] = (stats["Wins"] / stats["Plays"] * 100).round(2)
+        stats["Avg HP Left (Wins)"] = stats.pop("avg_health").astype("Float64").round(1)
+        stats.index.names = ["Hero", "Aspect"]
+        stats = stats.sort_values(by=["Plays", "Win %"], ascending=False)
+        self._stats_cache[campaign_name] = (self._version, stats)
+        return stats
@@ -0,0 +1,142 @@
+# profiler.py
+"""Opt-in timing of the app's sections and helpers.
+
+A Profiler keeps, per named section, a rolling window of recent durations
+(for the histogram and percentiles in the sidebar panel) and a bounded log of
+trace events that can be exported as JSON or in the Chrome trace event format
+(open it in chrome://tracing or https://ui.perfetto.dev).
+"""
+import contextlib
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+
+HISTORY_SIZE = 200  # durations kept per section
+MAX_TRACE_EVENTS = 20000
+# Histogram bucket upper bounds, in milliseconds
+HISTOGRAM_BOUNDS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, math.inf]
+
+
+def _percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class Profiler:
+    """Durations per section plus a trace of individual timings.
+
+    Sections can be timed from any thread (the save file is built on
+    Streamlit's download thread), so recording is guarded by a lock.
+    """
+
+    def __init__(self, history_size=HISTORY_SIZE, max_trace_events=MAX_TRACE_EVENTS):
+        self.enabled = False
+        self.rerun_count = 0
+        self._history_size = history_size
+        self._durations = {}  # section -> deque of seconds
+        self._events = deque(maxlen=max_trace_events)
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+
+    def begin_rerun(self):
+        """Marks the start of a script run; trace events are tagged with the run number."""
+        self.rerun_count += 1
+
+    @contextlib.contextmanager
+    def section(self, name):
+        """Times the body of a with block as one occurrence of ``name``."""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start, time.perf_counter() - start)
+
+    def record(self, name, start, duration):
+        with self._lock:
+            history = self._durations.get(name)
+            if history is None:
+                history = self._durations[name] = deque(maxlen=self._history_size)
+            history.append(duration)
+            self._events.append((name, start, duration, threading.get_ident(), self.rerun_count))
+
+    def reset(self):
+        with self._lock:
+            self._durations.clear()
+            self._events.clear()
+
+    # --- Reads ---
+    def sections(self):
+        with self._lock:
+            return list(self._durations)
+
+    def summary(self):
+        """Returns a row per section: count, last, median, p90 and max duration (ms) over the window."""
+        with self._lock:
+            histories = {name: list(history) for name, history in self._durations.items()}
+        rows = []
+        for name, durations in histories.items():
+            ordered = sorted(durations)
+            rows.append({
+                "Section": name,
+                "Count": len(durations),
+                "Last (ms)": round(durations[-1] * 1000, 2),
+                "Median (ms)": round(_percentile(ordered, 0.5) * 1000, 2),
+                "p90 (ms)": round(_percentile(ordered, 0.9) * 1000, 2),
+                "Max (ms)": round(ordered[-1] * 1000, 2),
+            })
+        rows.sort(key=lambda row: row["Median (ms)"], reverse=True)
+        return rows
+
+    def histogram(self, name):
+        """Returns [(bucket label, count)] of the section's recent durations."""
+        with self._lock:
+            durations = list(self._durations.get(name, ()))
+        counts = [0] * len(HISTOGRAM_BOUNDS_MS)
+        for duration in durations:
+            milliseconds = duration * 1000
+            counts[next(i for i, bound in enumerate(HISTOGRAM_BOUNDS_MS) if milliseconds <= bound)] += 1
+        labels = [f"≤{bound:g} ms" for bound in HISTOGRAM_BOUNDS_MS[:-1]] + [f">{HISTOGRAM_BOUNDS_MS[-2]:g} ms"]
+        return list(zip(labels, counts))
+
+    # --- Export ---
+    def _event_list(self):
+        with self._lock:
+            return list(self._events)
+
+    def to_json(self):
+        """Returns the summary and every traced timing as a JSON string."""
+        events = [
+            {
+                "section": name,
+                "start_ms": round((start - self._origin) * 1000, 3),
+                "duration_ms": round(duration * 1000, 3),
+                "thread": thread_id,
+                "rerun": rerun,
+            }
+            for name, start, duration, thread_id, rerun in self._event_list()
+        ]
+        return json.dumps({"summary": self.summary(), "events": events}, indent=2)
+
+    def to_chrome_trace(self):
+        """Returns the traced timings in the Chrome trace event format (JSON)."""
+        pid = os.getpid()
+        events = [
+            {
+                "name": name,
+                "cat": "section",
+                "ph": "X",
+                "ts": round((start - self._origin) * 1e6, 1),
+                "dur": round(duration * 1e6, 1),
+                "pid": pid,
+                "tid": thread_id,
+                "args": {"rerun": rerun},
+            }
+            for name, start, duration, thread_id, rerun in self._event_list()
+        ]
+        return json.dumps({"traceEvents": events, "displayTimeUnit": "ms"})
@@ -0,0 +1,282 @@
+# recommendations.py
+"""Hero / aspect team recommendations for a scenario and difficulty, from smoothed win rates.
+
+HeroRecommendations subscribes to the ScenarioStore and keeps small tallies of
+plays and wins (plus turns taken, hero health left on wins and villain health
+left on losses) for every hero / aspect: overall, per scenario, and per
+scenario and difficulty. It also tallies every pair of hero / aspects that
+played together and every exact team, per scenario and difficulty. Recording
+or deleting a play only bumps the tallies of that play.
+
+Win rates are smoothed with Beta priors, each level shrunk toward the one
+above it (PRIOR_PLAYS pseudo-plays): a hero / aspect's rate on a scenario and
+difficulty starts from their rate on the scenario, which starts from their
+overall rate, shifted by how much harder that scenario (or difficulty) is than
+average. A hero with two lucky wins therefore doesn't outrank one with a long
+record, and a hero never seen on a scenario is judged by the rest of their
+history.
+
+A team is scored in log-odds: the scenario's base rate plus the average
+advantage of its members, plus the average synergy of its pairs (how much
+better pairs did together than their members' rates predict). The plays of
+that exact team on the scenario and difficulty then update the score. Only the
+best members (CANDIDATES, at most ASPECTS_PER_HERO of each hero, so they span
+enough heroes for a full team) are combined, so ranking 4-hero teams stays
+cheap, and results are memoized until the next play is recorded or deleted.
+"""
+import itertools
+import math
+
+from scenario_store import NOT_SELECTED_HERO
+
+PRIOR_PLAYS = 4  # pseudo-plays each smoothed rate borrows from the level above it
+CANDIDATES = 16  # best hero / aspects combined into teams
+ASPECTS_PER_HERO = 2  # most candidates with the same hero, so they cover at least CANDIDATES / 2 heroes
+CACHED_QUERIES = 64  # results memoized for the current data (the oldest are dropped first)
+MAX_TEAM_SIZE = 4
+RECOMMENDATION_LIMIT = 10
+
+# Tally fields: plays and wins, then sums and counts of the numeric details
+PLAYS, WINS, TURNS_TOTAL, TURNS_COUNTED, HEALTH_TOTAL, HEALTH_COUNTED, VILLAIN_TOTAL, VILLAIN_COUNTED = range(8)
+DETAIL_FIELDS = 8
+_EPSILON = 1e-6
+
+
+def _logit(p):
+    p = min(max(p, _EPSILON), 1 - _EPSILON)
+    return math.log(p / (1 - p))
+
+
+def _sigmoid(x):
+    return 1 / (1 + math.exp(-x))
+
+
+def _smoothed(tally, prior):
+    """Posterior mean win rate of a tally under a Beta prior with mean ``prior`` worth PRIOR_PLAYS plays."""
+    if tally is None:
+        return prior
+    return (tally[WINS] + PRIOR_PLAYS * prior) / (tally[PLAYS] + PRIOR_PLAYS)
+
+
+def _average(total, count):
+    return round(total / count, 1) if count else None
+
+
+class HeroRecommendations:
+    """Smoothed win-rate tables of hero / aspects and teams, kept up to date by the ScenarioStore."""
+
+    def __init__(self, heroes=(), aspects=()):
+        self._catalog = [(hero, aspect) for hero in heroes for aspect in aspects]
+        self._plays = {}  # None, (scenario,) or (scenario, difficulty) -> [plays, wins]
+        self._heroes = {}  # (hero, aspect) or (scenario, hero, aspect) -> [plays, wins]
+        self._hero_details = {}  # (scenario, difficulty, hero, aspect) -> tally with every field
+        self._pairs = {}  # ((hero, aspect), (hero, aspect)), sorted -> [plays, wins]
+        self._teams = {}  # (scenario, difficulty) -> {sorted team: tally with every field}
+        self._version = 0
+        self._cache = {}  # (query, arguments) -> result, for the data at _cache_version
+        self._cache_version = 0
+
+    # --- ScenarioStore listener interface ---
+    def record_added(self, record):
+        self._apply(record, 1)
+
+    def record_removed(self, record):
+        self._apply(record, -1)
+
+    @staticmethod
+    def _team(record):
+        """The record's distinct (hero, aspect) pairs, with the health left of each, sorted."""
+        team = {}
+        heroes_played = record.get("heroes_played")
+        if isinstance(heroes_played, (list, tuple)):
+            for hero_info in heroes_played:
+                hero = hero_info.get("hero")
+                if isinstance(hero, str) and hero and hero != NOT_SELECTED_HERO:
+                    team.setdefault((hero, str(hero_info.get("aspect"))), hero_info.get("health_remaining"))
+        return sorted(team.items())
+
+    @staticmethod
+    def _bump(table, key, delta, win, size=2):
+        tally = table.get(key)
+        if tally is None:
+            tally = table[key] = [0] * size
+        tally[PLAYS] += delta
+        tally[WINS] += win
+        if not tally[PLAYS]:
+            del table[key]
+        return tally
+
+    @staticmethod
+    def _bump_details(tally, delta, turns, health, villain_health):
+        if turns is not None:
+            tally[TURNS_TOTAL] += turns * delta
+            tally[TURNS_COUNTED] += delta
+        if health is not None:
+            tally[HEALTH_TOTAL] += health * delta
+            tally[HEALTH_COUNTED] += delta
+        if villain_health is not None:
+            tally[VILLAIN_TOTAL] += villain_health * delta
+            tally[VILLAIN_COUNTED] += delta
+
+    def _apply(self, record, delta):
+        team = self._team(record)
+        if not team:
+            return
+        scenario, difficulty = record.get("scenario"), record.get("difficulty")
+        won = record.get("outcome") == "Win"
+        win = delta if won else 0
+        turns = record.get("turns_taken")
+        turns = turns if type(turns) is int else None
+        villain_health = record.get("villain_health_remaining")
+        villain_health = villain_health if type(villain_health) is int and not won else None
+
+        bump = self._bump
+        for key in (None, (scenario,), (scenario, difficulty)):
+            bump(self._plays, key, delta, win)
+        members = []
+        for member, health in team:
+            members.append(member)
+            bump(self._heroes, member, delta, win)
+            bump(self._heroes, (scenario, *member), delta, win)
+            details = bump(self._hero_details, (scenario, difficulty, *member), delta, win, DETAIL_FIELDS)
+            self._bump_details(details, delta, turns, health if type(health) is int and won else None, villain_health)
+        for pair in itertools.combinations(members, 2):
+            bump(self._pairs, pair, delta, win)
+        teams = self._teams.setdefault((scenario, difficulty), {})
+        self._bump_details(bump(teams, tuple(members), delta, win, DETAIL_FIELDS), delta, turns, None, villain_health)
+        self._version += 1
+
+    def _cached(self, key):
+        if self._cache_version != self._version:
+            self._cache.clear()
+            self._cache_version = self._version
+        return self._cache.get(key)
+
+    def _store(self, key, result):
+        if len(self._cache) >= CACHED_QUERIES:
+            del self._cache[next(iter(self._cache))]
+        self._cache[key] = result
+        return result
+
+    # --- Estimates ---
+    def _base_rates(self, scenario, difficulty):
+        """Smoothed win rates of all plays, the scenario's, and the scenario's at the difficulty."""
+        overall = self._plays.get(None)
+        base = (overall[WINS] + 1) / (overall[PLAYS] + 2) if overall else 0.5
+        scenario_rate = _smoothed(self._plays.get((scenario,)), base)
+        return base, scenario_rate, _smoothed(self._plays.get((scenario, difficulty)), scenario_rate)
+
+    def _member_rates(self, scenario, difficulty):
+        """{(hero, aspect): smoothed win rate on the scenario at the difficulty} for every known member, memoized."""
+        key = ("members", scenario, difficulty)
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+        base, scenario_rate, difficulty_rate = self._base_rates(scenario, difficulty)
+        scenario_shift = _logit(scenario_rate) - _logit(base)
+        difficulty_shift = _logit(difficulty_rate) - _logit(scenario_rate)
+        heroes = self._heroes
+        rates = {}
+        for member in dict.fromkeys(self._catalog + [key for key in heroes if len(key) == 2]):
+            overall = _smoothed(heroes.get(member), base)
+            on_scenario = _smoothed(heroes.get((scenario, *member)), _sigmoid(_logit(overall) + scenario_shift))
+            rates[member] = _smoothed(
+                self._hero_details.get((scenario, difficulty, *member)), _sigmoid(_logit(on_scenario) + difficulty_shift)
+            )
+        return self._store(key, rates)
+
+    def _synergy(self, first, second):
+        """Log-odds by which a pair did better together than their overall rates predict (smoothed)."""
+        tally = self._pairs.get((first, second) if first < second else (second, first))
+        if tally is None:
+            return 0.0
+        overall = self._plays.get(None)
+        base = (overall[WINS] + 1) / (overall[PLAYS] + 2)
+        first_logit = _logit(_smoothed(self._heroes.get(first), base))
+        expected = _sigmoid((first_logit + _logit(_smoothed(self._heroes.get(second), base))) / 2)
+        return _logit(_smoothed(tally, expected)) - _logit(expected)
+
+    def _team_score(self, team, scenario, difficulty, rates, base_logit, synergies):
+        """Smoothed win rate of a (sorted) team on the scenario at the difficulty; ``synergies`` memoizes pairs."""
+        advantage = sum(_logit(rates[member]) - base_logit for member in team if member in rates) / len(team)
+        pairs = list(itertools.combinations(team, 2))
+        for pair in pairs:
+            if pair not in synergies:
+                synergies[pair] = self._synergy(*pair)
+        synergy = sum(synergies[pair] for pair in pairs) / len(pairs) if pairs else 0.0
+        return _smoothed(self._teams.get((scenario, difficulty), {}).get(team), _sigmoid(base_logit + advantage + synergy))
+
+    # --- Reads ---
+    @property
+    def total_plays(self):
+        overall = self._plays.get(None)
+        return overall[PLAYS] if overall else 0
+
+    def hero_table(self, scenario, difficulty, limit=RECOMMENDATION_LIMIT):
+        """The best hero / aspects on a scenario at a difficulty, as rows of
+        [hero, aspect, expected win %, plays, wins, avg turns, avg health left on wins, avg villain health left on losses]
+        (the plays, wins and averages are those on this scenario and difficulty)."""
+        key = ("heroes", scenario, difficulty, limit)
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+        rates = self._member_rates(scenario, difficulty)
+        rows = []
+        for member in sorted(rates, key=lambda member: (-rates[member], member))[:limit]:
+            details = self._hero_details.get((scenario, difficulty, *member)) or [0] * DETAIL_FIELDS
+            rows.append([
+                *member, round(rates[member] * 100, 1), details[PLAYS], details[WINS],
+                _average(details[TURNS_TOTAL], details[TURNS_COUNTED]),
+                _average(details[HEALTH_TOTAL], details[HEALTH_COUNTED]),
+                _average(details[VILLAIN_TOTAL], details[VILLAIN_COUNTED]),
+            ])
+        return self._store(key, rows)
+
+    def recommend(self, scenario, difficulty, team_size, fixed=(), limit=RECOMMENDATION_LIMIT):
+        """The best teams of ``team_size`` heroes on a scenario at a difficulty, best first.
+
+        ``fixed`` are (hero, aspect) pairs already chosen; every team includes
+        them. Rows are [team (tuple of (hero, aspect)), expected win %, plays of
+        that exact team here, wins, avg turns, avg villain health left on losses].
+        """
+        team_size = max(1, min(team_size, MAX_TEAM_SIZE))
+        fixed = tuple(sorted(set(fixed)))[:team_size]
+        key = ("teams", scenario, difficulty, team_size, fixed, limit)
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+
+        rates = self._member_rates(scenario, difficulty)
+        base_logit = _logit(self._base_rates(scenario, difficulty)[2])
+        fixed_heroes = {hero for hero, _ in fixed}
+        open_slots = team_size - len(fixed)
+        candidates = []
+        aspects_per_hero = dict.fromkeys(fixed_heroes, ASPECTS_PER_HERO)
+        for member in sorted(rates, key=lambda member: (-rates[member], member)):
+            if aspects_per_hero.get(member[0], 0) < ASPECTS_PER_HERO:
+                aspects_per_hero[member[0]] = aspects_per_hero.get(member[0], 0) + 1
+                candidates.append(member)
+                if len(candidates) == CANDIDATES:
+                    break
+        teams = set()
+        for members in itertools.combinations(candidates, open_slots):
+            if len({hero for hero, _ in members}) == open_slots:
+                teams.add(tuple(sorted(fixed + members)))
+        # Teams that were played here are always considered, even with members outside the candidates
+        played = self._teams.get((scenario, difficulty), {})
+        teams.update(team for team in played if len(team) == team_size and set(fixed) <= set(team))
+
+        synergies = {}
+        scored = sorted(
+            ((self._team_score(team, scenario, difficulty, rates, base_logit, synergies), team) for team in teams),
+            key=lambda item: (-item[0], item[1])
+        )
+        rows = []
+        for score, team in scored[:limit]:
+            tally = played.get(team) or [0] * DETAIL_FIELDS
+            rows.append([
+                team, round(score * 100, 1), tally[PLAYS], tally[WINS],
+                _average(tally[TURNS_TOTAL], tally[TURNS_COUNTED]),
+                _average(tally[VILLAIN_TOTAL], tally[VILLAIN_COUNTED]),
+            ])
+        return self._store(key, rows)
@@ -0,0 +1,361 @@
+# reports.py
+"""Shareable campaign reports (CSV, Excel or a standalone HTML page), built in the background.
+
+A report covers the chosen campaigns with four tables:
+
+* Scenario Log - every play, as shown in the app's Scenario Log (newest first)
+* Scenario Results - wins, losses and win % per scenario
+* Hero Plays - plays per hero, most played first
+* Boons & Notes - the campaign's boons, choices and notes (newest first)
+
+A CSV report is a zip with one file per table, an Excel report a workbook with
+one sheet per table, and an HTML report a single page with a section per
+campaign. Excel files are written directly (an .xlsx file is a zip of XML
+parts), so no Excel engine has to be installed.
+
+Building a report for a large archive takes seconds, so ReportJobs runs the
+builds on a small thread pool shared by every session, and keeps the finished
+files until the data changes, like the save-file ExportCache. The build works
+on a ReportData snapshot (lists of the immutable records and notes), so it
+never holds the dataset lock.
+"""
+import csv
+import datetime
+import html
+import io
+import re
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from campaign_stats import CampaignStats
+from scenario_log import LOG_COLUMNS, format_log_row
+
+REPORT_WORKERS = 2  # report builds running at once, across all sessions
+PROGRESS_EVERY = 5000  # rows between progress updates
+EXCEL_MAX_ROWS = 1048576  # rows per worksheet, including the header
+
+TABLE_COLUMNS = {
+    "Scenario Log": LOG_COLUMNS,
+    "Scenario Results": ["Campaign", "Scenario", "Win", "Loss", "Total", "Win %"],
+    "Hero Plays": ["Campaign", "Hero", "Plays"],
+    "Boons & Notes": ["Campaign", "Date Added", "Type", "Note/Boon/Choice"],
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _report_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=REPORT_WORKERS, thread_name_prefix="report")
+        return _executor
+
+
+class ReportData:
+    """What a report shows, copied out of the live data by ``snapshot``."""
+
+    def __init__(self, campaigns, records, notes):
+        self.campaigns = campaigns  # campaign names, in report order
+        self.records = records  # campaign -> list of scenario records
+        self.notes = notes  # campaign -> list of note dicts
+
+
+def snapshot(scenario_store, campaign_boons, campaigns):
+    """Copies the records and notes of some campaigns; call it holding the dataset lock."""
+    return ReportData(
+        list(campaigns),
+        {campaign: scenario_store.for_campaign(campaign) for campaign in campaigns},
+        {campaign: list(campaign_boons.get(campaign, [])) for campaign in campaigns},
+    )
+
+
+# --- Tables ---
+def report_tables(data, on_progress=None):
+    """Returns {table name: {campaign: rows}}; rows are lists in TABLE_COLUMNS order, without the campaign."""
+    tables = {name: {} for name in TABLE_COLUMNS}
+    total_rows = sum(len(records) for records in data.records.values()) or 1
+    done_rows = 0
+    for campaign in data.campaigns:
+        stats = CampaignStats()
+        log_rows = []
+        for record in data.records[campaign]:
+            row = format_log_row(record)
+            log_rows.append([row[column] for column in LOG_COLUMNS[1:]])
+            stats.record_added(record)
+            done_rows += 1
+            if on_progress is not None and done_rows % PROGRESS_EVERY == 0:
+                on_progress(done_rows / total_rows, f"Formatting plays ({done_rows:,} of {total_rows:,})...")
+        # Newest first (log columns are Scenario ... Date Played once the campaign is left out)
+        log_rows.sort(key=lambda row: str(row[-1]), reverse=True)
+        tables["Scenario Log"][campaign] = log_rows
+
+        tables["Scenario Results"][campaign] = stats.scenario_results(campaign)
+        tables["Hero Plays"][campaign] = [[hero, plays] for hero, plays in stats.hero_play_counts(campaign)]
+
+        notes = [[note.get("date"), note.get("type"), note.get("content")] for note in data.notes[campaign]]
+        notes.sort(key=lambda row: str(row[0]), reverse=True)
+        tables["Boons & Notes"][campaign] = notes
+    return tables
+
+
+def _flat_rows(rows_by_campaign):
+    for campaign, rows in rows_by_campaign.items():
+        for row in rows:
+            yield [campaign] + row
+
+
+# --- Writers ---
+def _csv_report(tables, data, on_progress):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for i, (name, rows_by_campaign) in enumerate(tables.items()):
+            on_progress(i / len(tables), f"Writing {name}...")
+            text = io.StringIO()
+            writer = csv.writer(text)
+            writer.writerow(TABLE_COLUMNS[name])
+            writer.writerows(_flat_rows(rows_by_campaign))
+            file_name = re.sub(r"\W+", "_", name.lower()).strip("_") + ".csv"
+            archive.writestr(file_name, text.getvalue().encode("utf-8-sig"))  # the BOM makes Excel read UTF-8
+    return buffer.getvalue()
+
+
+# Characters XML 1.0 doesn't allow
+_XML_INVALID_CHARACTERS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+_XLSX_MAX_CELL_CHARACTERS = 32767
+_XLSX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '{overrides}</Types>'
+)
+_XLSX_SHEET_CONTENT_TYPE = (
+    '<Override PartName="/xl/worksheets/sheet{number}.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+)
+_XLSX_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/></Relationships>'
+)
+_XLSX_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets>{sheets}</sheets></workbook>'
+)
+_XLSX_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">{relationships}</Relationships>'
+)
+_XLSX_SHEET_RELATIONSHIP = (
+    '<Relationship Id="rId{number}" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet{number}.xml"/>'
+)
+
+
+def _xlsx_column_name(index):
+    name = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        name = chr(ord("A") + remainder) + name
+    return name
+
+
+def _xlsx_cell(reference, value):
+    if value is None:
+        return ""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        if value != value or value in (float("inf"), float("-inf")):
+            return ""
+        return f'<c r="{reference}"><v>{value!r}</v></c>'
+    text = _XML_INVALID_CHARACTERS.sub("", str(value))[:_XLSX_MAX_CELL_CHARACTERS]
+    return f'<c r="{reference}" t="inlineStr"><is><t xml:space="preserve">{html.escape(text, quote=False)}</t></is></c>'
+
+
+def _xlsx_sheet(columns, rows):
+    letters = [_xlsx_column_name(i) for i in range(len(columns))]
+    parts = [
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+    ]
+    for row_number, row in enumerate([columns] + rows, start=1):
+        cells = "".join(_xlsx_cell(f"{letter}{row_number}", value) for letter, value in zip(letters, row))
+        parts.append(f'<row r="{row_number}">{cells}</row>')
+    parts.append("</sheetData></worksheet>")
+    return "".join(parts)
+
+
+def _excel_report(tables, data, on_progress):
+    sheets = []  # (sheet name, columns, rows); tables longer than a worksheet continue on more sheets
+    for name, rows_by_campaign in tables.items():
+        rows = list(_flat_rows(rows_by_campaign))
+        chunk_size = EXCEL_MAX_ROWS - 1
+        for part, start in enumerate(range(0, max(len(rows), 1), chunk_size)):
+            sheets.append((name if part == 0 else f"{name} ({part + 1})", TABLE_COLUMNS[name], rows[start:start + chunk_size]))
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        numbers = range(1, len(sheets) + 1)
+        archive.writestr("[Content_Types].xml", _XLSX_CONTENT_TYPES.format(
+            overrides="".join(_XLSX_SHEET_CONTENT_TYPE.format(number=number) for number in numbers)
+        ))
+        archive.writestr("_rels/.rels", _XLSX_ROOT_RELS)
+        archive.writestr("xl/workbook.xml", _XLSX_WORKBOOK.format(sheets="".join(
+            f'<sheet name="{html.escape(name)}" sheetId="{number}" r:id="rId{number}"/>'
+            for number, (name, _, _) in zip(numbers, sheets)
+        )))
+        archive.writestr("xl/_rels/workbook.xml.rels", _XLSX_WORKBOOK_RELS.format(
+            relationships="".join(_XLSX_SHEET_RELATIONSHIP.format(number=number) for number in numbers)
+        ))
+        for number, (name, columns, rows) in zip(numbers, sheets):
+            on_progress((number - 1) / len(sheets), f"Writing {name}...")
+            archive.writestr(f"xl/worksheets/sheet{number}.xml", _xlsx_sheet(columns, rows))
+    return buffer.getvalue()
+
+
+_HTML_PAGE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>Marvel Champions Campaign Report</title>
+<style>
+body {{ font-family: sans-serif; margin: 2em; color: #222; }}
+table {{ border-collapse: collapse; margin-bottom: 1.5em; font-size: 0.9em; }}
+th, td {{ border: 1px solid #ccc; padding: 0.25em 0.5em; text-align: left; }}
+th {{ background: #eee; }}
+</style>
+</head>
+<body>
+<h1>Marvel Champions Campaign Report</h1>
+<p>Generated on {generated}.</p>
+{sections}
+</body>
+</html>
+"""
+
+
+def _html_table(columns, rows):
+    parts = ["<table><thead><tr>"]
+    parts.extend(f"<th>{html.escape(column)}</th>" for column in columns)
+    parts.append("</tr></thead><tbody>")
+    for row in rows:
+        cells = "".join(f"<td>{'' if value is None else html.escape(str(value))}</td>" for value in row)
+        parts.append(f"<tr>{cells}</tr>")
+    parts.append("</tbody></table>")
+    return "".join(parts)
+
+
+def _html_report(tables, data, on_progress):
+    sections = []
+    for i, campaign in enumerate(data.campaigns):
+        on_progress(i / len(data.campaigns), f"Writing {campaign}...")
+        sections.append(f"<h2>{html.escape(str(campaign))}</h2>")
+        for name, rows_by_campaign in tables.items():
+            rows = rows_by_campaign[campaign]
+            sections.append(f"<h3>{html.escape(name)}</h3>")
+            if rows:
+                sections.append(_html_table(TABLE_COLUMNS[name][1:], rows))
+            else:
+                sections.append("<p>None recorded.</p>")
+    page = _HTML_PAGE.format(generated=datetime.date.today().isoformat(), sections="\n".join(sections))
+    return page.encode("utf-8")
+
+
+_WRITERS = {"CSV": _csv_report, "Excel": _excel_report, "HTML": _html_report}
+
+
+def build_report(data, report_format, on_progress=None):
+    """Returns the report file (bytes) for a ReportData snapshot.
+
+    ``on_progress(fraction, text)`` is called now and then while it builds.
+    """
+    if on_progress is None:
+        on_progress = lambda fraction, text: None  # noqa: E731
+    on_progress(0.0, "Formatting plays...")
+    # Formatting the rows is most of the work; writing the file is the rest
+    tables = report_tables(data, lambda fraction, text: on_progress(0.6 * fraction, text))
+    contents = _WRITERS[report_format](
+        tables, data, lambda fraction, text: on_progress(0.6 + 0.4 * fraction, text)
+    )
+    on_progress(1.0, "Done")
+    return contents
+
+
+# --- Jobs ---
+class ReportJob:
+    """One report build; ``progress`` and ``stage`` are updated from the worker thread."""
+
+    def __init__(self):
+        self.progress = 0.0
+        self.stage = "Waiting for a worker..."
+        self.future = None
+
+    def _report_progress(self, fraction, text):
+        self.progress = min(max(fraction, 0.0), 1.0)
+        self.stage = text
+
+    def _run(self, build):
+        return build(self._report_progress)
+
+    @property
+    def done(self):
+        return self.future.done()
+
+    @property
+    def error(self):
+        """The exception the build raised, or None."""
+        if not self.future.done() or self.future.cancelled():
+            return None
+        return self.future.exception()
+
+    def result(self):
+        """The finished report file (bytes)."""
+        return self.future.result()
+
+
+class ReportJobs:
+    """Report builds for one dataset, memoized against its data version.
+
+    ``invalidate()`` is called whenever the data changes: builds that haven't
+    started are cancelled, and the finished reports are dropped. Builds run
+    on the shared report thread pool.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self._jobs = {}  # variant -> ReportJob
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        with self._lock:
+            self.version += 1
+            for job in self._jobs.values():
+                job.future.cancel()
+            self._jobs.clear()
+
+    def get(self, variant):
+        """Returns the job for ``variant`` (running or finished), or None."""
+        with self._lock:
+            return self._jobs.get(variant)
+
+    def submit(self, variant, build):
+        """Starts ``build(on_progress)`` for ``variant`` unless it is running or done already; returns its job.
+
+        A job that failed is started again.
+        """
+        with self._lock:
+            job = self._jobs.get(variant)
+            if job is None or job.error is not None or job.future.cancelled():
+                job = self._jobs[variant] = ReportJob()
+                job.future = _report_executor().submit(job._run, build)
+            return job
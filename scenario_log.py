@@ -0,0 +1,151 @@
+# scenario_log.py
+"""Display formatting and memoization for the Scenario Log table.
+
+The row formatting is also used by reports and the command line, so pandas is
+only imported once a DataFrame is built.
+"""
+
+LOG_COLUMNS = [
+    "Campaign", "Scenario", "Difficulty", "Heroes Used", "Outcome", "Modular Sets",
+    "Villain HP Left (Loss)", "Turns Taken", "Threat on Scheme", "Notes", "Date Played"
+]
+
+
+def format_heroes(heroes_played):
+    """Formats a record's heroes as 'Hero (Aspect) (12 HP)' strings."""
+    heroes_str = []
+    for hero_info in heroes_played:
+        health_display = ""
+        if isinstance(hero_info["health_remaining"], int):
+            health_display = f" ({hero_info['health_remaining']} HP)"
+        elif hero_info["health_remaining"] == "N/A (Defeated)":
+            health_display = " (Defeated)"
+
+        aspect_display = f" ({hero_info['aspect']})" if hero_info["aspect"] != "N/A" else ""
+
+        heroes_str.append(f"{hero_info['hero']}{aspect_display}{health_display}")
+    return heroes_str
+
+
+def format_log_row(record):
+    """Returns the Scenario Log row (column -> value) for a scenario record."""
+    return {
+        "Campaign": record["campaign"],
+        "Scenario": record["scenario"],
+        "Difficulty": record["difficulty"],
+        "Heroes Used": ", ".join(format_heroes(record["heroes_played"])),
+        "Outcome": record["outcome"],
+        "Modular Sets": record["modular_sets"] if record["modular_sets"] else "N/A",
+        "Villain HP Left (Loss)": record["villain_health_remaining"] if record["outcome"] == "Loss" else "N/A",
+        "Turns Taken": record["turns_taken"],
+        "Threat on Scheme": record["threat_on_scheme"],
+        "Notes": record["notes"],
+        "Date Played": record["date"]
+    }
+
+
+def format_log_label(record, row):
+    """Returns the one-line description of a record used by the delete selector."""
+    return (
+        f"{record['date']} - {record['scenario']} ({record['difficulty']}) "
+        f"with {row['Heroes Used']} - {record['outcome']}"
+    )
+
+
+LOG_SORT_COLUMNS = ["Date Played", "Scenario", "Outcome", "Heroes Used"]
+
+
+def _log_frame(rows, record_ids):
+    import pandas as pd
+
+    df_scenarios = pd.DataFrame(rows, columns=LOG_COLUMNS, index=pd.Index(record_ids, name="id", dtype=object))
+    df_scenarios['Date Played'] = pd.to_datetime(df_scenarios['Date Played'])
+    return df_scenarios
+
+
+def log_page_frame(records):
+    """Returns the Scenario Log rows of some records (e.g. a page read from the database), indexed by record id."""
+    return _log_frame([format_log_row(record) for record in records], [record["id"] for record in records])
+
+
+def page_bounds(total_rows, page_number, page_size):
+    """Returns (start, end, page_count) of a 1-based page, clamped to the available rows."""
+    page_count = max(1, -(-total_rows // page_size))
+    page_number = min(max(page_number, 1), page_count)
+    start = (page_number - 1) * page_size
+    return start, min(start + page_size, total_rows), page_count
+
+
+class ScenarioLogCache:
+    """Pre-formatted log rows per campaign plus memoized, sorted DataFrames.
+
+    Subscribed to the ScenarioStore: each added record is formatted once, and
+    deleted records are dropped. A campaign's sorted frame is rebuilt only when
+    the store version has moved since it was last built, so reruns that do not
+    touch the data (toggling a radio, paging, typing in a form) reuse it as-is.
+    Frames are indexed by record id.
+    """
+
+    def __init__(self):
+        self._rows = {}  # campaign -> {id: (row, label)}
+        self._frames = {}  # (campaign, sort column, ascending) -> (version, DataFrame)
+
+    # --- ScenarioStore listener interface ---
+    def record_added(self, record):
+        row = format_log_row(record)
+        self._rows.setdefault(record["campaign"], {})[record["id"]] = (row, format_log_label(record, row))
+
+    def record_removed(self, record):
+        campaign_rows = self._rows.get(record["campaign"], {})
+        campaign_rows.pop(record["id"], None)
+        if not campaign_rows:
+            self._rows.pop(record["campaign"], None)
+
+    # --- Reads ---
+    def label(self, campaign_name, record_id):
+        """Returns the one-line description of a record, for selectors."""
+        return self._rows[campaign_name][record_id][1]
+
+    def frame(self, campaign_name, version, sort_by="Date Played", ascending=False):
+        """Returns the campaign's log as a DataFrame indexed by record id, sorted by one column."""
+        key = (campaign_name, sort_by, ascending)
+        cached = self._frames.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        if sort_by == "Date Played":
+            # Date order doesn't depend on the other sort keys, so reuse the (newest first) date-sorted frame
+            base = self._date_sorted_frame(campaign_name, version)
+            df_scenarios = base if not ascending else base.iloc[::-1]
+        else:
+            df_scenarios = self._date_sorted_frame(campaign_name, version).sort_values(
+                by=sort_by, ascending=ascending, kind="stable"
+            )
+        self._frames[key] = (version, df_scenarios)
+        return df_scenarios
+
+    def _date_sorted_frame(self, campaign_name, version):
+        key = (campaign_name, None, None)
+        cached = self._frames.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        campaign_rows = self._rows.get(campaign_name, {})
+        df_scenarios = _log_frame([row for row, _ in campaign_rows.values()], list(campaign_rows))
+        df_scenarios = df_scenarios.sort_values(by='Date Played', ascending=False, kind='stable')
+        self._frames[key] = (version, df_scenarios)
+        return df_scenarios
+
+    def query(self, campaign_name, version, scenario=None, outcome=None, record_ids=None,
+              sort_by="Date Played", ascending=False):
+        """Returns the sorted log filtered by scenario, outcome and/or a set of record ids."""
+        df_scenarios = self.frame(campaign_name, version, sort_by, ascending)
+        mask = None
+        if scenario is not None:
+            mask = df_scenarios["Scenario"] == scenario
+        if outcome is not None:
+            outcome_mask = df_scenarios["Outcome"] == outcome
+            mask = outcome_mask if mask is None else mask & outcome_mask
+        if record_ids is not None:
+            ids_mask = df_scenarios.index.isin(list(record_ids))
+            mask = ids_mask if mask is None else mask & ids_mask
+        return df_scenarios if mask is None else df_scenarios[mask]
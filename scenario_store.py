@@ -0,0 +1,144 @@
+# scenario_store.py
+"""Indexed in-memory store for recorded scenario plays.
+
+Records are kept as compact ScenarioRecords (see compact_records), which read
+like the dicts that are saved to and loaded from the campaign data file. The
+store keeps an id -> record map plus secondary indexes by campaign,
+scenario and hero so that lookups, filtering and deletes never have to scan
+the whole log.
+
+Derived views (statistics, caches) can subscribe with ``add_listener``; they
+are told about every record that is added or removed so they can update
+incrementally instead of rescanning the log. ``version`` increases on every
+change, so renderers can memoize on it.
+"""
+from campaign_io import gc_paused
+from compact_records import compact_record
+
+NOT_SELECTED_HERO = "N/A (Not Selected)"
+
+
+def record_hero_names(record):
+    """Returns the distinct hero names that took part in a scenario record."""
+    heroes = []
+    for hero_info in record.get("heroes_played", []):
+        hero = hero_info.get("hero")
+        if hero and hero != NOT_SELECTED_HERO and hero not in heroes:
+            heroes.append(hero)
+    return heroes
+
+
+class ScenarioStore:
+    """Scenario records indexed by id, campaign, scenario and hero.
+
+    Each secondary index maps a key to a dict of ``{id: record}``. Python dicts
+    keep insertion order, so they double as ordered sets: adding and removing a
+    record is O(1) and iterating an index yields records in the order they were
+    recorded, exactly like the old flat list.
+    """
+
+    def __init__(self, records=()):
+        self._by_id = {}
+        self._by_campaign = {}
+        self._by_scenario = {}
+        self._by_hero = {}
+        self._listeners = []
+        self.version = 0
+        # Building many records at once; see gc_paused
+        with gc_paused():
+            for record in records:
+                self.add(record)
+
+    def add_listener(self, listener):
+        """Subscribes a listener with record_added(record) / record_removed(record) methods.
+
+        Records already in the store are replayed to it so it starts in sync.
+        """
+        for record in self._by_id.values():
+            listener.record_added(record)
+        self._listeners.append(listener)
+        return listener
+
+    # --- Writes ---
+    def add(self, record):
+        """Adds a record (a dict or ScenarioRecord) and returns it as a ScenarioRecord.
+
+        The record must carry a unique "id".
+        """
+        record = compact_record(record)
+        record_id = record["id"]
+        if record_id in self._by_id:
+            raise ValueError(f"Duplicate scenario id: {record_id}")
+        self._by_id[record_id] = record
+        self._by_campaign.setdefault(record.get("campaign"), {})[record_id] = record
+        self._by_scenario.setdefault(record.get("scenario"), {})[record_id] = record
+        for hero in record_hero_names(record):
+            self._by_hero.setdefault(hero, {})[record_id] = record
+        self.version += 1
+        for listener in self._listeners:
+            listener.record_added(record)
+        return record
+
+    def remove(self, record_id):
+        """Removes and returns the record with the given id, or None if it is unknown."""
+        record = self._by_id.pop(record_id, None)
+        if record is None:
+            return None
+        self._unindex(self._by_campaign, record.get("campaign"), record_id)
+        self._unindex(self._by_scenario, record.get("scenario"), record_id)
+        for hero in record_hero_names(record):
+            self._unindex(self._by_hero, hero, record_id)
+        self.version += 1
+        for listener in self._listeners:
+            listener.record_removed(record)
+        return record
+
+    @staticmethod
+    def _unindex(index, key, record_id):
+        bucket = index.get(key)
+        if bucket is None:
+            return
+        bucket.pop(record_id, None)
+        if not bucket:
+            del index[key]
+
+    # --- Reads ---
+    def get(self, record_id):
+        return self._by_id.get(record_id)
+
+    def __contains__(self, record_id):
+        return record_id in self._by_id
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def __iter__(self):
+        return iter(self._by_id.values())
+
+    def records(self):
+        """Returns all records as a list, in the order they were recorded."""
+        return list(self._by_id.values())
+
+    def for_campaign(self, campaign_name):
+        """Returns the records of one campaign, in the order they were recorded."""
+        return list(self._by_campaign.get(campaign_name, {}).values())
+
+    def count_for_campaign(self, campaign_name):
+        return len(self._by_campaign.get(campaign_name, ()))
+
+    def for_scenario(self, scenario_name, campaign_name=None):
+        """Returns the records of one scenario, optionally restricted to a campaign."""
+        records = self._by_scenario.get(scenario_name, {}).values()
+        if campaign_name is None:
+            return list(records)
+        return [r for r in records if r.get("campaign") == campaign_name]
+
+    def for_hero(self, hero_name, campaign_name=None):
+        """Returns the records a hero took part in, optionally restricted to a campaign."""
+        records = self._by_hero.get(hero_name, {}).values()
+        if campaign_name is None:
+            return list(records)
+        return [r for r in records if r.get("campaign") == campaign_name]
+
+    def campaigns(self):
+        return list(self._by_campaign)
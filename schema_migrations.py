@@ -0,0 +1,211 @@
+# schema_migrations.py
+"""Campaign data schema versions and the batch steps that upgrade older data.
+
+Saved files start with a "schema_version" header. Files saved before it
+existed are version 1 (LEGACY_SCHEMA_VERSION): records may lack an "id" or
+share one, may lack optional fields (older app versions didn't record them
+all), and health values may be numbers saved as strings. In version 2 every
+scenario and note has a unique id and every field the app shows, and hero /
+villain health is an int or one of the "N/A" strings the app writes.
+
+Steps are registered with ``@migration(from_version, kind)`` and upgrade a
+batch of records in place; a Migrator runs, for one file, every step from its
+version up to SCHEMA_VERSION. The loader hands records over in batches as it
+streams the file, so upgrading stays linear and the steps can do their work
+in bulk (ids, for instance, are generated from one block of random bytes).
+Current-version files have no steps to run and skip all of this. Every step
+is timed, and MigrationReport tells what it changed and what it cost.
+"""
+import os
+import time
+
+SCHEMA_VERSION = 2
+LEGACY_SCHEMA_VERSION = 1  # files without a "schema_version" header
+MIGRATION_BATCH_SIZE = 10000  # scenario records upgraded at a time
+
+SCENARIOS = "scenarios"
+NOTES = "notes"
+
+_steps = []  # MigrationStep, in the order they run
+
+# Values of the optional fields a record may lack, as the app's form records them when left blank
+SCENARIO_FIELD_DEFAULTS = {
+    "difficulty": "Standard",
+    "modular_sets": "",
+    "villain_health_remaining": "N/A",
+    "turns_taken": 0,
+    "threat_on_scheme": 0,
+    "notes": "",
+    "date": "",
+}
+NOTE_FIELD_DEFAULTS = {"date": "", "type": "General Note"}
+
+
+class MigrationStep:
+    __slots__ = ("name", "from_version", "kind", "function", "assigns_ids")
+
+    def __init__(self, name, from_version, kind, function, assigns_ids):
+        self.name = name
+        self.from_version = from_version
+        self.kind = kind
+        self.function = function  # function(records, state) -> number of records changed
+        self.assigns_ids = assigns_ids
+
+
+def migration(from_version, kind, name, assigns_ids=False):
+    """Registers a batch step that upgrades ``kind`` records (SCENARIOS or NOTES) of ``from_version``.
+
+    The step is called as ``function(records, state)`` for each batch, with
+    a dict it can keep state in across the batches of one file, and returns
+    the number of records it changed.
+    """
+    def register(function):
+        _steps.append(MigrationStep(name, from_version, kind, function, assigns_ids))
+        return function
+    return register
+
+
+class MigrationReport:
+    """What upgrading one file did: per step, the records changed and the seconds spent."""
+
+    def __init__(self, from_version):
+        self.from_version = from_version
+        self.to_version = max(from_version, SCHEMA_VERSION)
+        self.steps = {}  # step name -> [records changed, seconds]
+
+    @property
+    def migrated(self):
+        return self.from_version < SCHEMA_VERSION
+
+    def _add(self, name, changed, seconds):
+        totals = self.steps.setdefault(name, [0, 0.0])
+        totals[0] += changed
+        totals[1] += seconds
+
+    def summary(self):
+        """One line for the user, e.g. 'Upgraded from schema 1 to 2: Scenario ids 120 (0.01 s), ...'."""
+        steps = ", ".join(
+            f"{name} {changed:,} ({seconds:.2f} s)" for name, (changed, seconds) in self.steps.items()
+        )
+        return f"Upgraded the file from schema version {self.from_version} to {self.to_version}: {steps or 'nothing to change'}."
+
+
+class Migrator:
+    """Runs the steps that upgrade one file's records, batch by batch.
+
+    With ``assign_ids=False`` the id steps are left out (see campaign_merge).
+    """
+
+    def __init__(self, from_version, assign_ids=True):
+        if from_version > SCHEMA_VERSION:
+            raise ValueError(f"schema version {from_version} is newer than this app's ({SCHEMA_VERSION})")
+        self.report = MigrationReport(from_version)
+        self._steps = [
+            step for step in _steps
+            if step.from_version >= from_version and (assign_ids or not step.assigns_ids)
+        ]
+        self._states = {step.name: {} for step in self._steps}
+
+    @property
+    def assigns_ids(self):
+        """True if the steps give records missing or duplicated ids fresh ones (version 1 files)."""
+        return any(step.assigns_ids for step in self._steps)
+
+    def needs(self, kind):
+        """True if any step upgrades ``kind`` records."""
+        return any(step.kind == kind for step in self._steps)
+
+    def migrate(self, kind, records):
+        """Upgrades a batch of ``kind`` record dicts in place."""
+        for step in self._steps:
+            if step.kind != kind:
+                continue
+            start = time.perf_counter()
+            changed = step.function(records, self._states[step.name])
+            self.report._add(step.name, changed, time.perf_counter() - start)
+
+
+# --- Version 1 -> 2 ---
+def new_ids(count):
+    """Returns ``count`` random UUID4 strings, made from one block of random bytes."""
+    random_hex = os.urandom(16 * count).hex()
+    ids = []
+    for start in range(0, 32 * count, 32):
+        h = random_hex[start:start + 32]
+        ids.append(f"{h[:8]}-{h[8:12]}-4{h[13:16]}-{'89ab'[int(h[16], 16) & 3]}{h[17:20]}-{h[20:]}")
+    return ids
+
+
+def _assign_ids(records, seen_ids):
+    """Gives a fresh id to the records without one (or with one an earlier record has)."""
+    needing_ids = []
+    for record in records:
+        record_id = record.get("id")
+        if record_id is None or record_id in seen_ids:
+            needing_ids.append(record)
+        else:
+            seen_ids.add(record_id)
+    for record, record_id in zip(needing_ids, new_ids(len(needing_ids))):
+        record["id"] = record_id
+        seen_ids.add(record_id)
+    return len(needing_ids)
+
+
+@migration(1, SCENARIOS, "Scenario ids", assigns_ids=True)
+def _assign_scenario_ids(scenarios, state):
+    return _assign_ids(scenarios, state.setdefault("seen_ids", set()))
+
+
+@migration(1, NOTES, "Note ids", assigns_ids=True)
+def _assign_note_ids(notes, state):
+    return _assign_ids(notes, state.setdefault("seen_ids", set()))
+
+
+def fill_missing_fields(record, defaults):
+    """Adds the fields ``record`` lacks from ``defaults``; returns True if it lacked any."""
+    if defaults.keys() <= record.keys():
+        return False
+    for key, value in defaults.items():
+        record.setdefault(key, value)
+    return True
+
+
+@migration(1, SCENARIOS, "Missing scenario fields")
+def _fill_scenario_fields(scenarios, state):
+    return sum(fill_missing_fields(scenario, SCENARIO_FIELD_DEFAULTS) for scenario in scenarios)
+
+
+@migration(1, NOTES, "Missing note fields")
+def _fill_note_fields(notes, state):
+    return sum(fill_missing_fields(note, NOTE_FIELD_DEFAULTS) for note in notes)
+
+
+def _health(value):
+    """Health as the app records it: whole numbers as ints, anything else unchanged."""
+    if type(value) is str and value.isdigit() and value.isascii():
+        return int(value)
+    if type(value) is float and value.is_integer() and value >= 0:
+        return int(value)
+    return value
+
+
+@migration(1, SCENARIOS, "Health values")
+def _normalize_health(scenarios, state):
+    changed = 0
+    for scenario in scenarios:
+        record_changed = False
+        villain_health = scenario.get("villain_health_remaining")
+        if type(villain_health) is not int and _health(villain_health) is not villain_health:
+            scenario["villain_health_remaining"] = _health(villain_health)
+            record_changed = True
+        heroes_played = scenario.get("heroes_played")
+        if type(heroes_played) is list:
+            for hero_info in heroes_played:
+                if type(hero_info) is not dict:
+                    continue
+                health = hero_info.get("health_remaining")
+                if type(health) is not int and _health(health) is not health:
+                    hero_info["health_remaining"] = _health(health)
+                    record_changed = True
+        changed += record_changed
+    return changed
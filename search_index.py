@@ -0,0 +1,175 @@
+# search_index.py
+"""Inverted index for full-text search over scenario notes and campaign notes.
+
+Every searchable text (a play's notes and modular sets, a campaign note's
+content) is split into lower-case word tokens, and each token maps to the
+documents that contain it. A query intersects the sets of its terms, smallest
+first, so it costs about as much as its rarest term's matches instead of a
+scan of every note.
+
+SearchIndex subscribes to the ScenarioStore like the other views; campaign
+notes live outside the store, so the code that adds or deletes them tells the
+index with ``note_added`` / ``note_removed``.
+"""
+import bisect
+import re
+
+TOKEN_PATTERN = re.compile(r"\w+")
+PREFIX_MIN_LENGTH = 2  # shorter terms only match whole words
+SCENARIO_TEXT_FIELDS = ("notes", "modular_sets")
+
+
+def _text(value):
+    """The value if it is a string; other values (legacy data) aren't searchable."""
+    return value if isinstance(value, str) else None
+
+
+def tokenize(text):
+    """Returns the distinct lower-case word tokens of a text (an empty set for non-strings)."""
+    if not isinstance(text, str) or not text:
+        return set()
+    return set(TOKEN_PATTERN.findall(text.casefold()))
+
+
+class _Postings:
+    """token -> set of text groups, where a group holds the documents with the same campaign and texts.
+
+    Plays share a lot of text (modular sets, stock notes), so tokens point to
+    groups of documents instead of to every document. A group is the tuple
+    ``(campaign, text, ...)``; it holds a single document id, or a set of them
+    once several documents have the same texts.
+    """
+
+    def __init__(self):
+        self._groups = {}  # group -> document id, or set of document ids
+        self._postings = {}  # token -> set of groups
+        self._vocabulary = None  # sorted tokens for prefix lookups, dropped when tokens come or go
+
+    @staticmethod
+    def _tokens(group):
+        tokens = set()
+        for text in group[1:]:
+            tokens |= tokenize(text)
+        return tokens
+
+    def add(self, document_id, group):
+        members = self._groups.get(group)
+        if members is None:
+            self._groups[group] = document_id
+            postings = self._postings
+            for token in self._tokens(group):
+                groups = postings.get(token)
+                if groups is None:
+                    groups = postings[token] = set()
+                    self._vocabulary = None
+                groups.add(group)
+        elif isinstance(members, set):
+            members.add(document_id)
+        elif members != document_id:
+            self._groups[group] = {members, document_id}
+
+    def remove(self, document_id, group):
+        members = self._groups.get(group)
+        if isinstance(members, set):
+            members.discard(document_id)
+            if len(members) == 1:
+                self._groups[group] = next(iter(members))
+            return
+        if members is None or members != document_id:
+            return
+        del self._groups[group]
+        for token in self._tokens(group):
+            groups = self._postings.get(token)
+            if groups is None:
+                continue
+            groups.discard(group)
+            if not groups:
+                del self._postings[token]
+                self._vocabulary = None
+
+    def _matches(self, term):
+        """Groups with a token starting with the term (or equal to it, for short terms)."""
+        if len(term) < PREFIX_MIN_LENGTH:
+            return self._postings.get(term, set())
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self._postings)
+        vocabulary = self._vocabulary
+        start = bisect.bisect_left(vocabulary, term)
+        end = bisect.bisect_left(vocabulary, term + "\U0010ffff", start)
+        if end - start == 1:
+            return self._postings[vocabulary[start]]
+        return set().union(*(self._postings[token] for token in vocabulary[start:end]))
+
+    def search(self, terms, campaigns=None):
+        """Returns the set of ids of the documents matching every term (optionally only in some campaigns)."""
+        if not terms:
+            return set()
+        candidates = sorted((self._matches(term) for term in terms), key=len)
+        groups = set(candidates[0])
+        for matches in candidates[1:]:
+            if not groups:
+                break
+            groups &= matches
+        if campaigns is not None:
+            campaigns = set(campaigns)
+        documents = set()
+        for group in groups:
+            if campaigns is not None and group[0] not in campaigns:
+                continue
+            members = self._groups[group]
+            if isinstance(members, set):
+                documents |= members
+            else:
+                documents.add(members)
+        return documents
+
+
+class SearchIndex:
+    """Searchable words of the scenario plays and campaign notes, kept up to date incrementally."""
+
+    def __init__(self, campaign_boons=None):
+        self._scenarios = _Postings()
+        self._notes = _Postings()
+        self._note_entries = {}  # note id -> (its group, campaign, note); notes are deleted by id
+        for campaign, notes in (campaign_boons or {}).items():
+            for note in notes:
+                self.note_added(campaign, note)
+
+    @staticmethod
+    def _record_group(record):
+        return (_text(record.get("campaign")),) + tuple(_text(record.get(field)) for field in SCENARIO_TEXT_FIELDS)
+
+    # --- ScenarioStore listener interface ---
+    def record_added(self, record):
+        self._scenarios.add(record["id"], self._record_group(record))
+
+    def record_removed(self, record):
+        self._scenarios.remove(record["id"], self._record_group(record))
+
+    # --- Campaign notes ---
+    def note_added(self, campaign_name, note):
+        note_id = note.get("id")
+        if note_id is None:
+            return
+        if note_id in self._note_entries:
+            self.note_removed(note_id)
+        group = (_text(campaign_name), _text(note.get("content")))
+        self._note_entries[note_id] = (group, campaign_name, note)
+        self._notes.add(note_id, group)
+
+    def note_removed(self, note_id):
+        entry = self._note_entries.pop(note_id, None)
+        if entry is not None:
+            self._notes.remove(note_id, entry[0])
+
+    # --- Reads ---
+    def search(self, query, campaigns=None):
+        """Returns (scenario ids, [(campaign, note)]) matching every word of the query.
+
+        Each query word matches the words that start with it (words shorter
+        than PREFIX_MIN_LENGTH must match exactly). ``campaigns`` restricts
+        the results to some campaigns.
+        """
+        terms = TOKEN_PATTERN.findall(query.casefold())
+        note_ids = self._notes.search(terms, campaigns)
+        return self._scenarios.search(terms, campaigns), [self._note_entries[note_id][1:] for note_id in note_ids]
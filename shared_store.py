@@ -0,0 +1,203 @@
+# shared_store.py
+"""Campaign datasets shared by every browser session of the server process.
+
+A SharedDataset holds one copy of the players, the scenario store (with the
+views maintained from it), the campaign boons, the save-file cache, the
+report builds and, if connected, the local database and autosave journal. Sessions only keep a
+reference to the dataset they are viewing, so ten people looking at the same
+campaigns cost one copy of the data, and a play recorded in one session is
+seen by the others.
+
+Datasets opened from the same source (the same uploaded file, database file
+or journal folder) are looked up in a DatasetRegistry instead of being loaded
+again. The registry only holds weak references: a dataset is freed once no
+session views it any more.
+
+Changes that replace everything (loading another file, merging, resetting)
+never overwrite a shared dataset that isn't backed by a database or journal;
+the session switches to a dataset of its own instead (copy on write).
+"""
+import itertools
+import threading
+import weakref
+
+import campaign_changes
+from campaign_io import ExportCache
+from reports import ReportJobs
+
+# Versions are unique across datasets, so a version number also tells datasets apart
+_versions = itertools.count(1)
+
+
+class SharedDataset:
+    """One copy of campaign data, viewed by any number of sessions.
+
+    ``build_views(records, campaign_boons)`` returns a dict of session_state
+    key -> object: the ScenarioStore under "scenario_store", plus the views
+    attached to it as listeners (the SearchIndex, if any, under "search_index" is told about notes too). Readers and writers hold ``lock`` (re-entrant) while they use
+    the data, since each session runs its script on its own thread.
+    """
+
+    def __init__(self, build_views, data=None, key=None):
+        self.key = key  # the registry key, or None for a session's own dataset
+        self.lock = threading.RLock()
+        self.export_cache = ExportCache()
+        self.reports = ReportJobs()
+        self.database = None
+        self.journal = None
+        self._build_views = build_views
+        self.replace(data or {})
+
+    def replace(self, data):
+        """Replaces all data (already validated) in place."""
+        with self.lock:
+            self.players = data.get("players", [])
+            self.campaign_boons = data.get("campaign_boons", {})
+            self.views = self._build_views(data.get("scenarios_played", []), self.campaign_boons)
+            self.mark_changed()
+
+    def apply(self, change):
+        """Applies one change (see campaign_changes) to the data in memory.
+
+        Returns the changes actually made, to publish: adding a player,
+        scenario or note that is already there, or deleting one that is gone
+        (another session may have made the same change), changes nothing, and
+        a bulk change is narrowed down to the records it did add or delete.
+        """
+        op = change["op"]
+        with self.lock:
+            scenario_store = self.scenario_store
+            if op == campaign_changes.ADD_PLAYER:
+                if change["name"] in self.players:
+                    return []
+                self.players.append(change["name"])
+            elif op in (campaign_changes.ADD_SCENARIO, campaign_changes.ADD_SCENARIOS):
+                records = [change["record"]] if op == campaign_changes.ADD_SCENARIO else change["records"]
+                added = [scenario_store.add(record) for record in records if record["id"] not in scenario_store]
+                if len(added) != len(records):
+                    return [campaign_changes.add_scenarios(added)] if added else []
+            elif op in (campaign_changes.DELETE_SCENARIO, campaign_changes.DELETE_SCENARIOS):
+                record_ids = [change["id"]] if op == campaign_changes.DELETE_SCENARIO else change["ids"]
+                deleted = [record_id for record_id in record_ids if scenario_store.remove(record_id) is not None]
+                if len(deleted) != len(record_ids):
+                    return [campaign_changes.delete_scenarios(deleted)] if deleted else []
+            elif op == campaign_changes.ADD_NOTE:
+                notes = self.campaign_boons.setdefault(change["campaign"], [])
+                if any(note.get("id") == change["note"]["id"] for note in notes):
+                    return []
+                notes.append(change["note"])
+                if "search_index" in self.views:
+                    self.views["search_index"].note_added(change["campaign"], change["note"])
+            elif op == campaign_changes.DELETE_NOTE:
+                notes = self.campaign_boons.get(change["campaign"], [])
+                kept_notes = [note for note in notes if note.get("id") != change["id"]]
+                if len(kept_notes) == len(notes):
+                    return []
+                self.campaign_boons[change["campaign"]] = kept_notes
+                if "search_index" in self.views:
+                    self.views["search_index"].note_removed(change["id"])
+            elif op == campaign_changes.REPLACE_ALL:
+                # New containers, so later changes don't alter the change (the undo history keeps it)
+                data = change["data"]
+                self.replace({
+                    "players": list(data["players"]),
+                    "scenarios_played": data["scenarios_played"],
+                    "campaign_boons": {campaign: list(notes) for campaign, notes in data["campaign_boons"].items()},
+                })
+            else:
+                raise ValueError(f"Unknown change: {op}")
+        return [change]
+
+    def publish(self, change):
+        """Records a change (see campaign_changes) that was just made to the data.
+
+        Bumps the version and writes the change through to the database and
+        the journal, if they are attached.
+        """
+        with self.lock:
+            self.mark_changed()
+            if self.database is not None:
+                self.database.apply_change(change)
+            if self.journal is not None:
+                self.journal.append(change)
+                if self.journal.needs_compaction():
+                    self.journal.compact(**self.data())
+
+    def mark_changed(self):
+        with self.lock:
+            self.version = next(_versions)
+            self.export_cache.invalidate()
+            self.reports.invalidate()
+
+    @property
+    def scenario_store(self):
+        return self.views["scenario_store"]
+
+    @property
+    def is_durable(self):
+        """True if changes are written through to a database or journal."""
+        return self.database is not None or self.journal is not None
+
+    def attach(self, database=None, journal=None):
+        """Writes changes through to a database and/or journal from now on (closed with the dataset)."""
+        for name, backend in (("database", database), ("journal", journal)):
+            if backend is not None:
+                setattr(self, name, backend)
+                weakref.finalize(self, backend.close)
+
+    def data(self):
+        """Players, scenarios and boons as new containers (holding the same records and notes)."""
+        with self.lock:
+            return {
+                "players": list(self.players),
+                "scenarios_played": self.scenario_store.records(),
+                "campaign_boons": {campaign: list(notes) for campaign, notes in self.campaign_boons.items()},
+            }
+
+    def copy(self):
+        """A session-owned dataset with the same data (records and notes are never modified in place)."""
+        return SharedDataset(self._build_views, self.data())
+
+
+class DatasetRegistry:
+    """Open shared datasets by key, e.g. ("file", sha256) or ("database", path)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._datasets = weakref.WeakValueDictionary()
+        self._building = {}  # key -> threading.Event set once the dataset being built under it is registered
+
+    def open(self, key, build):
+        """Returns the dataset open under ``key``, or registers the one ``build()`` returns.
+
+        Building runs outside the registry lock, so a large file being parsed
+        never holds up sessions opening other sources. Sessions opening the
+        same source at the same time wait for the one building it, so it is
+        loaded only once. ``build`` must not take a dataset's lock (read what
+        it needs from other datasets first): the session waiting for it may
+        hold that lock.
+        """
+        while True:
+            with self._lock:
+                dataset = self._datasets.get(key)
+                if dataset is not None:
+                    return dataset
+                building = self._building.get(key)
+                if building is None:
+                    building = self._building[key] = threading.Event()
+                    break
+            # Another session is building it: look again once it is done (or has failed)
+            building.wait()
+        try:
+            dataset = build()
+            dataset.key = key
+            with self._lock:
+                self._datasets[key] = dataset
+            return dataset
+        finally:
+            with self._lock:
+                del self._building[key]
+            building.set()
+
+    def __len__(self):
+        return len(self._datasets)
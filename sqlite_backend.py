@@ -0,0 +1,351 @@
+# sqlite_backend.py
+"""Optional persistent storage of campaign data in a local SQLite file.
+
+Data is kept in normalized tables (players, scenarios, hero participations
+and boons) with indexes on campaign, scenario, date and hero. The app applies
+each change to the database as it happens (see campaign_changes), so nothing
+is lost when the browser tab closes and no large JSON file has to be reloaded.
+The Scenario Log and campaign notes pages read only the rows they show, with
+indexed, paged queries (``scenario_page`` and ``note_page``).
+
+Data columns are declared without a type, so SQLite keeps each value exactly as
+given (the int-or-"N/A" fields stay ints or strings). Values SQLite can't hold
+(lists, dicts, booleans), unknown keys and missing keys are recorded as JSON in
+an ``extra`` column, so records come back exactly as they were stored.
+"""
+import json
+import sqlite3
+import threading
+
+import campaign_changes
+from campaign_io import gc_paused
+from compact_records import as_dict
+
+SCENARIO_COLUMNS = [
+    "id", "campaign", "scenario", "outcome", "difficulty", "modular_sets",
+    "villain_health_remaining", "turns_taken", "threat_on_scheme", "notes", "date"
+]
+HERO_COLUMNS = ["hero", "aspect", "health_remaining"]
+BOON_COLUMNS = ["id", "date", "type", "content"]
+# Key order of a scenario record as created by the app
+SCENARIO_KEY_ORDER = ["id", "campaign", "scenario", "heroes_played"] + SCENARIO_COLUMNS[3:]
+MISSING_KEYS_FIELD = "__missing__"
+ID_QUERY_BATCH_SIZE = 500  # ids looked up per query (SQLite limits the parameters of one)
+# A scenario's "Heroes Used" as the Scenario Log shows it (see scenario_log.format_heroes)
+HEROES_USED_SQL = """COALESCE((
+    SELECT group_concat(hero_display, ', ') FROM (
+        SELECT hero
+            || CASE WHEN aspect = 'N/A' THEN '' ELSE ' (' || aspect || ')' END
+            || CASE WHEN typeof(health_remaining) = 'integer' THEN ' (' || health_remaining || ' HP)'
+                    WHEN health_remaining = 'N/A (Defeated)' THEN ' (Defeated)' ELSE '' END AS hero_display
+        FROM hero_participations WHERE scenario_seq = scenarios.seq ORDER BY position
+    )
+), '')"""
+# Scenario Log sort column (see scenario_log.LOG_SORT_COLUMNS) -> SQL expression
+LOG_SORT_SQL = {"Date Played": "date", "Scenario": "scenario", "Outcome": "outcome", "Heroes Used": HEROES_USED_SQL}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS players (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    name UNIQUE NOT NULL
+);
+CREATE TABLE IF NOT EXISTS scenarios (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id UNIQUE NOT NULL,
+    campaign, scenario, outcome, difficulty, modular_sets,
+    villain_health_remaining, turns_taken, threat_on_scheme, notes, date,
+    extra TEXT
+);
+CREATE TABLE IF NOT EXISTS hero_participations (
+    scenario_seq INTEGER NOT NULL REFERENCES scenarios(seq) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    hero, aspect, health_remaining,
+    extra TEXT,
+    PRIMARY KEY (scenario_seq, position)
+);
+CREATE TABLE IF NOT EXISTS boons (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id UNIQUE NOT NULL,
+    campaign NOT NULL,
+    date, type, content,
+    extra TEXT
+);
+CREATE TABLE IF NOT EXISTS boon_campaigns (
+    campaign PRIMARY KEY
+);
+CREATE INDEX IF NOT EXISTS idx_scenarios_campaign ON scenarios (campaign, date);
+CREATE INDEX IF NOT EXISTS idx_scenarios_scenario ON scenarios (scenario);
+CREATE INDEX IF NOT EXISTS idx_scenarios_date ON scenarios (date);
+CREATE INDEX IF NOT EXISTS idx_hero_participations_hero ON hero_participations (hero, aspect);
+CREATE INDEX IF NOT EXISTS idx_boons_campaign ON boons (campaign, date);
+"""
+
+
+def _is_storable(value):
+    return value is None or type(value) in (int, float, str)
+
+
+def _split(item, columns, known_keys):
+    """Returns (column values, extra JSON or None) for one record."""
+    values = []
+    extra = {}
+    for column in columns:
+        value = item.get(column)
+        if column not in item:
+            extra.setdefault(MISSING_KEYS_FIELD, []).append(column)
+        elif not _is_storable(value):
+            extra[column] = value
+            value = None
+        values.append(value)
+    for key, value in item.items():
+        if key not in known_keys:
+            extra[key] = value
+    return values, (json.dumps(extra) if extra else None)
+
+
+def _join(columns, row, extra):
+    item = dict(zip(columns, row))
+    if extra is not None:
+        extra = json.loads(extra)
+        for column in extra.pop(MISSING_KEYS_FIELD, ()):
+            item.pop(column, None)
+        item.update(extra)
+    return item
+
+
+def _heroes_by_seq(hero_rows):
+    """Groups hero_participations rows (scenario_seq, hero columns..., extra) by scenario."""
+    heroes_by_seq = {}
+    for scenario_seq, *row, extra in hero_rows:
+        heroes_by_seq.setdefault(scenario_seq, []).append(_join(HERO_COLUMNS, row, extra))
+    return heroes_by_seq
+
+
+def _scenario_record(row, extra, heroes_played):
+    """Returns the scenario record of a scenarios row and its hero participations."""
+    if extra is None:
+        record = dict(zip(SCENARIO_COLUMNS, row))
+        record["heroes_played"] = heroes_played
+    else:
+        record = _join(SCENARIO_COLUMNS, row, extra)
+        if "heroes_played" not in record and "heroes_played" not in json.loads(extra).get(MISSING_KEYS_FIELD, ()):
+            record["heroes_played"] = heroes_played
+    # Restore the usual key order (id, campaign, scenario, heroes_played, ...)
+    return {key: record.pop(key) for key in SCENARIO_KEY_ORDER if key in record} | record
+
+
+def _scenario_filter(campaign_name, scenario=None, outcome=None, hero=None):
+    """Returns the WHERE clause and parameters selecting a campaign's scenarios, optionally filtered."""
+    clauses = ["campaign = ?"]
+    params = [campaign_name]
+    if scenario is not None:
+        clauses.append("scenario = ?")
+        params.append(scenario)
+    if outcome is not None:
+        clauses.append("outcome = ?")
+        params.append(outcome)
+    if hero is not None:
+        clauses.append("seq IN (SELECT scenario_seq FROM hero_participations WHERE hero = ?)")
+        params.append(hero)
+    return " AND ".join(clauses), params
+
+
+class SqliteCampaignStore:
+    """Campaign data persisted in a SQLite file.
+
+    A single connection is shared by all reruns (which Streamlit may run on
+    different threads), so access is serialized with a lock.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA foreign_keys = ON")
+            self._connection.execute("PRAGMA journal_mode = WAL")
+            self._connection.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    # --- Reads ---
+    def is_empty(self):
+        with self._lock:
+            cursor = self._connection.execute(
+                "SELECT EXISTS(SELECT 1 FROM players) OR EXISTS(SELECT 1 FROM scenarios) OR EXISTS(SELECT 1 FROM boons)"
+            )
+            return not cursor.fetchone()[0]
+
+    def load(self):
+        """Returns all data as a dict shaped like the JSON save file."""
+        with self._lock, gc_paused():
+            connection = self._connection
+            players = [name for (name,) in connection.execute("SELECT name FROM players ORDER BY seq")]
+
+            heroes_by_seq = _heroes_by_seq(connection.execute(
+                f"SELECT scenario_seq, {', '.join(HERO_COLUMNS)}, extra FROM hero_participations "
+                "ORDER BY scenario_seq, position"
+            ))
+
+            scenario_rows = connection.execute(
+                f"SELECT seq, {', '.join(SCENARIO_COLUMNS)}, extra FROM scenarios ORDER BY seq"
+            )
+            scenarios_played = [
+                _scenario_record(row, extra, heroes_by_seq.get(seq, [])) for seq, *row, extra in scenario_rows
+            ]
+
+            campaign_boons = {
+                campaign: [] for (campaign,) in connection.execute("SELECT campaign FROM boon_campaigns ORDER BY rowid")
+            }
+            boon_rows = connection.execute(f"SELECT campaign, {', '.join(BOON_COLUMNS)}, extra FROM boons ORDER BY seq")
+            for campaign, *row, extra in boon_rows:
+                campaign_boons.setdefault(campaign, []).append(_join(BOON_COLUMNS, row, extra))
+
+        return {"players": players, "scenarios_played": scenarios_played, "campaign_boons": campaign_boons}
+
+    def count_scenarios(self, campaign_name, scenario=None, outcome=None, hero=None):
+        """Returns the number of a campaign's scenarios matching the filters (see scenario_page)."""
+        where, params = _scenario_filter(campaign_name, scenario, outcome, hero)
+        with self._lock:
+            return self._connection.execute(f"SELECT COUNT(*) FROM scenarios WHERE {where}", params).fetchone()[0]
+
+    def scenario_page(self, campaign_name, scenario=None, outcome=None, hero=None,
+                      sort_by="Date Played", ascending=False, offset=0, limit=-1):
+        """Returns one page of a campaign's scenario records, filtered and sorted like the Scenario Log.
+
+        ``sort_by`` is a Scenario Log column (see LOG_SORT_SQL); ties are in
+        date order, newest first, then in the order the plays were recorded.
+        """
+        where, params = _scenario_filter(campaign_name, scenario, outcome, hero)
+        if sort_by == "Date Played":
+            order = "date, seq DESC" if ascending else "date DESC, seq"
+        else:
+            order = f"{LOG_SORT_SQL[sort_by]} {'ASC' if ascending else 'DESC'}, date DESC, seq"
+        with self._lock:
+            connection = self._connection
+            scenario_rows = connection.execute(
+                f"SELECT seq, {', '.join(SCENARIO_COLUMNS)}, extra FROM scenarios WHERE {where} "
+                f"ORDER BY {order} LIMIT ? OFFSET ?",
+                [*params, limit, offset]
+            ).fetchall()
+            seqs = [seq for seq, *_ in scenario_rows]
+            heroes_by_seq = _heroes_by_seq(connection.execute(
+                f"SELECT scenario_seq, {', '.join(HERO_COLUMNS)}, extra FROM hero_participations "
+                f"WHERE scenario_seq IN ({', '.join('?' * len(seqs))}) ORDER BY scenario_seq, position",
+                seqs
+            ))
+        return [_scenario_record(row, extra, heroes_by_seq.get(seq, [])) for seq, *row, extra in scenario_rows]
+
+    def count_notes(self, campaign_name):
+        """Returns the number of a campaign's boons and notes."""
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM boons WHERE campaign = ?", (campaign_name,)).fetchone()[0]
+
+    def note_page(self, campaign_name, offset=0, limit=-1):
+        """Returns one page of a campaign's boons and notes, newest first (then in the order they were added)."""
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT {', '.join(BOON_COLUMNS)}, extra FROM boons WHERE campaign = ? "
+                "ORDER BY date DESC, seq LIMIT ? OFFSET ?",
+                (campaign_name, limit, offset)
+            ).fetchall()
+        return [_join(BOON_COLUMNS, row, extra) for *row, extra in rows]
+
+    # --- Writes ---
+    def apply_change(self, change):
+        """Applies one change (see campaign_changes) in its own transaction."""
+        op = change["op"]
+        with self._lock, self._connection:
+            if op == campaign_changes.ADD_PLAYER:
+                self._connection.execute("INSERT OR IGNORE INTO players (name) VALUES (?)", (change["name"],))
+            elif op == campaign_changes.ADD_SCENARIO:
+                self._insert_scenarios([change["record"]])
+            elif op == campaign_changes.ADD_SCENARIOS:
+                self._insert_scenarios(change["records"])
+            elif op == campaign_changes.DELETE_SCENARIO:
+                self._connection.execute("DELETE FROM scenarios WHERE id = ?", (change["id"],))
+            elif op == campaign_changes.DELETE_SCENARIOS:
+                self._connection.executemany("DELETE FROM scenarios WHERE id = ?", [(i,) for i in change["ids"]])
+            elif op == campaign_changes.ADD_NOTE:
+                self._insert_notes(change["campaign"], [change["note"]])
+            elif op == campaign_changes.DELETE_NOTE:
+                self._connection.execute("DELETE FROM boons WHERE id = ?", (change["id"],))
+            elif op == campaign_changes.REPLACE_ALL:
+                self._replace_all(change["data"])
+            else:
+                raise ValueError(f"Unknown change: {op}")
+
+    def _existing_scenario_ids(self, record_ids):
+        existing = set()
+        for start in range(0, len(record_ids), ID_QUERY_BATCH_SIZE):
+            batch = record_ids[start:start + ID_QUERY_BATCH_SIZE]
+            rows = self._connection.execute(
+                f"SELECT id FROM scenarios WHERE id IN ({', '.join('?' * len(batch))})", batch
+            )
+            existing.update(record_id for (record_id,) in rows)
+        return existing
+
+    def _insert_scenarios(self, records, skip_existing=True):
+        """Inserts scenario records; with ``skip_existing``, those whose id is stored already are left out."""
+        if skip_existing:
+            # Another session may have made the same change (e.g. undoing a delete twice)
+            seen_ids = self._existing_scenario_ids([record["id"] for record in records])
+            unique_records = []
+            for record in records:
+                if record["id"] not in seen_ids:
+                    seen_ids.add(record["id"])
+                    unique_records.append(record)
+            records = unique_records
+        scenario_keys = set(SCENARIO_COLUMNS) | {"heroes_played"}
+        (next_seq,) = self._connection.execute(
+            "SELECT COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'scenarios'), 0) + 1"
+        ).fetchone()
+        scenario_rows = []
+        hero_rows = []
+        for seq, record in enumerate(records, start=next_seq):
+            record = as_dict(record)
+            values, extra = _split(record, SCENARIO_COLUMNS, scenario_keys)
+            heroes_played = record.get("heroes_played")
+            if isinstance(heroes_played, list) and all(isinstance(h, dict) for h in heroes_played):
+                for position, hero_info in enumerate(heroes_played):
+                    hero_values, hero_extra = _split(hero_info, HERO_COLUMNS, HERO_COLUMNS)
+                    hero_rows.append((seq, position, *hero_values, hero_extra))
+            else:
+                # Keep a missing or malformed hero list verbatim
+                extra_values = json.loads(extra) if extra else {}
+                if "heroes_played" in record:
+                    extra_values["heroes_played"] = heroes_played
+                else:
+                    extra_values.setdefault(MISSING_KEYS_FIELD, []).append("heroes_played")
+                extra = json.dumps(extra_values)
+            scenario_rows.append((seq, *values, extra))
+
+        placeholders = ", ".join("?" * (len(SCENARIO_COLUMNS) + 2))
+        self._connection.executemany(
+            f"INSERT INTO scenarios (seq, {', '.join(SCENARIO_COLUMNS)}, extra) VALUES ({placeholders})",
+            scenario_rows
+        )
+        self._connection.executemany(
+            f"INSERT INTO hero_participations (scenario_seq, position, {', '.join(HERO_COLUMNS)}, extra) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            hero_rows
+        )
+
+    def _insert_notes(self, campaign_name, notes):
+        self._connection.execute("INSERT OR IGNORE INTO boon_campaigns (campaign) VALUES (?)", (campaign_name,))
+        placeholders = ", ".join("?" * (len(BOON_COLUMNS) + 2))
+        self._connection.executemany(
+            f"INSERT OR IGNORE INTO boons (campaign, {', '.join(BOON_COLUMNS)}, extra) VALUES ({placeholders})",
+            [(campaign_name, *values, extra) for values, extra in (_split(note, BOON_COLUMNS, BOON_COLUMNS) for note in notes)]
+        )
+
+    def _replace_all(self, data):
+        connection = self._connection
+        for table in ("hero_participations", "scenarios", "boons", "boon_campaigns", "players"):
+            connection.execute(f"DELETE FROM {table}")
+        connection.executemany("INSERT OR IGNORE INTO players (name) VALUES (?)", [(name,) for name in data["players"]])
+        self._insert_scenarios(data["scenarios_played"], skip_existing=False)
+        for campaign_name, notes in data["campaign_boons"].items():
+            self._insert_notes(campaign_name, notes)
@@ -0,0 +1,29 @@
+# helpers.py
+"""Small campaign records for the tests."""
+
+
+def scenario(record_id=None, scenario_name="Crossbones", outcome="Win", hero="Thor", aspect="Justice", **fields):
+    record = {
+        "campaign": "Rise of Red Skull",
+        "scenario": scenario_name,
+        "heroes_played": [{"hero": hero, "aspect": aspect, "health_remaining": 5 if outcome == "Win" else "N/A (Defeated)"}],
+        "outcome": outcome,
+        "difficulty": "Standard",
+        "modular_sets": "Bomb Scare",
+        "villain_health_remaining": "N/A" if outcome == "Win" else 7,
+        "turns_taken": 6,
+        "threat_on_scheme": 3,
+        "notes": "",
+        "date": "2024-03-01",
+    }
+    if record_id is not None:
+        record["id"] = record_id
+    record.update(fields)
+    return record
+
+
+def note(note_id=None, content="Permanent combo boon", note_type="Boon"):
+    item = {"date": "2024-03-01", "type": note_type, "content": content}
+    if note_id is not None:
+        item["id"] = note_id
+    return item
@@ -0,0 +1,79 @@
+# test_bulk_import.py
+import io
+
+import pytest
+
+from bulk_import import ContentHashIndex, import_plays
+from campaign_io import CampaignDataError
+from catalog import campaign_scenarios, category_catalogs
+from helpers import scenario
+from scenario_store import ScenarioStore
+
+HEADER = "campaign,scenario,outcome,date,hero_1,aspect_1,health_remaining_1,turns_taken\n"
+
+
+def _import(text, file_name="plays.csv", store=None):
+    catalogs = category_catalogs()
+    store = ScenarioStore() if store is None else store
+    return import_plays(
+        io.BytesIO(text.encode("utf-8")), file_name, ContentHashIndex(store), campaign_scenarios(),
+        catalogs["heroes"], catalogs["aspects"], catalogs["difficulties"]
+    )
+
+
+@pytest.mark.parametrize("text, file_name", [(HEADER, "plays.csv"), ("", "plays.jsonl"), ("\n\n", "plays.jsonl")])
+def test_files_without_rows_import_nothing(text, file_name):
+    report = _import(text, file_name)
+    assert report.records == []
+    assert report.rejected_count == report.duplicate_count == 0
+
+
+def test_unreadable_files_are_reported():
+    with pytest.raises(CampaignDataError):
+        _import("")
+    with pytest.raises(CampaignDataError, match="hero_1"):
+        _import("campaign,scenario,outcome,date\n")
+    report = _import('{"not json\n', "plays.jsonl")
+    assert report.records == [] and report.rejected_count == 1
+
+
+def test_rows_are_validated_and_deduplicated():
+    report = _import(
+        HEADER
+        + "Rise of Red Skull,Crossbones,Win,2024-03-01,Thor,Justice,5,6\n"
+        + "Rise of Red Skull,Crossbones,Win,2024-03-01,Thor,Justice,5,6\n"
+        + "Rise of Red Skull,Thanos,Win,2024-03-01,Thor,Justice,5,6\n"
+        + "Rise of Red Skull,Zola,Maybe,2024-13-01,Thor,Justice,5,6\n"
+    )
+    assert [(record["scenario"], record["heroes_played"][0]["health_remaining"]) for record in report.records] == [("Crossbones", 5)]
+    assert report.duplicate_count == 1
+    reasons = dict(zip(report.skipped_rows["Row"], report.skipped_rows["Reason"]))
+    assert "not part of the campaign" in reasons[4]
+    assert "Outcome" in reasons[5] and "Date" in reasons[5]
+
+
+def test_plays_already_recorded_are_skipped():
+    existing = [scenario("a", heroes_played=[{"hero": "Thor", "aspect": "Justice", "health_remaining": 5}])]
+    report = _import('{"id": "a", "campaign": "Rise of Red Skull", "scenario": "Crossbones", "outcome": "Win", "date": "2024-03-01", '
+                     '"heroes_played": [{"hero": "Thor", "aspect": "Justice", "health_remaining": 5}]}\n',
+                     "plays.jsonl", ScenarioStore(existing))
+    assert report.records == [] and report.duplicate_count == 1
+
+
+def test_the_content_hash_index_follows_the_store():
+    row = HEADER + "Rise of Red Skull,Crossbones,Win,2024-03-01,Thor,Justice,5,6\n"
+    store = ScenarioStore()
+    index = store.add_listener(ContentHashIndex(store))
+    catalogs = category_catalogs()
+
+    def import_row():
+        return import_plays(
+            io.BytesIO(row.encode("utf-8")), "plays.csv", index, campaign_scenarios(),
+            catalogs["heroes"], catalogs["aspects"], catalogs["difficulties"]
+        )
+
+    record = import_row().records[0]
+    store.add(record)
+    assert import_row().duplicate_count == 1
+    store.remove(record["id"])
+    assert import_row().records != []
@@ -0,0 +1,73 @@
+# test_campaign_io.py
+import io
+import json
+
+import pytest
+
+from campaign_io import CampaignDataError, read_campaign_data, serialize_campaign_data
+from compact_records import as_dict
+from helpers import note, scenario
+from schema_migrations import SCENARIO_FIELD_DEFAULTS, SCHEMA_VERSION
+
+PLAYERS = ["Alice", "Bob"]
+SCENARIOS = [
+    scenario("a"),
+    scenario("b", scenario_name="Zola", outcome="Loss", hero="Thor", aspect="Aggression"),
+    scenario("c", notes="Unicode ✓ and \"quotes\"", turns_taken=0, extra_field={"kept": [1, 2]}),
+]
+BOONS = {"Rise of Red Skull": [note("n1"), note("n2", content="Chose the hard path", note_type="Campaign Choice")]}
+
+
+def _read(payload, **options):
+    return read_campaign_data(io.BytesIO(payload), **options)
+
+
+def _plain(data):
+    return [as_dict(record) for record in data["scenarios_played"]]
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_json_round_trip(compact):
+    data = _read(serialize_campaign_data(PLAYERS, SCENARIOS, BOONS, compact=compact).encode("utf-8"))
+    assert data["players"] == PLAYERS
+    assert _plain(data) == SCENARIOS
+    assert data["campaign_boons"] == BOONS
+    assert not data["migration_report"].migrated
+
+
+def test_large_files_are_streamed_with_progress():
+    scenarios = [scenario(str(i), notes="x" * 1000) for i in range(3000)]
+    payload = serialize_campaign_data(PLAYERS, scenarios, BOONS).encode("utf-8")
+    progress = []
+    data = _read(payload, on_progress=progress.append)
+    assert [record["id"] for record in data["scenarios_played"]] == [str(i) for i in range(3000)]
+    assert len(progress) > 1 and progress == sorted(progress) and progress[-1] == 1.0
+
+
+@pytest.mark.parametrize("schema_version", [None, SCHEMA_VERSION])
+def test_optional_fields_are_filled_in(schema_version):
+    sparse = {"campaign": "Rise of Red Skull", "scenario": "Zola", "outcome": "Win",
+              "heroes_played": [{"hero": "Thor", "aspect": "Justice", "health_remaining": 5}]}
+    payload = {"scenarios_played": [sparse, scenario("full")], "campaign_boons": {"Rise of Red Skull": [{"content": "Combo"}]}}
+    if schema_version is not None:
+        payload["schema_version"] = schema_version
+    data = _read(json.dumps(payload).encode("utf-8"))
+
+    loaded, full = _plain(data)
+    assert {key: loaded[key] for key in SCENARIO_FIELD_DEFAULTS} == SCENARIO_FIELD_DEFAULTS
+    assert full == scenario("full")
+    [loaded_note] = data["campaign_boons"]["Rise of Red Skull"]
+    assert (loaded_note["type"], loaded_note["date"], loaded_note["content"]) == ("General Note", "", "Combo")
+    if schema_version is None:
+        assert data["migration_report"].steps["Missing scenario fields"][0] == 1
+
+
+def test_invalid_files_are_reported():
+    with pytest.raises(CampaignDataError, match="missing: scenario, heroes_played, outcome"):
+        _read(json.dumps({"scenarios_played": [{"campaign": "Rise of Red Skull"}]}).encode("utf-8"))
+    with pytest.raises(CampaignDataError, match="missing: content"):
+        _read(json.dumps({"campaign_boons": {"Rise of Red Skull": [{"type": "Boon"}]}}).encode("utf-8"))
+    with pytest.raises(CampaignDataError, match="must be a list"):
+        _read(json.dumps({"scenarios_played": {}}).encode("utf-8"))
+    with pytest.raises(json.JSONDecodeError):
+        _read(b'{"scenarios_played": [')
@@ -0,0 +1,59 @@
+# test_campaign_merge.py
+from campaign_merge import merge_campaign_data
+from helpers import note, scenario
+
+
+def _ids(report):
+    return [record["id"] for record in report.data["scenarios_played"]]
+
+
+def test_records_are_unioned_by_id():
+    report = merge_campaign_data([
+        ("alice.json", {"players": ["Alice"], "scenarios_played": [scenario("a"), scenario("b")]}),
+        ("bob.json", {"players": ["Bob", "Alice"], "scenarios_played": [scenario("b"), scenario("c")]}),
+    ])
+    assert report.data["players"] == ["Alice", "Bob"]
+    assert _ids(report) == ["a", "b", "c"]
+    assert report.duplicate_scenarios == 1
+    assert not report.conflicts
+
+
+def test_first_file_wins_a_conflict():
+    report = merge_campaign_data([
+        ("alice.json", {"scenarios_played": [scenario("a", outcome="Win")]}),
+        ("bob.json", {"scenarios_played": [scenario("a", outcome="Loss")]}),
+    ])
+    assert report.data["scenarios_played"][0]["outcome"] == "Win"
+    [conflict] = report.conflicts
+    assert (conflict["Id"], conflict["Kept From"], conflict["Dropped From"]) == ("a", "alice.json", "bob.json")
+    assert "outcome" in conflict["Differences"]
+
+
+def test_legacy_copies_are_recognized_in_either_order():
+    legacy = ("legacy.json", {"scenarios_played": [scenario()]})
+    with_id = ("current.json", {"scenarios_played": [scenario("a")]})
+    for sources in ([legacy, with_id, with_id], [with_id, legacy]):
+        report = merge_campaign_data(sources)
+        assert _ids(report) == ["a"]
+
+
+def test_legacy_duplicates_within_files_are_dropped():
+    report = merge_campaign_data([("old.json", {"scenarios_played": [scenario(), scenario()]})])
+    assert report.scenario_count == 1 and report.duplicate_scenarios == 1
+    assert report.data["scenarios_played"][0]["id"]
+
+
+def test_identical_plays_with_their_own_ids_are_kept():
+    report = merge_campaign_data([("a.json", {"scenarios_played": [scenario("a"), scenario("b")]})])
+    assert _ids(report) == ["a", "b"]
+
+
+def test_legacy_notes_are_matched_per_campaign():
+    report = merge_campaign_data([
+        ("a.json", {"campaign_boons": {"Rise of Red Skull": [note()]}}),
+        ("b.json", {"campaign_boons": {"Mutant Genesis": [note()], "Rise of Red Skull": [note()]}}),
+    ])
+    assert {campaign: len(notes) for campaign, notes in report.data["campaign_boons"].items()} == {
+        "Rise of Red Skull": 1, "Mutant Genesis": 1
+    }
+    assert report.duplicate_notes == 1
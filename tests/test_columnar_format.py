@@ -0,0 +1,40 @@
+# test_columnar_format.py
+import io
+
+import pytest
+
+from campaign_io import CampaignDataError, read_campaign_data, serialize_campaign_data
+from columnar_format import is_columnar_file, read_campaign_data_columnar, serialize_campaign_data_columnar
+from compact_records import as_dict
+from helpers import note, scenario
+from schema_migrations import SCHEMA_VERSION
+
+PLAYERS = ["Alice", "Bob"]
+SCENARIOS = [
+    scenario("a"),
+    scenario("b", scenario_name="Zola", outcome="Loss", aspect="Aggression", villain_health_remaining=2 ** 70),
+    scenario("c", notes="Unicode ✓", turns_taken="7", extra_field={"kept": [1, 2]}, heroes_played=[]),
+    {key: value for key, value in scenario("d").items() if key != "notes"},
+]
+BOONS = {"Rise of Red Skull": [note("n1"), note("n2", content="Chose the hard path", note_type="Campaign Choice")], "Empty": []}
+
+
+def test_records_come_back_exactly():
+    payload = serialize_campaign_data_columnar(PLAYERS, SCENARIOS, BOONS)
+    assert is_columnar_file(payload[:4])
+    data = read_campaign_data_columnar(io.BytesIO(payload))
+    assert data["schema_version"] == SCHEMA_VERSION
+    assert data["players"] == PLAYERS
+    assert [as_dict(record) for record in data["scenarios_played"]] == SCENARIOS
+    assert data["campaign_boons"] == BOONS
+
+
+def test_loaded_like_any_save_file():
+    scenarios = [scenario(str(i), scenario_name=("Crossbones", "Zola")[i % 2]) for i in range(500)]
+    payload = serialize_campaign_data_columnar(PLAYERS, scenarios, BOONS)
+    assert len(payload) < len(serialize_campaign_data(PLAYERS, scenarios, BOONS, compact=True)) / 4
+    data = read_campaign_data(io.BytesIO(payload))
+    assert [as_dict(record) for record in data["scenarios_played"]] == scenarios
+
+    with pytest.raises(CampaignDataError, match="columnar file could not be read"):
+        read_campaign_data(io.BytesIO(payload[:len(payload) // 2]))
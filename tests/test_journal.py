@@ -0,0 +1,62 @@
+# test_journal.py
+import os
+
+import pytest
+
+import campaign_changes
+from helpers import scenario
+from journal import CampaignJournal, JournalError
+
+
+def _journal_path(directory):
+    return os.path.join(directory, sorted(name for name in os.listdir(directory) if name.startswith("journal"))[-1])
+
+
+def _write_journal(directory):
+    journal = CampaignJournal(str(directory))
+    journal.compact([], [scenario("a")], {}, background=False)
+    journal.append(campaign_changes.add_player("Ann"))
+    journal.append(campaign_changes.add_scenario(scenario("b")))
+    journal.close()
+    return _journal_path(str(directory))
+
+
+def test_changes_are_replayed_over_the_snapshot(tmp_path):
+    _write_journal(tmp_path)
+    data = CampaignJournal(str(tmp_path)).load()
+    assert data["players"] == ["Ann"]
+    assert [record["id"] for record in data["scenarios_played"]] == ["a", "b"]
+
+
+@pytest.mark.parametrize("tail, players", [
+    ('{"op":"add_pl', ["Ann", "Bob"]),
+    ('{"op":"add_player","name":"Cat"}', ["Ann", "Cat", "Bob"]),  # only the newline is missing
+])
+def test_a_change_cut_short_by_a_crash_is_dropped(tmp_path, tail, players):
+    with open(_write_journal(tmp_path), "a", encoding="utf-8") as f:
+        f.write(tail)
+    journal = CampaignJournal(str(tmp_path))
+    journal.append(campaign_changes.add_player("Bob"))
+    journal.close()
+    assert CampaignJournal(str(tmp_path)).load()["players"] == players
+
+
+def test_a_cut_short_last_line_is_skipped_when_replaying(tmp_path):
+    journal = CampaignJournal(str(tmp_path))
+    journal.compact([], [], {}, background=False)
+    journal.append(campaign_changes.add_player("Ann"))
+    with open(_journal_path(str(tmp_path)), "a", encoding="utf-8") as f:
+        f.write('{"op":"add_pl')
+    assert journal.load()["players"] == ["Ann"]
+    journal.close()
+
+
+def test_an_unreadable_change_before_the_end_is_an_error(tmp_path):
+    path = _write_journal(tmp_path)
+    with open(path, encoding="utf-8") as f:
+        lines = f.readlines()
+    lines[0] = lines[0][:10] + "\n"
+    with open(path, "w", encoding="utf-8") as f:
+        f.writelines(lines)
+    with pytest.raises(JournalError, match="Line 1"):
+        CampaignJournal(str(tmp_path)).load()
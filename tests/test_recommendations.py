@@ -0,0 +1,58 @@
+# test_recommendations.py
+from catalog import category_catalogs
+from compact_records import compact_record
+from helpers import scenario
+from recommendations import HeroRecommendations
+
+
+def _recommendations(records=()):
+    catalogs = category_catalogs()
+    recommendations = HeroRecommendations(catalogs["heroes"], catalogs["aspects"])
+    for record in records:
+        recommendations.record_added(compact_record(record))
+    return recommendations
+
+
+def _team(*members):
+    return [{"hero": hero, "aspect": aspect, "health_remaining": 5} for hero, aspect in members]
+
+
+def test_teams_of_every_size_with_little_data():
+    for recommendations in (_recommendations(), _recommendations([scenario("a")])):
+        for team_size in (1, 2, 3, 4):
+            teams = recommendations.recommend("Crossbones", "Standard", team_size)
+            assert len(teams) == 10
+            assert all(len({hero for hero, _ in team}) == team_size for team, *_ in teams)
+
+
+def test_winning_teams_rank_first():
+    records = [
+        scenario(str(i), heroes_played=_team(("Thor", "Justice"), ("Storm", "Leadership")))
+        for i in range(6)
+    ] + [
+        scenario(f"loss{i}", outcome="Loss", heroes_played=_team(("Groot", "Protection"), ("Angel", "Aggression")))
+        for i in range(6)
+    ]
+    recommendations = _recommendations(records)
+    [best, *_] = recommendations.recommend("Crossbones", "Standard", 2)
+    assert best[0] == (("Storm", "Leadership"), ("Thor", "Justice"))
+    assert best[2:4] == [6, 6]  # played and won together on this scenario
+
+    teams = recommendations.recommend("Crossbones", "Standard", 2, fixed=[("Groot", "Protection")])
+    assert all(("Groot", "Protection") in team for team, *_ in teams)
+    assert teams[-1][1] < best[1]
+
+
+def test_deleting_plays_matches_never_recording_them():
+    records = [
+        scenario(str(i), scenario_name=("Crossbones", "Zola")[i % 2], outcome=("Win", "Loss")[i % 3 == 0],
+                 heroes_played=_team(("Thor", "Justice"), (("Storm", "Angel", "Groot")[i % 3], "Leadership")))
+        for i in range(30)
+    ]
+    recommendations = _recommendations(records)
+    for record in records[:10]:
+        recommendations.record_removed(compact_record(record))
+    expected = _recommendations(records[10:])
+    for team_size in (1, 2, 3):
+        assert recommendations.recommend("Zola", "Standard", team_size) == expected.recommend("Zola", "Standard", team_size)
+    assert recommendations.hero_table("Zola", "Standard") == expected.hero_table("Zola", "Standard")
@@ -0,0 +1,95 @@
+# test_scenario_store.py
+import pytest
+
+import campaign_changes
+from campaign_tracker import build_core_views
+from helpers import scenario
+from scenario_store import ScenarioStore
+from shared_store import SharedDataset
+
+
+class _Recorder:
+    def __init__(self):
+        self.added = []
+        self.removed = []
+
+    def record_added(self, record):
+        self.added.append(record["id"])
+
+    def record_removed(self, record):
+        self.removed.append(record["id"])
+
+
+def _team(*heroes):
+    return [{"hero": hero, "aspect": "Justice", "health_remaining": 5} for hero in heroes]
+
+
+def _indexes(store):
+    return {
+        name: {key: list(bucket) for key, bucket in getattr(store, name).items()}
+        for name in ("_by_campaign", "_by_scenario", "_by_hero")
+    }
+
+
+def _rebuilt_indexes(store):
+    return _indexes(ScenarioStore(store.records()))
+
+
+RECORDS = [
+    scenario("a", heroes_played=_team("Thor", "Storm")),
+    scenario("b", scenario_name="Zola", heroes_played=_team("Thor", "N/A (Not Selected)")),
+    scenario("c", campaign="Mutant Genesis", scenario_name="Sabretooth", heroes_played=_team("Storm", "Storm")),
+    scenario("d", scenario_name="Zola", heroes_played=_team("Groot")),
+]
+
+
+def test_records_are_indexed_when_added():
+    store = ScenarioStore(RECORDS)
+    assert store.get("b")["scenario"] == "Zola" and store.get("missing") is None
+    assert [record["id"] for record in store] == ["a", "b", "c", "d"]
+    assert _indexes(store) == {
+        "_by_campaign": {"Rise of Red Skull": ["a", "b", "d"], "Mutant Genesis": ["c"]},
+        "_by_scenario": {"Crossbones": ["a"], "Zola": ["b", "d"], "Sabretooth": ["c"]},
+        "_by_hero": {"Thor": ["a", "b"], "Storm": ["a", "c"], "Groot": ["d"]},
+    }
+    assert [record["id"] for record in store.for_scenario("Zola", "Rise of Red Skull")] == ["b", "d"]
+    assert [record["id"] for record in store.for_hero("Storm", "Mutant Genesis")] == ["c"]
+    with pytest.raises(ValueError, match="Duplicate"):
+        store.add(scenario("a"))
+
+
+def test_deletes_keep_the_indexes_consistent():
+    store = ScenarioStore(RECORDS)
+    version = store.version
+    assert store.remove("a")["id"] == "a"
+    assert store.remove("a") is None
+    assert store.version == version + 1
+    assert "a" not in store and len(store) == 3
+    assert "Crossbones" not in store._by_scenario  # emptied buckets are dropped
+    assert _indexes(store) == _rebuilt_indexes(store)
+
+    store.add(RECORDS[0])
+    assert _indexes(store) == _rebuilt_indexes(store)
+
+
+def test_bulk_deletes_keep_the_indexes_consistent():
+    dataset = SharedDataset(build_core_views, {"scenarios_played": RECORDS})
+    store = dataset.scenario_store
+    [applied] = dataset.apply(campaign_changes.delete_scenarios(["b", "missing", "d"]))
+    assert applied["ids"] == ["b", "d"]
+    assert _indexes(store) == _rebuilt_indexes(store)
+    assert store.for_scenario("Zola") == [] and [record["id"] for record in store.for_hero("Thor")] == ["a"]
+
+    dataset.apply(campaign_changes.delete_scenarios(["a", "c"]))
+    assert _indexes(store) == {"_by_campaign": {}, "_by_scenario": {}, "_by_hero": {}}
+    assert not store._by_id and store.campaigns() == []
+
+
+def test_listeners_follow_every_change():
+    store = ScenarioStore(RECORDS[:2])
+    listener = store.add_listener(_Recorder())
+    assert listener.added == ["a", "b"]  # replayed on subscription
+    store.add(RECORDS[2])
+    store.remove("a")
+    store.remove("missing")
+    assert (listener.added, listener.removed) == (["a", "b", "c"], ["a"])
@@ -0,0 +1,71 @@
+# test_schema_migrations.py
+import io
+import json
+
+import pytest
+
+from campaign_io import CampaignDataError, read_campaign_data
+from helpers import note, scenario
+from schema_migrations import SCHEMA_VERSION, Migrator, SCENARIOS
+
+
+def _read(data, **options):
+    return read_campaign_data(io.BytesIO(json.dumps(data).encode("utf-8")), **options)
+
+
+def test_version_1_files_are_upgraded():
+    legacy = {
+        "players": ["Alice"],
+        "scenarios_played": [
+            scenario(),
+            scenario("dup", heroes_played=[{"hero": "Thor", "aspect": "Justice", "health_remaining": "4"}]),
+            scenario("dup", outcome="Loss", villain_health_remaining="12"),
+        ],
+        "campaign_boons": {"Rise of Red Skull": [note(), note()]},
+    }
+    data = _read(legacy)
+
+    report = data["migration_report"]
+    assert (report.from_version, report.to_version) == (1, SCHEMA_VERSION)
+    assert report.steps["Scenario ids"][0] == 2
+    assert report.steps["Note ids"][0] == 2
+    assert report.steps["Health values"][0] == 2
+    assert "Upgraded the file from schema version 1" in report.summary()
+    scenario_ids = [record["id"] for record in data["scenarios_played"]]
+    assert len(set(scenario_ids)) == 3 and scenario_ids[1] == "dup"
+    assert len({item["id"] for item in data["campaign_boons"]["Rise of Red Skull"]}) == 2
+    assert data["scenarios_played"][1]["heroes_played"][0]["health_remaining"] == 4
+    assert data["scenarios_played"][2]["villain_health_remaining"] == 12
+
+
+def test_steps_run_in_batches():
+    migrator = Migrator(1)
+    batches = [[scenario()] for _ in range(3)]
+    for batch in batches:
+        migrator.migrate(SCENARIOS, batch)
+    assert len({batch[0]["id"] for batch in batches}) == 3  # ids stay unique across batches
+    assert migrator.report.steps["Scenario ids"][0] == 3
+
+
+def test_current_files_still_get_unique_ids():
+    current = {
+        "schema_version": SCHEMA_VERSION,
+        "scenarios_played": [scenario(), scenario("x"), scenario("x")],
+        "campaign_boons": {"Rise of Red Skull": [note(), note("n"), note("n")]},
+    }
+    data = _read(current)
+    assert not data["migration_report"].steps
+    scenario_ids = [record["id"] for record in data["scenarios_played"]]
+    assert len(set(scenario_ids)) == 3 and scenario_ids[1] == "x"
+    assert len({item["id"] for item in data["campaign_boons"]["Rise of Red Skull"]}) == 3
+
+    # Merging reads ids as they are
+    data = _read(current, assign_ids=False, compact=False)
+    assert [record.get("id") for record in data["scenarios_played"]] == [None, "x", "x"]
+
+
+def test_newer_files_are_refused():
+    with pytest.raises(CampaignDataError, match="newer version"):
+        _read({"schema_version": SCHEMA_VERSION + 1})
+    with pytest.raises(CampaignDataError, match="whole number"):
+        _read({"schema_version": "2"})
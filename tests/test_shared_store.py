@@ -0,0 +1,63 @@
+# test_shared_store.py
+import threading
+
+import pytest
+
+from campaign_tracker import build_core_views
+from shared_store import DatasetRegistry, SharedDataset
+
+
+def _dataset():
+    return SharedDataset(build_core_views)
+
+
+def test_a_source_is_built_once():
+    registry = DatasetRegistry()
+    started, release = threading.Event(), threading.Event()
+    builds = []
+
+    def slow_build():
+        builds.append(1)
+        started.set()
+        release.wait(5)
+        return _dataset()
+
+    opened = []
+    threads = [threading.Thread(target=lambda: opened.append(registry.open("file", slow_build))) for _ in range(3)]
+    threads[0].start()
+    started.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert len(builds) == 1 and len(opened) == 3
+    assert all(dataset is opened[0] for dataset in opened) and opened[0].key == "file"
+
+
+def test_building_does_not_hold_up_other_sources():
+    registry = DatasetRegistry()
+    other = []
+
+    def build():
+        # A session opening another source meanwhile isn't blocked
+        thread = threading.Thread(target=lambda: other.append(registry.open("other", _dataset)))
+        thread.start()
+        thread.join(5)
+        return _dataset()
+
+    dataset = registry.open("file", build)
+    assert len(other) == 1 and len(registry) == 2
+    assert registry.open("file", _dataset) is dataset
+
+
+def test_a_failed_build_can_be_retried():
+    registry = DatasetRegistry()
+
+    def failing_build():
+        raise ValueError("unreadable")
+
+    with pytest.raises(ValueError):
+        registry.open("file", failing_build)
+    dataset = registry.open("file", _dataset)
+    assert registry.open("file", failing_build) is dataset
@@ -0,0 +1,77 @@
+# test_sqlite_backend.py
+import random
+
+import pytest
+
+import campaign_changes
+from helpers import note, scenario
+from scenario_log import LOG_SORT_COLUMNS, ScenarioLogCache
+from scenario_store import ScenarioStore
+from sqlite_backend import SqliteCampaignStore
+
+HEROES = ["Thor", "Storm", "Groot", "Angel"]
+
+
+def _records(count=60):
+    rng = random.Random(7)
+    records = []
+    for i in range(count):
+        heroes_played = [
+            {"hero": hero, "aspect": rng.choice(["Justice", "Aggression", "N/A"]),
+             "health_remaining": rng.choice([3, 10, "N/A (Defeated)", "N/A"])}
+            for hero in rng.sample(HEROES, rng.randint(1, 2))
+        ]
+        records.append(scenario(
+            f"s{i}", scenario_name=rng.choice(["Crossbones", "Zola"]), outcome=rng.choice(["Win", "Loss"]),
+            date=f"2024-03-{rng.randint(1, 9):02d}", heroes_played=heroes_played
+        ))
+    records.append(scenario("other", campaign="Mutant Genesis", scenario_name="Sabretooth"))
+    return records
+
+
+@pytest.fixture
+def database(tmp_path):
+    database = SqliteCampaignStore(str(tmp_path / "campaign.sqlite3"))
+    yield database
+    database.close()
+
+
+def test_round_trip(database):
+    data = {
+        "players": ["Alice"],
+        "scenarios_played": _records(5) + [scenario("odd", turns_taken=True, heroes_played="Thor", extra={"x": 1})],
+        "campaign_boons": {"Rise of Red Skull": [note("n1")], "Mutant Genesis": []},
+    }
+    database.apply_change(campaign_changes.replace_all(**data))
+    assert database.load() == data
+
+
+@pytest.mark.parametrize("sort_by", LOG_SORT_COLUMNS)
+@pytest.mark.parametrize("ascending", [False, True])
+def test_pages_match_the_scenario_log(database, sort_by, ascending):
+    records = _records()
+    database.apply_change(campaign_changes.add_scenarios(records))
+    store = ScenarioStore(records)
+    cache = store.add_listener(ScenarioLogCache())
+
+    for filters in ({}, {"scenario": "Zola"}, {"outcome": "Loss", "hero": "Thor"}):
+        hero = filters.get("hero")
+        record_ids = None if hero is None else {record["id"] for record in store.for_hero(hero, "Rise of Red Skull")}
+        expected = list(cache.query(
+            "Rise of Red Skull", store.version, filters.get("scenario"), filters.get("outcome"), record_ids,
+            sort_by=sort_by, ascending=ascending
+        ).index)
+        assert database.count_scenarios("Rise of Red Skull", **filters) == len(expected)
+        page = database.scenario_page("Rise of Red Skull", **filters, sort_by=sort_by, ascending=ascending, offset=5, limit=10)
+        assert [record["id"] for record in page] == expected[5:15]
+    [first] = database.scenario_page("Rise of Red Skull", sort_by=sort_by, ascending=ascending, limit=1)
+    assert first == next(record for record in records if record["id"] == first["id"])
+
+
+def test_note_pages_are_newest_first(database):
+    notes = [note(f"n{i}") | {"date": f"2024-03-0{i % 3 + 1}"} for i in range(7)]
+    for item in notes:
+        database.apply_change(campaign_changes.add_note("Rise of Red Skull", item))
+    database.apply_change(campaign_changes.add_note("Mutant Genesis", note("other")))
+    assert database.count_notes("Rise of Red Skull") == 7
+    assert [item["id"] for item in database.note_page("Rise of Red Skull", offset=1, limit=4)] == ["n5", "n1", "n4", "n0"]
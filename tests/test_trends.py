@@ -0,0 +1,52 @@
+# test_trends.py
+import datetime
+
+import trends
+from compact_records import compact_record
+from helpers import scenario
+from trends import ALL_CAMPAIGNS, TrendBuckets
+
+
+def _buckets(records):
+    buckets = TrendBuckets()
+    for record in records:
+        buckets.record_added(compact_record(record))
+    return buckets
+
+
+def test_weekly_win_rates():
+    records = [scenario(str(day), date=f"2024-03-{day:02d}", outcome=("Win", "Loss")[day % 2]) for day in range(4, 18)]
+    trend = _buckets(records).trend(ALL_CAMPAIGNS, window=1)
+    assert list(trend["Plays"]["All plays"]) == [7, 7]
+    assert trend["Win %"].index[0].date().isoformat() == "2024-03-04"  # a Monday
+
+
+def test_mistyped_dates_are_left_out():
+    records = [scenario("a", date="2024-03-04"), scenario("b", date="1924-03-04"), scenario("c", date="9024-03-04")]
+    buckets = _buckets(records)
+    assert buckets.out_of_range_plays == 2
+    trend = buckets.trend("Rise of Red Skull", granularity="Daily")
+    assert len(trend["Plays"]) == 1
+
+    buckets.record_removed(compact_record(records[1]))
+    buckets.record_removed(compact_record(records[0]))
+    assert buckets.out_of_range_plays == 1
+    assert buckets.trend("Rise of Red Skull", granularity="Daily")["Plays"].empty  # the cache follows the data
+
+
+def test_future_plays_are_bucketed_once_the_date_moves_on(monkeypatch):
+    today = datetime.date.today()
+    records = [
+        scenario("a", date=today.isoformat()),
+        scenario("b", date=(today + datetime.timedelta(days=trends.LATEST_DAYS_AHEAD + 30)).isoformat()),
+    ]
+    buckets = _buckets(records)
+    assert buckets.out_of_range_plays == 1
+    assert buckets.trend(ALL_CAMPAIGNS, granularity="Daily")["Plays"]["All plays"].sum() == 1
+
+    monkeypatch.setattr(trends, "LATEST_DAYS_AHEAD", trends.LATEST_DAYS_AHEAD + 60)  # as if two months went by
+    assert buckets.out_of_range_plays == 0
+    assert buckets.trend(ALL_CAMPAIGNS, granularity="Daily")["Plays"]["All plays"].sum() == 2
+
+    buckets.record_removed(compact_record(records[1]))
+    assert buckets.trend(ALL_CAMPAIGNS, granularity="Daily")["Plays"]["All plays"].sum() == 1
@@ -0,0 +1,118 @@
+# test_undo.py
+import datetime
+import gc
+import weakref
+
+import pytest
+
+import campaign_changes
+from campaign_tracker import CampaignTracker, build_core_views, build_scenario_views
+from journal import CampaignJournal
+from shared_store import SharedDataset
+from sqlite_backend import SqliteCampaignStore
+from undo_history import DEFAULT_DATA_LIMIT
+
+TODAY = datetime.date(2024, 3, 1)
+
+
+def _record_play(tracker, scenario_name="Crossbones"):
+    heroes_played = [{"hero": "Thor", "aspect": "Justice", "health_remaining": 5}]
+    return tracker.add_scenario_outcome(
+        "Rise of Red Skull", scenario_name, heroes_played, "Win", "Standard", "", "N/A", 6, 3, "", TODAY
+    )
+
+
+def _counts(data):
+    return len(data["scenarios_played"]), sum(len(notes) for notes in data["campaign_boons"].values())
+
+
+def test_undo_and_redo_changes():
+    tracker = CampaignTracker(build_views=build_core_views)
+    record = _record_play(tracker)
+    note = tracker.add_campaign_note("Rise of Red Skull", "Boon", "Combo", TODAY)
+    tracker.delete_scenario(record["id"])
+    assert _counts(tracker.dataset.data()) == (0, 1)
+
+    assert tracker.undo().label == "deleting a Crossbones play"
+    assert record["id"] in tracker.dataset.scenario_store
+    tracker.undo()
+    tracker.undo()
+    assert _counts(tracker.dataset.data()) == (0, 0)
+    assert tracker.undo() is None
+
+    tracker.redo()
+    tracker.redo()
+    assert tracker.dataset.campaign_boons["Rise of Red Skull"] == [note]
+    tracker.delete_campaign_note("Rise of Red Skull", note["id"])
+    assert tracker.next_redo() is None  # a new action forgets what was undone
+
+
+def test_undo_a_load_returns_to_the_previous_dataset():
+    tracker = CampaignTracker(build_views=build_core_views)
+    _record_play(tracker)
+    before = tracker.dataset
+    tracker.replace_data({"players": [], "scenarios_played": [], "campaign_boons": {}}, "resetting")
+    assert tracker.dataset is not before and not len(tracker.dataset.scenario_store)
+    tracker.undo()
+    assert tracker.dataset is before and len(before.scenario_store) == 1
+
+
+@pytest.fixture(params=["database", "journal"])
+def durable_dataset(request, tmp_path):
+    if request.param == "database":
+        backend = SqliteCampaignStore(str(tmp_path / "campaign.sqlite3"))
+        backend.apply_change(campaign_changes.replace_all(players=[], scenarios_played=[], campaign_boons={}))
+    else:
+        backend = CampaignJournal(str(tmp_path / "journal"))
+    dataset = SharedDataset(build_scenario_views, backend.load())
+    dataset.attach(**{request.param: backend})
+    yield dataset, backend
+
+
+def test_trackers_sharing_a_durable_dataset(durable_dataset):
+    dataset, backend = durable_dataset
+    alice, bob = CampaignTracker(dataset), CampaignTracker(dataset)
+    record = _record_play(alice)
+    note = alice.add_campaign_note("Rise of Red Skull", "Boon", "Combo", TODAY)
+    bob.delete_scenario(record["id"])
+    bob.delete_campaign_note("Rise of Red Skull", note["id"])
+
+    # Alice takes her changes back (already undone by Bob) and makes them again
+    alice.undo()
+    alice.undo()
+    alice.redo()
+    alice.redo()
+    # Bob undoing his deletes re-adds what is already there: nothing changes
+    bob.undo()
+    bob.undo()
+
+    assert _counts(dataset.data()) == (1, 1)
+    assert _counts(backend.load()) == (1, 1)
+
+
+def test_reset_of_a_durable_dataset_can_be_undone(durable_dataset):
+    dataset, backend = durable_dataset
+    tracker = CampaignTracker(dataset)
+    _record_play(tracker)
+    _record_play(tracker, "Zola")
+    tracker.replace_data({"players": [], "scenarios_played": [], "campaign_boons": {}}, "resetting")
+    assert tracker.dataset is dataset and _counts(backend.load()) == (0, 0)
+    tracker.undo()
+    assert _counts(dataset.data()) == (2, 0) and _counts(backend.load()) == (2, 0)
+
+
+def test_only_the_newest_loads_are_kept_for_undo():
+    tracker = CampaignTracker(build_views=build_core_views)
+    first = weakref.ref(tracker.dataset)
+    for i in range(5):
+        _record_play(tracker)
+        tracker.replace_data({"players": [str(i)], "scenarios_played": [], "campaign_boons": {}}, "loading")
+    assert len({id(action.before) for action in tracker.undo_history._undo}) == DEFAULT_DATA_LIMIT
+    gc.collect()
+    assert first() is None  # the oldest datasets are freed
+
+    undone = 0
+    while tracker.undo() is not None:
+        undone += 1
+    assert undone == 2 * DEFAULT_DATA_LIMIT  # each kept load, and the play recorded before it
+    assert tracker.dataset.players == [str(4 - DEFAULT_DATA_LIMIT)]
@@ -0,0 +1,223 @@
+# trends.py
+"""Play trends over time: win rate and turns taken, overall or per scenario / difficulty.
+
+TrendBuckets subscribes to the ScenarioStore and keeps daily buckets of plays,
+wins and turns taken for every series: all plays of a campaign (or of all
+campaigns), or just those of one scenario or difficulty. A series is a set of
+dense per-day integer arrays covering its first to last day, so recording or
+deleting a play only bumps one bucket per series it belongs to.
+
+``trend()`` turns the buckets of one campaign and split into chart data:
+days are summed into weeks if asked, buckets are merged into at most
+``max_points`` bins (summing counts, so rates stay exact), and rolling windows
+come from cumulative sums. Its cost depends on the number of days covered, not
+on the number of plays, and only a bounded number of points per series is
+sent to the browser.
+
+Only plays dated from EARLIEST_DATE to a year after today are bucketed, so
+one mistyped year (2091, say) can't stretch every series across decades;
+``out_of_range_plays`` counts the plays left out. Plays past that horizon are
+set aside rather than dropped: once the date moves on far enough, the next
+``trend()`` buckets them.
+"""
+import datetime
+from array import array
+
+import numpy as np
+import pandas as pd
+
+MAX_POINTS = 200  # points per series sent to the charts
+GRANULARITIES = {"Daily": 1, "Weekly": 7}  # name -> days per bucket
+SPLITS = {"Overall": None, "Scenario": "scenario", "Difficulty": "difficulty"}  # name -> record field
+OVERALL_SERIES = "All plays"
+EARLIEST_DATE = datetime.date(2019, 1, 1)  # the game came out in 2019
+LATEST_DAYS_AHEAD = 366  # plays dated later than this many days after today are left out
+CACHED_TRENDS = 32  # trend() results memoized for the current data (the oldest are dropped first)
+ALL_CAMPAIGNS = None
+
+
+class _DailySeries:
+    """Per-day plays, wins and turns (sum and count of plays with a number) from ``start`` on."""
+
+    __slots__ = ("start", "total_plays", "plays", "wins", "turns_total", "turns_counted")
+
+    def __init__(self, ordinal):
+        self.start = ordinal
+        self.total_plays = 0
+        self.plays = array("i")
+        self.wins = array("i")
+        self.turns_total = array("i")
+        self.turns_counted = array("i")
+
+    def _columns(self):
+        return (self.plays, self.wins, self.turns_total, self.turns_counted)
+
+    def add(self, ordinal, win, turns, delta):
+        if ordinal < self.start:
+            padding = array("i", bytes(4 * (self.start - ordinal)))
+            for column in self._columns():
+                column[0:0] = padding
+            self.start = ordinal
+        index = ordinal - self.start
+        if index >= len(self.plays):
+            padding = array("i", bytes(4 * (index + 1 - len(self.plays))))
+            for column in self._columns():
+                column.extend(padding)
+        self.total_plays += delta
+        self.plays[index] += delta
+        self.wins[index] += win * delta
+        if turns is not None:
+            self.turns_total[index] += turns * delta
+            self.turns_counted[index] += delta
+
+    @property
+    def end(self):
+        return self.start + len(self.plays)
+
+
+class TrendBuckets:
+    """Daily play buckets per campaign and per scenario / difficulty, kept up to date by the ScenarioStore."""
+
+    def __init__(self):
+        self._series = {}  # (campaign or ALL_CAMPAIGNS, split field) -> {series name: _DailySeries}
+        self._earliest = EARLIEST_DATE.toordinal()
+        self._too_early_plays = 0
+        self._future_plays = {}  # record id -> record dated past the horizon when it was added (not bucketed)
+        self._latest = self._horizon()  # only moves forward, so anything up to it is still in range
+        self._version = 0
+        self._trends = {}  # trend() arguments -> result, for the data at _trends_version
+        self._trends_version = 0
+
+    @property
+    def out_of_range_plays(self):
+        """Plays left out of the trends: dated before EARLIEST_DATE or too far ahead of today."""
+        self._bucket_due_plays()
+        return self._too_early_plays + len(self._future_plays)
+
+    # --- ScenarioStore listener interface ---
+    def record_added(self, record):
+        ordinal = record.date_ordinal  # None for plays without a "%Y-%m-%d" date
+        if ordinal is not None and ordinal > self._latest and ordinal > self._horizon():
+            self._future_plays[record["id"]] = record
+        else:
+            self._apply(record, 1)
+
+    def record_removed(self, record):
+        # A play is bucketed unless it is still set aside, since the horizon only moves forward
+        if self._future_plays.pop(record["id"], None) is None:
+            self._apply(record, -1)
+
+    def _horizon(self):
+        """The last day bucketed today (see LATEST_DAYS_AHEAD)."""
+        self._latest = datetime.date.today().toordinal() + LATEST_DAYS_AHEAD
+        return self._latest
+
+    def _bucket_due_plays(self):
+        """Buckets the plays set aside whose date is no longer past the horizon."""
+        if not self._future_plays:
+            return
+        latest = self._horizon()
+        for record_id, record in list(self._future_plays.items()):
+            if record.date_ordinal <= latest:
+                del self._future_plays[record_id]
+                self._apply(record, 1)
+
+    def _apply(self, record, delta):
+        ordinal = record.date_ordinal
+        if ordinal is None:
+            return
+        if ordinal < self._earliest:
+            self._too_early_plays += delta
+            return
+        win = 1 if record.get("outcome") == "Win" else 0
+        turns = record.get("turns_taken")
+        if type(turns) is not int:
+            turns = None
+        for campaign in (record.get("campaign"), ALL_CAMPAIGNS):
+            for field in SPLITS.values():
+                name = OVERALL_SERIES if field is None else str(record.get(field))
+                series_by_name = self._series.setdefault((campaign, field), {})
+                series = series_by_name.get(name)
+                if series is None:
+                    series = series_by_name[name] = _DailySeries(ordinal)
+                series.add(ordinal, win, turns, delta)
+                if not series.total_plays:
+                    del series_by_name[name]
+        self._version += 1
+
+    # --- Reads ---
+    def trend(self, campaign, split="Overall", granularity="Weekly", window=4, max_points=MAX_POINTS):
+        """Returns the trends of a campaign (ALL_CAMPAIGNS for every campaign) as a dict of DataFrames.
+
+        Each frame is indexed by the first day of its bins and has one column
+        per series (one series overall, or one per scenario / difficulty):
+
+        * "Win %" - wins / plays over the last ``window`` buckets
+        * "Turns Taken" - average turns taken over the last ``window`` buckets
+        * "Plays" - plays per bin
+
+        ``"days_per_point"`` gives the number of days each point covers once
+        the buckets are merged down to ``max_points`` bins.
+        """
+        self._bucket_due_plays()
+        if self._trends_version != self._version:
+            self._trends.clear()
+            self._trends_version = self._version
+        key = (campaign, split, granularity, window, max_points)
+        result = self._trends.get(key)
+        if result is None:
+            if len(self._trends) >= CACHED_TRENDS:
+                del self._trends[next(iter(self._trends))]
+            result = self._trends[key] = self._build_trend(
+                campaign, SPLITS[split], GRANULARITIES[granularity], window, max_points
+            )
+        return result
+
+    def _build_trend(self, campaign, field, bucket_days, window, max_points):
+        series_by_name = self._series.get((campaign, field), {})
+        names = sorted(series_by_name)
+        if not names:
+            empty = pd.DataFrame(index=pd.DatetimeIndex([], name="Date"))
+            return {"Win %": empty, "Turns Taken": empty, "Plays": empty, "days_per_point": bucket_days}
+
+        # Dense (series, day) matrices over the days any series covers, starting on a Monday for weeks
+        start = min(series.start for series in series_by_name.values())
+        if bucket_days == 7:
+            start -= (start - 1) % 7  # day 1 (0001-01-01) was a Monday
+        end = max(series.end for series in series_by_name.values())
+        bucket_count = -(-(end - start) // bucket_days)
+        counts = np.zeros((4, len(names), bucket_count * bucket_days), dtype=np.int64)
+        for row, name in enumerate(names):
+            series = series_by_name[name]
+            offset = series.start - start
+            for column, values in enumerate(series._columns()):
+                counts[column, row, offset:offset + len(values)] = values
+
+        # Days -> buckets -> at most max_points bins of whole buckets
+        counts = counts.reshape(4, len(names), bucket_count, bucket_days).sum(axis=3)
+        buckets_per_bin = max(1, -(-bucket_count // max_points))
+        bin_count = -(-bucket_count // buckets_per_bin)
+        padded = np.zeros((4, len(names), bin_count * buckets_per_bin), dtype=np.int64)
+        padded[:, :, :bucket_count] = counts
+        counts = padded.reshape(4, len(names), bin_count, buckets_per_bin).sum(axis=3)
+
+        # Rolling sums over the window (in bins) from cumulative sums
+        window_bins = max(1, round(window / buckets_per_bin))
+        cumulative = np.concatenate([np.zeros((4, len(names), 1), dtype=np.int64), counts.cumsum(axis=2)], axis=2)
+        ends = np.arange(1, bin_count + 1)
+        rolling = cumulative[:, :, ends] - cumulative[:, :, np.maximum(ends - window_bins, 0)]
+        plays, wins, turns_total, turns_counted = rolling
+        with np.errstate(divide="ignore", invalid="ignore"):
+            win_rates = np.where(plays > 0, np.round(wins / plays * 100, 2), np.nan)
+            turns_averages = np.where(turns_counted > 0, np.round(turns_total / turns_counted, 2), np.nan)
+
+        days_per_point = bucket_days * buckets_per_bin
+        index = pd.DatetimeIndex(
+            [datetime.date.fromordinal(start + i * days_per_point) for i in range(bin_count)], name="Date"
+        )
+        return {
+            "Win %": pd.DataFrame(win_rates.T, index=index, columns=names),
+            "Turns Taken": pd.DataFrame(turns_averages.T, index=index, columns=names),
+            "Plays": pd.DataFrame(counts[0].T, index=index, columns=names),
+            "days_per_point": days_per_point,
+        }
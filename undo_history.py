@@ -0,0 +1,108 @@
+# undo_history.py
+"""Undo and redo for the changes a session makes to its campaign data.
+
+The history is an operation log, not a stack of copies: each action keeps the
+change it made (see campaign_changes) and the inverse change that takes it
+back, e.g. the deleted record for a delete, or the new record's id for an add.
+Records and notes are never modified in place, so those changes share them
+with the store instead of copying them: an action costs memory in proportion
+to what it changed, and undoing or redoing it costs as much as making that
+change again (O(1) for a play or note).
+
+Loading or merging files and resetting don't overwrite a dataset that isn't
+backed by a database or journal; the session moves to a new dataset instead
+(see shared_store). Their actions just keep both datasets, and undo moves the
+session back to the previous one, again in constant time. A durable dataset is
+replaced in place, so its actions keep the data before and after as
+replace_all changes (new lists holding the same records), and undo writes the
+old data back to the database or journal.
+
+Those actions hold whole datasets, so only the newest few of them are kept
+(``data_limit``): recording one more drops the oldest, along with every action
+older than it (those could only be undone after it).
+"""
+import collections
+
+import campaign_changes
+
+DEFAULT_LIMIT = 100  # actions kept for undo
+DEFAULT_DATA_LIMIT = 3  # actions holding whole datasets (loads, merges, resets) kept for undo
+
+
+class UndoAction:
+    """One undoable action: the datasets before and after it, and the changes to redo / undo it."""
+
+    __slots__ = ("label", "before", "after", "changes", "inverse")
+
+    def __init__(self, label, before, after, changes, inverse):
+        self.label = label  # e.g. "deleting a Rhino play"
+        self.before = before
+        self.after = after  # the same dataset as before, unless the action moved the session to another one
+        self.changes = changes  # applied to ``before`` to redo the action
+        self.inverse = inverse  # applied to ``after`` to undo it
+
+    @property
+    def holds_data(self):
+        """True if the action keeps a whole dataset alive (another dataset, or replace_all changes)."""
+        return self.before is not self.after or any(
+            change["op"] == campaign_changes.REPLACE_ALL for change in self.changes + self.inverse
+        )
+
+
+class UndoHistory:
+    """The actions a session can undo (oldest dropped past ``limit`` / ``data_limit``) and those it can redo."""
+
+    def __init__(self, limit=DEFAULT_LIMIT, data_limit=DEFAULT_DATA_LIMIT):
+        self._undo = collections.deque(maxlen=limit)
+        self._redo = []
+        self._data_limit = data_limit
+
+    def record(self, label, before, after=None, changes=(), inverse=()):
+        """Records an action that took the session from dataset ``before`` to ``after`` (by default the same).
+
+        ``changes`` and ``inverse`` are the campaign changes that redo and
+        undo it; an action that only moved the session to another dataset
+        needs neither. Recording an action forgets the actions undone before it.
+        """
+        after = before if after is None else after
+        action = UndoAction(label, before, after, list(changes), list(inverse))
+        self._undo.append(action)
+        self._redo.clear()
+        if action.holds_data:
+            data_actions = sum(1 for kept in self._undo if kept.holds_data)
+            while data_actions > self._data_limit:
+                data_actions -= self._undo.popleft().holds_data
+
+    def next_undo(self, dataset):
+        """The action undo would take back, or None.
+
+        Only the newest action can be undone, and only while the session
+        still views the dataset it left behind.
+        """
+        if self._undo and self._undo[-1].after is dataset:
+            return self._undo[-1]
+        return None
+
+    def next_redo(self, dataset):
+        """The action redo would make again, or None."""
+        if self._redo and self._redo[-1].before is dataset:
+            return self._redo[-1]
+        return None
+
+    def undo(self, dataset):
+        """Moves the action to take back onto the redo list and returns it (None if there is none)."""
+        action = self.next_undo(dataset)
+        if action is not None:
+            self._redo.append(self._undo.pop())
+        return action
+
+    def redo(self, dataset):
+        """Moves the action to make again back onto the undo list and returns it (None if there is none)."""
+        action = self.next_redo(dataset)
+        if action is not None:
+            self._undo.append(self._redo.pop())
+        return action
+
+    def clear(self):
+        self._undo.clear()
+        self._redo.clear()